@@ -1,25 +1,139 @@
+import asyncio
 import logging
 import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
 from fastapi import APIRouter, HTTPException
-from app.models.api_models import AgentRequest, MultiAgentRequest
-from app.core.kernel import create_kernel
+from fastapi.responses import StreamingResponse
+from app.models.api_models import (
+    AgentRequest,
+    AgentSessionMessage,
+    AgentSessionRequest,
+    MultiAgentRequest,
+)
+from app.core.kernel import agent_sessions, create_kernel, prompt_registry, semantic_cache
+from app.core.semantic_cache import usage_tokens
 from semantic_kernel.connectors.ai.open_ai import AzureChatPromptExecutionSettings
 from semantic_kernel.contents.chat_history import ChatHistory
 from semantic_kernel.connectors.ai.function_choice_behavior import (
     FunctionChoiceBehavior,
 )
-from semantic_kernel.agents import ChatCompletionAgent, AgentGroupChat
-from semantic_kernel.agents.strategies import (
-    SequentialSelectionStrategy,
-    DefaultTerminationStrategy,
+from semantic_kernel import Kernel
+from semantic_kernel.agents import ChatCompletionAgent
+from semantic_kernel.agents.chat_completion.chat_completion_agent import (
+    ChatHistoryAgentThread,
+)
+from semantic_kernel.contents import ChatMessageContent, FunctionCallContent
+from semantic_kernel.exceptions import ServiceInvalidRequestError
+from semantic_kernel.filters import AutoFunctionInvocationContext
+from semantic_kernel.functions import KernelArguments
+from app.core.orchestration import (
+    ORCHESTRATIONS,
+    ConvergenceTerminationStrategy,
+    OnChunk,
+    TrackingSelectionStrategy,
+    active_agent,
+    fan_out_fan_in,
+    make_termination_strategy,
+    message_tokens,
+    select_synthesizer,
+    run_group_chat,
 )
-from semantic_kernel.contents import FunctionCallContent
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/agent", tags=["agents"])
 
+# Folds older turns of an agent session into its rolling summary
+summarize_history_fn = prompt_registry.register(
+    prompt="""
+        Summary of the conversation so far:
+        {{$summary}}
+
+        Later turns of the conversation:
+        {{$transcript}}
+
+        Rewrite the summary to include the later turns. Keep facts, names, numbers,
+        decisions and open questions; drop small talk. Reply with the summary only.""",
+    function_name="history",
+    plugin_name="Summarizer",
+    description="Folds conversation turns into a rolling summary.",
+    reserved=True,
+    max_tokens=500,
+)
+
+
+def _create_agent_chat(
+    request: AgentRequest, kernel: Kernel
+) -> Tuple[ChatCompletionAgent, ChatHistory]:
+    # Create a ChatCompletionAgent with the provided system prompt
+    agent = ChatCompletionAgent(
+        kernel=kernel, name="PlaygroundAgent", instructions=request.system_prompt
+    )
+
+    # Create a chat history
+    chat_history = ChatHistory()
+
+    # Add previous messages from the chat history if available
+    for msg in request.chat_history:
+        if msg["role"].lower() == "user":
+            chat_history.add_user_message(msg["content"])
+        elif msg["role"].lower() == "assistant":
+            chat_history.add_assistant_message(msg["content"])
+
+    # Add the current user message
+    chat_history.add_user_message(request.message)
+    return agent, chat_history
+
+
+def _plugin_calls(messages: Iterable[ChatMessageContent]) -> List[Dict[str, Any]]:
+    """
+    The plugin functions called in messages, with their arguments as a dictionary.
+    """
+    plugin_calls = []
+    for message in messages:
+        for item in message.items:
+            if isinstance(item, FunctionCallContent):
+                args = item.arguments
+                if isinstance(args, str):
+                    try:
+                        args = json.loads(args)
+                    except ValueError:
+                        args = {"location": args}
+                plugin_calls.append(
+                    {
+                        "plugin_name": item.plugin_name,
+                        "function_name": item.function_name,
+                        "parameters": args,
+                    }
+                )
+    return plugin_calls
+
+
+async def _lookup_agent_chat(
+    request: AgentRequest, chat_history: ChatHistory
+) -> Tuple[Optional[str], Any, str]:
+    """
+    Look up the answer to a near-duplicate conversation.
+
+    Entries are only shared between requests with the same agent configuration.
+    Returns the cached answer (or None), the embedding to store the new answer
+    under, and the cache scope.
+    """
+    cache_scope = json.dumps(
+        [request.system_prompt, request.temperature, sorted(request.available_plugins)]
+    )
+    if not semantic_cache.enabled:
+        return None, None, cache_scope
+    conversation = "\n".join(
+        f"{message.role.value}: {message.content}" for message in chat_history
+    )
+    cached, embedding = await semantic_cache.lookup(
+        "agent_chat", conversation, scope=cache_scope
+    )
+    return cached, embedding, cache_scope
+
 
 @router.post("/chat")
 async def agent_chat(request: AgentRequest):
@@ -27,23 +141,19 @@ async def agent_chat(request: AgentRequest):
     kernel, _ = create_kernel(plugins=request.available_plugins)
 
     try:
-        # Create a ChatCompletionAgent with the provided system prompt
-        agent = ChatCompletionAgent(
-            kernel=kernel, name="PlaygroundAgent", instructions=request.system_prompt
-        )
-
-        # Create a chat history
-        chat_history = ChatHistory()
-
-        # Add previous messages from the chat history if available
-        for msg in request.chat_history:
-            if msg["role"].lower() == "user":
-                chat_history.add_user_message(msg["content"])
-            elif msg["role"].lower() == "assistant":
-                chat_history.add_assistant_message(msg["content"])
-
-        # Add the current user message
-        chat_history.add_user_message(request.message)
+        agent, chat_history = _create_agent_chat(request, kernel)
+
+        # Reuse the answer to a near-duplicate conversation if there is one
+        cached, embedding, cache_scope = await _lookup_agent_chat(request, chat_history)
+        if cached is not None:
+            return {
+                "response": cached,
+                "chat_history": [
+                    {"role": "user", "content": request.message},
+                    {"role": "assistant", "content": cached},
+                ],
+                "plugin_calls": [],
+            }
 
         # Create execution settings
         execution_settings = AzureChatPromptExecutionSettings(
@@ -56,33 +166,25 @@ async def agent_chat(request: AgentRequest):
         # Set up function calling behavior
         execution_settings.function_choice_behavior = FunctionChoiceBehavior.Auto()
 
-        # Get the response from the agent
+        # Get the response from the agent, in a thread started with a copy of
+        # the conversation that also collects the agent's function calls
         response = await agent.get_response(
-            messages=chat_history, execution_settings=execution_settings
+            messages=chat_history.messages,
+            thread=ChatHistoryAgentThread(),
+            arguments=KernelArguments(settings=execution_settings),
         )
-
-        # Track function calls
-        plugin_calls = []
-
-        # Extract function calls from the chat history
-        for message in chat_history:
-            for item in message.items:
-                if isinstance(item, FunctionCallContent):
-                    # Convert arguments to a dictionary if it's a string
-                    args = item.arguments
-                    if isinstance(args, str):
-                        try:
-                            args = json.loads(args)
-                        except:
-                            args = {"location": args}
-
-                    plugin_calls.append(
-                        {
-                            "plugin_name": item.plugin_name,
-                            "function_name": item.function_name,
-                            "parameters": args,
-                        }
-                    )
+        messages = [message async for message in response.thread.get_messages()]
+        plugin_calls = _plugin_calls(messages[len(chat_history.messages) :])
+
+        # Plugin results are live data, so only plain answers are cached
+        if not plugin_calls:
+            semantic_cache.store(
+                "agent_chat",
+                embedding,
+                str(response.content),
+                tokens=usage_tokens(response.message.metadata),
+                scope=cache_scope,
+            )
 
         # Return the agent's response along with the updated chat history and plugin calls
         return {
@@ -98,160 +200,452 @@ async def agent_chat(request: AgentRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _create_group_chat(
+    request: MultiAgentRequest, kernel: Kernel
+) -> Tuple[
+    List[ChatCompletionAgent],
+    TrackingSelectionStrategy,
+    ChatHistory,
+    ConvergenceTerminationStrategy,
+]:
+    # Create agents based on the provided configurations
+    agents = []
+    for agent_config in request.agent_configs:
+        agent = ChatCompletionAgent(
+            kernel=kernel,
+            name=agent_config.get("name", "Agent"),
+            instructions=agent_config.get(
+                "instructions", "You are a helpful assistant."
+            ),
+        )
+        agents.append(agent)
+
+    # If no agents were provided, create default agents
+    if not agents:
+        # Create default agents with different perspectives
+        agent_factual = ChatCompletionAgent(
+            kernel=kernel,
+            name="Researcher",
+            instructions="You are a fact-based researcher who provides accurate and concise information. Always stick to verified facts and cite sources when possible. Keep your responses very concise, clear and straightforward.",
+        )
+
+        agent_creative = ChatCompletionAgent(
+            kernel=kernel,
+            name="Innovator",
+            instructions="You are a creative thinker who generates novel ideas and perspectives. Offer innovative approaches and unique ideas. Feel free to brainstorm and suggest creative solutions. Keep your responses very concise, imaginative and engaging.",
+        )
+
+        agent_critic = ChatCompletionAgent(
+            kernel=kernel,
+            name="Critic",
+            instructions="You are a thoughtful critic who evaluates ideas and identifies potential issues. Analyze the strengths and weaknesses of proposals and suggest improvements. Be constructive in your criticism. Keep your responses very concise, clear and straightforward.",
+        )
+
+        agent_synthesizer = ChatCompletionAgent(
+            kernel=kernel,
+            name="Synthesizer",
+            instructions="You are a skilled synthesizer who integrates diverse perspectives into coherent conclusions. Identify common themes across different viewpoints and create a balanced, integrated perspective. Keep your responses very concise, clear and straightforward."
+            + (
+                f" When the perspectives add up to a conclusion, end your response with {request.completion_marker}"
+                if request.completion_marker
+                else ""
+            ),
+        )
+
+        agents = [agent_factual, agent_creative, agent_critic, agent_synthesizer]
+
+    # Stop early on a completion marker, converging turns or a spent token
+    # budget, when requested; otherwise after max_iterations turns
+    termination_strategy = make_termination_strategy(
+        request.max_iterations,
+        completion_marker=request.completion_marker,
+        similarity_threshold=request.convergence_threshold,
+        token_budget=request.token_budget,
+    )
+
+    # Take turns in order; run_group_chat drives the agents with these strategies
+    selection_strategy = TrackingSelectionStrategy()
+
+    # Create a chat history
+    chat_history = ChatHistory()
+
+    # Add previous messages from the chat history if available
+    for msg in request.chat_history:
+        if msg["role"].lower() == "user":
+            chat_history.add_user_message(msg["content"])
+        elif msg["role"].lower() == "assistant":
+            chat_history.add_assistant_message(msg["content"])
+
+    # Add the current user message
+    chat_history.add_user_message(request.message)
+    return agents, selection_strategy, chat_history, termination_strategy
+
+
+async def _run_multi_chat(
+    request: MultiAgentRequest, kernel: Kernel, on_chunk: Optional[OnChunk] = None
+) -> Dict[str, Any]:
+    """
+    Run a multi-agent conversation, streaming the agents' answers to `on_chunk` if given.
+    """
+    agents, selection_strategy, chat_history, termination_strategy = _create_group_chat(
+        request, kernel
+    )
+
+    # Pick the synthesizer before running anything, so a bad name fails fast
+    if request.orchestration == "parallel":
+        synthesizer = select_synthesizer(agents, request.synthesizer)
+
+    # Create execution settings
+    execution_settings = AzureChatPromptExecutionSettings(
+        service_id="chat",
+        temperature=request.temperature,
+        top_p=0.8,
+        max_tokens=1000,
+    )
+
+    # Set up function calling behavior
+    execution_settings.function_choice_behavior = FunctionChoiceBehavior.Auto()
+
+    # Every mode invokes the agents with the same settings, each with its own copy
+    arguments = KernelArguments(settings=execution_settings)
+
+    # Track agent responses
+    agent_responses = []
+    current_agent = None
+
+    # In parallel mode, the independent agents answer at once and the
+    # synthesizer aggregates their answers in a single turn
+    if request.orchestration == "parallel":
+        answers = await fan_out_fan_in(
+            agents,
+            synthesizer,
+            chat_history,
+            arguments=arguments,
+            max_concurrency=request.max_concurrency,
+            on_chunk=on_chunk,
+        )
+        agent_responses = [
+            {"agent_name": answer.name, "content": answer.content, "is_new": True}
+            for answer in answers
+        ]
+    else:
+        # Run the agents' turns with the group chat strategies, streaming them
+        # to on_chunk if given
+        answers = await run_group_chat(
+            agents,
+            chat_history,
+            selection_strategy,
+            termination_strategy,
+            on_chunk,
+            arguments=arguments,
+        )
+        for answer in answers:
+            agent_responses.append(
+                {
+                    "agent_name": answer.name,
+                    "content": answer.content,
+                    "is_new": current_agent != answer.name,
+                }
+            )
+            current_agent = answer.name
+
+    # Extract function calls from the chat history
+    plugin_calls = _plugin_calls(chat_history)
+
+    # Return the agent responses along with the updated chat history and plugin calls
+    return {
+        "agent_responses": agent_responses,
+        "chat_history": [{"role": "user", "content": request.message}]
+        + [
+            {
+                "role": "assistant",
+                "content": resp["content"],
+                "agent_name": resp["agent_name"],
+            }
+            for resp in agent_responses
+        ],
+        "plugin_calls": plugin_calls,
+        "orchestration": request.orchestration,
+        "termination": (
+            termination_strategy.report()
+            if request.orchestration == "sequential"
+            else None
+        ),
+    }
+
+
 @router.post("/multi-chat")
 async def multi_agent_chat(request: MultiAgentRequest):
+    if request.orchestration not in ORCHESTRATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown orchestration '{request.orchestration}', expected one of {', '.join(ORCHESTRATIONS)}",
+        )
+
     # Create a fresh kernel with the requested plugins
     kernel, _ = create_kernel(plugins=request.available_plugins)
 
     try:
-        # Create agents based on the provided configurations
-        agents = []
-        for agent_config in request.agent_configs:
-            agent = ChatCompletionAgent(
-                kernel=kernel,
-                name=agent_config.get("name", "Agent"),
-                instructions=agent_config.get(
-                    "instructions", "You are a helpful assistant."
-                ),
-            )
-            agents.append(agent)
-
-        # If no agents were provided, create default agents
-        if not agents:
-            # Create default agents with different perspectives
-            agent_factual = ChatCompletionAgent(
-                kernel=kernel,
-                name="Researcher",
-                instructions="You are a fact-based researcher who provides accurate and concise information. Always stick to verified facts and cite sources when possible. Keep your responses very concise, clear and straightforward.",
-            )
+        return await _run_multi_chat(request, kernel)
+    except ServiceInvalidRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in multi_agent_chat: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-            agent_creative = ChatCompletionAgent(
-                kernel=kernel,
-                name="Innovator",
-                instructions="You are a creative thinker who generates novel ideas and perspectives. Offer innovative approaches and unique ideas. Feel free to brainstorm and suggest creative solutions. Keep your responses very concise, imaginative and engaging.",
-            )
 
-            agent_critic = ChatCompletionAgent(
-                kernel=kernel,
-                name="Critic",
-                instructions="You are a thoughtful critic who evaluates ideas and identifies potential issues. Analyze the strengths and weaknesses of proposals and suggest improvements. Be constructive in your criticism. Keep your responses very concise, clear and straightforward.",
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _event_stream(
+    kernel: Kernel,
+    run: Callable[[OnChunk], Awaitable[Dict[str, Any]]],
+    name: str,
+) -> StreamingResponse:
+    """
+    Stream a chat run as Server-Sent Events.
+
+    "delta" events carry text as the agents generate it, tagged with agent_name,
+    and "function_call" events are sent as each plugin function is invoked. The
+    run's result follows in a "done" event, with the time to the first delta, or
+    an "error" event if the run fails. The run starts when the client starts
+    reading and is cancelled if it disconnects.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def on_chunk(agent_name: str, content: str) -> None:
+        queue.put_nowait(("delta", {"agent_name": agent_name, "content": content}))
+
+    async def function_call_filter(
+        context: AutoFunctionInvocationContext,
+        next: Callable[[AutoFunctionInvocationContext], Awaitable[None]],
+    ) -> None:
+        queue.put_nowait(
+            (
+                "function_call",
+                {
+                    "agent_name": active_agent.get(),
+                    "plugin_name": context.function.plugin_name,
+                    "function_name": context.function.name,
+                    "parameters": dict(context.arguments or {}),
+                },
             )
+        )
+        await next(context)
 
-            agent_synthesizer = ChatCompletionAgent(
-                kernel=kernel,
-                name="Synthesizer",
-                instructions="You are a skilled synthesizer who integrates diverse perspectives into coherent conclusions. Identify common themes across different viewpoints and create a balanced, integrated perspective. Keep your responses very concise, clear and straightforward.",
+    kernel.add_filter("auto_function_invocation", function_call_filter)
+
+    async def events():
+        started = time.perf_counter()
+        first_delta = None
+        task = asyncio.ensure_future(run(on_chunk))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while (item := await queue.get()) is not None:
+                event, data = item
+                if event == "delta" and first_delta is None:
+                    first_delta = time.perf_counter() - started
+                yield _sse(event, data)
+            result = task.result()
+            yield _sse(
+                "done",
+                {
+                    **result,
+                    "time_to_first_token_ms": (
+                        None if first_delta is None else round(first_delta * 1000, 1)
+                    ),
+                    "elapsed_seconds": round(time.perf_counter() - started, 3),
+                },
             )
+        except Exception as e:
+            logger.error(f"Error in {name}: {str(e)}")
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            task.cancel()
 
-            agents = [agent_factual, agent_creative, agent_critic, agent_synthesizer]
+    return StreamingResponse(events(), media_type="text/event-stream")
 
-        # Create a group chat with the agents
-        group_chat = AgentGroupChat(
-            agents=agents,
-            selection_strategy=SequentialSelectionStrategy(),
-            termination_strategy=DefaultTerminationStrategy(
-                maximum_iterations=request.max_iterations
-            ),
-        )
 
-        # Create a chat history
-        chat_history = ChatHistory()
-        group_chat.history = chat_history
-
-        # Add previous messages from the chat history if available
-        for msg in request.chat_history:
-            if msg["role"].lower() == "user":
-                chat_history.add_user_message(msg["content"])
-            elif msg["role"].lower() == "assistant":
-                chat_history.add_assistant_message(msg["content"])
+@router.post("/chat/stream")
+async def agent_chat_stream(request: AgentRequest):
+    """
+    /agent/chat as Server-Sent Events, streaming the answer as it is generated.
+    """
+    # Create a fresh kernel with the requested plugins
+    kernel, _ = create_kernel(plugins=request.available_plugins)
 
-        # Add the current user message
-        await group_chat.add_chat_message(message=request.message)
+    async def run(on_chunk: OnChunk) -> Dict[str, Any]:
+        agent, chat_history = _create_agent_chat(request, kernel)
+
+        # A cached answer is sent as a single delta
+        cached, embedding, cache_scope = await _lookup_agent_chat(request, chat_history)
+        if cached is not None:
+            await on_chunk(agent.name, cached)
+            return {
+                "response": cached,
+                "chat_history": [
+                    {"role": "user", "content": request.message},
+                    {"role": "assistant", "content": cached},
+                ],
+                "plugin_calls": [],
+            }
 
-        # Create execution settings
         execution_settings = AzureChatPromptExecutionSettings(
             service_id="chat",
             temperature=request.temperature,
             top_p=0.8,
             max_tokens=1000,
         )
-
-        # Set up function calling behavior
         execution_settings.function_choice_behavior = FunctionChoiceBehavior.Auto()
 
-        # Track agent responses
-        agent_responses = []
-        current_agent = None
-
-        # Invoke the group chat
-        try:
-            async for response in group_chat.invoke():
-                if response is not None and response.name:
-                    # Add a separator between different agents
-                    if current_agent != response.name:
-                        current_agent = response.name
-                        agent_responses.append(
-                            {
-                                "agent_name": response.name,
-                                "content": response.content,
-                                "is_new": True,
-                            }
-                        )
-                    else:
-                        # Same agent continuing
-                        agent_responses.append(
-                            {
-                                "agent_name": response.name,
-                                "content": response.content,
-                                "is_new": False,
-                            }
-                        )
-        except Exception as e:
-            logger.error(f"Error during group chat invocation: {str(e)}")
-            raise HTTPException(
-                status_code=500, detail=f"Error during group chat invocation: {str(e)}"
+        active_agent.set(agent.name)
+        thread = ChatHistoryAgentThread()
+        async for item in agent.invoke_stream(
+            messages=chat_history.messages,
+            thread=thread,
+            arguments=KernelArguments(settings=execution_settings),
+        ):
+            if item.message.content:
+                await on_chunk(agent.name, item.message.content)
+
+        messages = [message async for message in thread.get_messages()]
+        response = messages[-1]
+        plugin_calls = _plugin_calls(messages[len(chat_history.messages) :])
+
+        # Plugin results are live data, so only plain answers are cached
+        if not plugin_calls:
+            semantic_cache.store(
+                "agent_chat",
+                embedding,
+                str(response.content),
+                tokens=message_tokens(response),
+                scope=cache_scope,
             )
 
-        # Track function calls
-        plugin_calls = []
-
-        # Extract function calls from the chat history
-        for message in chat_history:
-            for item in message.items:
-                if isinstance(item, FunctionCallContent):
-                    # Convert arguments to a dictionary if it's a string
-                    args = item.arguments
-                    if isinstance(args, str):
-                        try:
-                            args = json.loads(args)
-                        except:
-                            args = {"location": args}
-
-                    plugin_calls.append(
-                        {
-                            "plugin_name": item.plugin_name,
-                            "function_name": item.function_name,
-                            "parameters": args,
-                        }
-                    )
-
-        # Reset is_complete to allow for further conversations
-        group_chat.is_complete = False
-
-        # Return the agent responses along with the updated chat history and plugin calls
         return {
-            "agent_responses": agent_responses,
-            "chat_history": [{"role": "user", "content": request.message}]
-            + [
-                {
-                    "role": "assistant",
-                    "content": resp["content"],
-                    "agent_name": resp["agent_name"],
-                }
-                for resp in agent_responses
+            "response": response.content,
+            "chat_history": [
+                {"role": "user", "content": request.message},
+                {"role": "assistant", "content": response.content},
             ],
             "plugin_calls": plugin_calls,
         }
+
+    return _event_stream(kernel, run, "agent_chat_stream")
+
+
+@router.post("/multi-chat/stream")
+async def multi_agent_chat_stream(request: MultiAgentRequest):
+    """
+    /agent/multi-chat as Server-Sent Events, streaming each agent's answer as it
+    is generated (interleaved across agents in parallel mode).
+    """
+    if request.orchestration not in ORCHESTRATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown orchestration '{request.orchestration}', expected one of {', '.join(ORCHESTRATIONS)}",
+        )
+
+    # Create a fresh kernel with the requested plugins
+    kernel, _ = create_kernel(plugins=request.available_plugins)
+    return _event_stream(
+        kernel,
+        lambda on_chunk: _run_multi_chat(request, kernel, on_chunk),
+        "multi_agent_chat_stream",
+    )
+
+
+async def _summarize_history(summary: str, transcript: str) -> str:
+    kernel, _ = create_kernel()
+    result = await kernel.invoke(
+        summarize_history_fn,
+        KernelArguments(summary=summary or "(none yet)", transcript=transcript),
+    )
+    return str(result)
+
+
+@router.post("/sessions")
+async def create_agent_session(request: AgentSessionRequest):
+    """
+    Start a conversation kept on the server, so each message sends only itself.
+    """
+    session = agent_sessions.create(
+        request.system_prompt, request.temperature, request.available_plugins
+    )
+    return {"status": "success", "session_id": session.id}
+
+
+@router.get("/sessions/{session_id}")
+async def get_agent_session(session_id: str):
+    session = agent_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    return session.describe()
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_agent_session(session_id: str):
+    if agent_sessions.get(session_id) is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    agent_sessions.delete(session_id)
+    return {"status": "success", "message": f"Session {session_id} ended"}
+
+
+@router.post("/sessions/{session_id}/chat")
+async def agent_session_chat(session_id: str, request: AgentSessionMessage):
+    """
+    Send a message in an agent session.
+
+    The agent sees the session's summary of older turns and its recent turns
+    verbatim, so the prompt stays within the session token budget however long
+    the conversation runs.
+    """
+    session = agent_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+
+    try:
+        async with session.lock:
+            kernel, _ = create_kernel(plugins=session.plugins)
+            agent = ChatCompletionAgent(
+                kernel=kernel, name="PlaygroundAgent", instructions=session.instructions()
+            )
+
+            chat_history = ChatHistory()
+            for user, assistant, _ in session.turns:
+                chat_history.add_user_message(user)
+                chat_history.add_assistant_message(assistant)
+            chat_history.add_user_message(request.message)
+
+            execution_settings = AzureChatPromptExecutionSettings(
+                service_id="chat",
+                temperature=session.temperature,
+                top_p=0.8,
+                max_tokens=1000,
+            )
+            execution_settings.function_choice_behavior = FunctionChoiceBehavior.Auto()
+
+            response = await agent.get_response(
+                messages=chat_history.messages,
+                thread=ChatHistoryAgentThread(),
+                arguments=KernelArguments(settings=execution_settings),
+            )
+            messages = [message async for message in response.thread.get_messages()]
+            plugin_calls = _plugin_calls(messages[len(chat_history.messages) :])
+
+            session.add_turn(request.message, str(response.content))
+
+        # Fold older turns into the summary after replying, not before
+        agent_sessions.schedule_compaction(session, _summarize_history)
+
+        return {
+            "session_id": session.id,
+            "response": str(response.content),
+            "plugin_calls": plugin_calls,
+            "turns": session.total_turns,
+            "history_tokens": session.history_tokens,
+        }
     except Exception as e:
-        logger.error(f"Error in multi_agent_chat: {str(e)}")
+        logger.error(f"Error in agent_session_chat: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,20 +1,50 @@
 import logging
 from fastapi import APIRouter, HTTPException
-from app.models.api_models import FunctionInput, TranslationRequest, SummarizeRequest
-from app.core.kernel import create_kernel
+from app.models.api_models import (
+    FunctionInput,
+    FunctionRegistration,
+    NamedFunctionInput,
+    TranslationRequest,
+    SummarizeRequest,
+)
+from app.core.kernel import create_kernel, prompt_registry, semantic_cache
+from app.core.semantic_cache import function_result_tokens
+from semantic_kernel.functions import KernelArguments
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["functions"])
 
+# Register the built-in prompt functions once, so they are compiled a single time
+# and can also be invoked by name
+translate_fn = prompt_registry.register(
+    prompt="""
+        {{$input}}\n\nTranslate this into {{$target_language}}:""",
+    function_name="translator",
+    plugin_name="Translator",
+    description="Translates the input into the target language.",
+    reserved=True,
+    max_tokens=500,
+)
+
+summarize_fn = prompt_registry.register(
+    prompt="""
+        {{$input}}\n\nTL;DR in one sentence:""",
+    function_name="tldr",
+    plugin_name="Summarizer",
+    description="Summarizes the input in one sentence.",
+    reserved=True,
+    max_tokens=100,
+)
+
 
 @router.post("/functions/semantic")
 async def invoke_semantic_function(data: FunctionInput):
     kernel, _ = create_kernel()
     try:
-        # Create a semantic function
-        function = kernel.add_function(
+        # Get the compiled semantic function for this prompt
+        function = prompt_registry.get_or_compile(
             prompt=data.prompt,
             function_name=data.function_name,
             plugin_name=data.plugin_name,
@@ -23,9 +53,27 @@ async def invoke_semantic_function(data: FunctionInput):
 
         # Prepare parameters
         parameters = data.parameters or {}
+        arguments = KernelArguments(input=data.input_text, **parameters)
+
+        # Reuse the answer to a near-duplicate prompt if there is one
+        embedding = None
+        if semantic_cache.enabled:
+            rendered_prompt = await function.prompt_template.render(kernel, arguments)
+            cached, embedding = await semantic_cache.lookup(
+                "functions_semantic", rendered_prompt
+            )
+            if cached is not None:
+                return {"result": cached}
 
         # Invoke the function
-        result = await kernel.invoke(function, input=data.input_text, **parameters)
+        result = await kernel.invoke(function, arguments)
+
+        semantic_cache.store(
+            "functions_semantic",
+            embedding,
+            str(result),
+            tokens=function_result_tokens(result),
+        )
 
         return {"result": str(result)}
     except Exception as e:
@@ -33,21 +81,62 @@ async def invoke_semantic_function(data: FunctionInput):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/functions/register")
+async def register_semantic_function(data: FunctionRegistration):
+    try:
+        # Compile the semantic function once and keep it under its name
+        function = prompt_registry.register(
+            prompt=data.prompt,
+            function_name=data.function_name,
+            plugin_name=data.plugin_name,
+            description=data.description,
+            max_tokens=data.max_tokens,
+        )
+
+        return {
+            "status": "success",
+            "message": f"Registered function {data.plugin_name}/{data.function_name}",
+            "parameters": [p.name for p in function.parameters],
+        }
+    except Exception as e:
+        logger.error(f"Error in register_semantic_function: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/functions/registered")
+async def list_registered_functions():
+    return {"functions": prompt_registry.list_functions(), "status": "success"}
+
+
+@router.post("/functions/{plugin_name}/{function_name}/invoke")
+async def invoke_registered_function(
+    plugin_name: str, function_name: str, data: NamedFunctionInput
+):
+    function = prompt_registry.get(plugin_name, function_name)
+    if function is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Function {plugin_name}/{function_name} is not registered",
+        )
+
+    kernel, _ = create_kernel()
+    try:
+        # Prepare parameters
+        parameters = data.parameters or {}
+
+        # Invoke the registered function
+        result = await kernel.invoke(function, input=data.input_text, **parameters)
+
+        return {"result": str(result)}
+    except Exception as e:
+        logger.error(f"Error in invoke_registered_function: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/translate")
 async def translate_text(request: TranslationRequest):
     kernel, _ = create_kernel()
     try:
-        # Define a translation function
-        translate_prompt = """
-        {{$input}}\n\nTranslate this into {{$target_language}}:"""
-
-        translate_fn = kernel.add_function(
-            prompt=translate_prompt,
-            function_name="translator",
-            plugin_name="Translator",
-            max_tokens=500,
-        )
-
         # Invoke the translation function
         result = await kernel.invoke(
             translate_fn, input=request.text, target_language=request.target_language
@@ -63,17 +152,6 @@ async def translate_text(request: TranslationRequest):
 async def summarize_text(request: SummarizeRequest):
     kernel, _ = create_kernel()
     try:
-        # Define a summarization function
-        summarize_prompt = """
-        {{$input}}\n\nTL;DR in one sentence:"""
-
-        summarize_fn = kernel.add_function(
-            prompt=summarize_prompt,
-            function_name="tldr",
-            plugin_name="Summarizer",
-            max_tokens=100,
-        )
-
         # Invoke the summarization function
         result = await kernel.invoke(summarize_fn, input=request.text)
 
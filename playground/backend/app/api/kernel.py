@@ -1,7 +1,14 @@
 import logging
 from fastapi import APIRouter, HTTPException
 from app.models.api_models import KernelResetRequest
-from app.core.kernel import create_kernel, reset_memory
+from app.core.kernel import (
+    create_kernel,
+    reset_memory,
+    response_cache,
+    semantic_cache,
+    invocation_coalescer,
+    get_embedding_stats,
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -18,15 +25,7 @@ async def reset_kernel(request: KernelResetRequest):
         # Clear memory if requested
         if request.clear_memory:
             await reset_memory()
-            # Update the memory initialization flag in the memory module
-            try:
-                from app.api.memory import memory_initialized
-                import app.api.memory as memory_module
-
-                memory_module.memory_initialized = True
-                logger.info("Memory reset and reinitialized")
-            except ImportError:
-                logger.warning("Could not update memory_initialized flag")
+            logger.info("Memory reset and reinitialized")
 
         return {
             "status": "success",
@@ -36,3 +35,25 @@ async def reset_kernel(request: KernelResetRequest):
     except Exception as e:
         logger.error(f"Error in reset_kernel: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    return {
+        "response_cache": response_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "kernel_invocation_coalescing": invocation_coalescer.flights.stats(),
+        "embeddings": get_embedding_stats(),
+        "status": "success",
+    }
+
+
+@router.post("/cache/clear")
+async def clear_cache():
+    try:
+        await response_cache.clear()
+        semantic_cache.clear()
+        return {"status": "success", "message": "Response caches cleared"}
+    except Exception as e:
+        logger.error(f"Error in clear_cache: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
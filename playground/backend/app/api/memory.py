@@ -1,33 +1,64 @@
+import json
 import logging
-from fastapi import APIRouter, HTTPException
-from app.models.api_models import MemoryItem, SearchQuery
+import tempfile
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from semantic_kernel.exceptions import (
+    ServiceInvalidRequestError,
+    ServiceResourceNotFoundError,
+)
+from app.models.api_models import (
+    BatchSearchQuery,
+    DedupConfig,
+    IndexConfig,
+    MemoryDeleteRequest,
+    MemoryItem,
+    MemoryUpsertRequest,
+    SearchQuery,
+)
 from app.core.kernel import (
     create_kernel,
-    FINANCE_COLLECTION,
-    PERSONAL_COLLECTION,
-    WEATHER_COLLECTION,
-    initialize_memory,
+    ensure_memory_initialized,
+    get_memory_store,
+    SEARCH_MODES,
+    metadata_json,
+    remove_stale_chunks,
+    save_memories,
+    search_memories,
 )
+from app.core.ingest import IngestProgress, document_items, ingest, ndjson_items
+from app.core.metadata_index import parse_metadata
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/memory", tags=["memory"])
 
-# Flag to track if memory has been initialized
-memory_initialized = False
+# Bulk uploads larger than this are spooled to disk
+SPOOL_MAX_MEMORY = 1024 * 1024
 
 
 @router.post("/add")
 async def add_to_memory(item: MemoryItem):
     _, memory_instance = create_kernel()
     try:
+        store = get_memory_store()
+        if store.dedup_index(item.collection) is not None:
+            return await _add_with_dedup(item)
+        replaced = await store.does_collection_exist(item.collection) and bool(
+            await store.get_batch(item.collection, [item.id])
+        )
         await memory_instance.save_information(
-            collection=item.collection, id=item.id, text=item.text
+            collection=item.collection,
+            id=item.id,
+            text=item.text,
+            additional_metadata=metadata_json(item.metadata),
         )
+        action = "Replaced" if replaced else "Added"
         return {
             "status": "success",
-            "message": f"Added item {item.id} to collection {item.collection}",
+            "message": f"{action} item {item.id} in collection {item.collection}",
             "synthesized_response": "",
             "critique": "",
         }
@@ -36,24 +67,202 @@ async def add_to_memory(item: MemoryItem):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _add_with_dedup(item: MemoryItem) -> Dict[str, Any]:
+    # Goes through save_memories, which checks for near-duplicates before embedding
+    counts = await save_memories(
+        [(item.collection, item.id, item.text, item.metadata)]
+    )
+    if counts["duplicates"] and not counts["created"]:
+        message = f"Item {item.id} is a near-duplicate in collection {item.collection} and was not stored"
+    else:
+        action = "Added" if counts["created"] else "Replaced"
+        message = f"{action} item {item.id} in collection {item.collection}"
+    return {
+        "status": "success",
+        "message": message,
+        "duplicate": bool(counts["duplicates"]),
+        "synthesized_response": "",
+        "critique": "",
+    }
+
+
+@router.post("/upsert")
+async def upsert_memory(request: MemoryUpsertRequest):
+    """
+    Create or update memory records, embedding only new or changed text.
+
+    Records whose text and metadata are unchanged are left as they are, and a
+    change of metadata alone keeps the stored embedding.
+    """
+    try:
+        counts = await save_memories(
+            [
+                (item.collection, item.id, item.text, item.metadata)
+                for item in request.items
+            ]
+        )
+        return {"status": "success", **counts}
+    except ServiceInvalidRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in upsert_memory: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/bulk")
+async def bulk_ingest(
+    request: Request,
+    collection: Optional[str] = None,
+    document_id: Optional[str] = None,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    batch_size: int = 64,
+    concurrency: int = 4,
+    metadata: Optional[str] = None,
+):
+    """
+    Stream memories in and report progress as NDJSON events.
+
+    The body is either NDJSON (application/x-ndjson) with one {"id", "text",
+    "collection"} object per line, where collection defaults to the `collection`
+    parameter, or a single document sent as the raw body or as the "file" field of
+    a multipart upload. Long texts are split into overlapping chunks, which are
+    embedded and stored in batches. `metadata` is a JSON object given to every
+    chunk of a document; NDJSON lines carry their own "metadata" objects.
+    """
+    if not 0 < chunk_size or not 0 <= chunk_overlap < chunk_size // 2:
+        raise HTTPException(
+            status_code=400,
+            detail="chunk_overlap must be at least 0 and less than half of chunk_size",
+        )
+    if not 0 < batch_size <= 2048 or not 0 < concurrency <= 32:
+        raise HTTPException(
+            status_code=400,
+            detail="batch_size must be 1-2048 and concurrency 1-32",
+        )
+    document_metadata = parse_metadata(metadata)
+    if metadata and not document_metadata:
+        raise HTTPException(status_code=400, detail="metadata must be a JSON object")
+
+    # The response streams progress while the body is ingested. The body cannot be
+    # read once the response has started, so it is first spooled to a temporary
+    # file as it arrives, keeping memory use flat
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Missing file upload")
+        document_id = document_id or upload.filename
+        spool = upload.file
+    else:
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        async for data in request.stream():
+            spool.write(data)
+    spool.seek(0)
+
+    progress = IngestProgress()
+    if "ndjson" in content_type or "jsonl" in content_type:
+        items = ndjson_items(
+            _read_spool(spool),
+            progress,
+            collection,
+            chunk_size,
+            chunk_overlap,
+            remove_stale_chunks,
+        )
+    elif not collection or not document_id:
+        spool.close()
+        raise HTTPException(
+            status_code=400,
+            detail="collection and document_id are required for document uploads",
+        )
+    else:
+        items = document_items(
+            _read_spool(spool),
+            progress,
+            collection,
+            document_id,
+            chunk_size,
+            chunk_overlap,
+            document_metadata,
+            remove_stale_chunks,
+        )
+
+    async def events():
+        try:
+            async for event in ingest(
+                items, save_memories, progress, batch_size, concurrency
+            ):
+                yield json.dumps(event) + "\n"
+        finally:
+            spool.close()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+async def _read_spool(spool, size: int = 65536):
+    while data := spool.read(size):
+        yield data
+
+
+def _format_match(record, relevance: float) -> Dict[str, Any]:
+    return {
+        "id": record.id,
+        "text": record.text,
+        "relevance": relevance,
+        "metadata": parse_metadata(record.additional_metadata),
+    }
+
+
+def _check_search_query(query: SearchQuery) -> None:
+    if query.limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    if query.mode not in SEARCH_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"mode must be one of {', '.join(SEARCH_MODES)}",
+        )
+
+
 @router.post("/search")
 async def search_memory(query: SearchQuery):
+    """
+    Search a collection by embedding similarity, by keywords (BM25), or both.
+
+    Lexical search needs no embedding call; hybrid search fuses the vector and
+    keyword rankings with reciprocal-rank fusion. A `filter` restricts the search
+    to records whose metadata passes it, e.g. {"tenant": "acme"}.
+    """
+    _check_search_query(query)
+
     # Ensure memory is initialized before searching
-    global memory_initialized
-    if not memory_initialized:
-        await initialize_memory()
-        memory_initialized = True
+    await ensure_memory_initialized()
 
     _, memory_instance = create_kernel()
     try:
-        results = await memory_instance.search(
-            collection=query.collection, query=query.query, limit=query.limit
-        )
+        if query.mode == "vector" and query.filter is None:
+            results = await memory_instance.search(
+                collection=query.collection, query=query.query, limit=query.limit
+            )
 
-        # Format the results to match what the frontend expects
-        formatted_results = [
-            {"id": r.id, "text": r.text, "relevance": r.relevance} for r in results
-        ]
+            # Format the results to match what the frontend expects
+            formatted_results = [_format_match(r, r.relevance) for r in results]
+        else:
+            (matches,) = await search_memories(
+                [
+                    (
+                        query.collection,
+                        query.query,
+                        query.limit,
+                        query.mode,
+                        query.filter,
+                    )
+                ]
+            )
+            formatted_results = [
+                _format_match(record, relevance) for record, relevance in matches
+            ]
 
         # Return the results with empty synthesized_response and critique fields
         # to match the format the frontend expects
@@ -62,30 +271,182 @@ async def search_memory(query: SearchQuery):
             "synthesized_response": "",
             "critique": "",
         }
+    except ServiceInvalidRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error in search_memory: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/search/batch")
+async def search_memory_batch(batch: BatchSearchQuery):
+    """
+    Run many searches, possibly across collections, in one request.
+
+    The queries are embedded with one batched call and each collection is scored
+    against all of its queries at once; results are returned in query order.
+    """
+    for query in batch.queries:
+        _check_search_query(query)
+
+    # Ensure memory is initialized before searching
+    await ensure_memory_initialized()
+
+    try:
+        matches = await search_memories(
+            [
+                (query.collection, query.query, query.limit, query.mode, query.filter)
+                for query in batch.queries
+            ]
+        )
+        return {
+            "results": [
+                {
+                    "collection": query.collection,
+                    "query": query.query,
+                    "results": [
+                        _format_match(record, relevance) for record, relevance in found
+                    ],
+                }
+                for query, found in zip(batch.queries, matches)
+            ],
+            "synthesized_response": "",
+            "critique": "",
+        }
+    except ServiceInvalidRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in search_memory_batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/collections")
 async def get_collections():
+    """
+    List the collections in the memory store, with live statistics for each.
+
+    `details` holds the record count, embedding dimension, vector bytes, index
+    type, last write time and average search latency of each collection, read
+    from counters the store keeps up to date rather than by scanning it.
+    """
     try:
         # Initialize memory if not already done
-        global memory_initialized
-        if not memory_initialized:
-            await initialize_memory()
-            memory_initialized = True
-            logger.info("Memory initialized on first access to collections")
+        await ensure_memory_initialized()
 
-        # Return the predefined collections
+        descriptions = await get_memory_store().describe_collections()
         return {
-            "collections": [
-                FINANCE_COLLECTION,
-                PERSONAL_COLLECTION,
-                WEATHER_COLLECTION,
+            "collections": list(descriptions),
+            "details": [
+                {"name": name, **description}
+                for name, description in descriptions.items()
             ],
             "status": "success",
         }
     except Exception as e:
         logger.error(f"Error in get_collections: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/collections/{collection}/records/{id}")
+async def delete_memory(collection: str, id: str):
+    await ensure_memory_initialized()
+    try:
+        await get_memory_store().remove(collection, id)
+        return {"status": "success", "collection": collection, "deleted": [id]}
+    except ServiceResourceNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in delete_memory: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/collections/{collection}/delete")
+async def delete_memories(collection: str, request: MemoryDeleteRequest):
+    """
+    Delete records by id, by metadata filter, or the records matching both.
+
+    Records are tombstoned and the store compacts them later, so deleting a few
+    records does not rebuild the collection.
+    """
+    if request.ids is None and request.filter is None:
+        raise HTTPException(status_code=400, detail="ids or filter is required")
+    await ensure_memory_initialized()
+    try:
+        deleted = await get_memory_store().remove_matching(
+            collection, request.ids, request.filter
+        )
+        return {"status": "success", "collection": collection, "deleted": deleted}
+    except ServiceResourceNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ServiceInvalidRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in delete_memories: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/collections/{collection}/index")
+async def get_collection_index(collection: str):
+    await ensure_memory_initialized()
+    try:
+        return {"collection": collection, "index": get_memory_store().describe_index(collection)}
+    except ServiceResourceNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.put("/collections/{collection}/index")
+async def configure_collection_index(collection: str, config: IndexConfig):
+    """
+    Select exact search or an IVF index, with its recall/latency parameters, for a collection.
+    """
+    await ensure_memory_initialized()
+    params = {}
+    if config.index_type == "ivf":
+        params = {"nprobe": config.nprobe, "train_size": config.train_size}
+        if config.nlist:
+            params["nlist"] = config.nlist
+    try:
+        index = get_memory_store().configure_index(
+            collection, config.index_type, **params
+        )
+        return {"status": "success", "collection": collection, "index": index}
+    except ServiceResourceNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ServiceInvalidRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in configure_collection_index: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/collections/{collection}/dedup")
+async def get_collection_dedup(collection: str):
+    await ensure_memory_initialized()
+    try:
+        return {"collection": collection, "dedup": get_memory_store().describe_dedup(collection)}
+    except ServiceResourceNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.put("/collections/{collection}/dedup")
+async def configure_collection_dedup(collection: str, config: DedupConfig):
+    """
+    Set how a collection treats new near-duplicate texts, or turn detection off.
+
+    With MEMORY_STORE_PATH the setting is saved with the collection, so it holds
+    for every worker and across restarts.
+    """
+    await ensure_memory_initialized()
+    params = {}
+    if config.policy != "off":
+        params = {"max_distance": config.max_distance, "scope": config.scope}
+    try:
+        dedup = get_memory_store().configure_dedup(collection, config.policy, **params)
+        return {"status": "success", "collection": collection, "dedup": dedup}
+    except ServiceResourceNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ServiceInvalidRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in configure_collection_dedup: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,15 +1,14 @@
 import logging
-import json
 from fastapi import APIRouter, HTTPException
 from app.models.api_models import WeatherRequest
 from app.core.kernel import create_kernel
+from app.core.function_capture import FunctionCapture
 from semantic_kernel.connectors.ai.open_ai import AzureChatPromptExecutionSettings
 from semantic_kernel.contents.chat_history import ChatHistory
 from semantic_kernel.connectors.ai.function_choice_behavior import (
     FunctionChoiceBehavior,
 )
 from semantic_kernel.agents import ChatCompletionAgent
-from semantic_kernel.contents import FunctionCallContent
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -19,14 +18,10 @@ router = APIRouter(tags=["weather"])
 
 @router.post("/weather")
 async def get_weather(request: WeatherRequest):
-    kernel, _ = create_kernel()
+    # Create a fresh kernel with the Weather plugin registered
+    kernel, _ = create_kernel(plugins=["Weather"])
+    capture = FunctionCapture().install(kernel)
     try:
-        # Register the Weather plugin
-        from app.plugins.weather import WeatherPlugin
-
-        weather_plugin = WeatherPlugin()
-        kernel.add_plugin(weather_plugin, "Weather")
-
         # Create a system message for the chat
         system_message = """
         You are a helpful weather assistant. When asked about weather, use the Weather plugin to get accurate information.
@@ -51,72 +46,20 @@ async def get_weather(request: WeatherRequest):
             messages=chat_history, execution_settings=execution_settings
         )
 
-        # Track function calls and results
-        function_calls = []
-        current_weather = None
-        forecast = None
-        alerts = None
-
-        # Extract function calls from the chat history
-        for message in chat_history:
-            for item in message.items:
-                if isinstance(item, FunctionCallContent):
-                    function_call = {
-                        "plugin_name": item.plugin_name,
-                        "function_name": item.function_name,
-                        "parameters": item.arguments,
-                    }
-                    function_calls.append(function_call)
-
-                    # Execute the function and store results
-                    if item.function_name == "get_current_weather":
-                        # Convert arguments to a dictionary if it's a string
-                        args = item.arguments
-                        if isinstance(args, str):
-                            try:
-                                args = json.loads(args)
-                            except:
-                                args = {"location": args}
-
-                        current_weather = await kernel.invoke(
-                            kernel.plugins["Weather"]["get_current_weather"], **args
-                        )
-                        if not isinstance(current_weather, dict):
-                            current_weather = current_weather.value
-
-                    elif item.function_name == "get_forecast":
-                        # Convert arguments to a dictionary if it's a string
-                        args = item.arguments
-                        if isinstance(args, str):
-                            try:
-                                args = json.loads(args)
-                            except:
-                                args = {"location": args}
-
-                        # Default to 3 days if not specified
-                        if "days" not in args:
-                            args["days"] = 3
-
-                        forecast = await kernel.invoke(
-                            kernel.plugins["Weather"]["get_forecast"], **args
-                        )
-                        if not isinstance(forecast, list):
-                            forecast = forecast.value
-
-                    elif item.function_name == "get_weather_alert":
-                        # Convert arguments to a dictionary if it's a string
-                        args = item.arguments
-                        if isinstance(args, str):
-                            try:
-                                args = json.loads(args)
-                            except:
-                                args = {"location": args}
-
-                        alerts = await kernel.invoke(
-                            kernel.plugins["Weather"]["get_weather_alert"], **args
-                        )
-                        if not isinstance(alerts, dict):
-                            alerts = alerts.value
+        # Reuse the results the agent's function calls produced, rather than
+        # invoking the functions again
+        function_calls = [
+            {
+                "plugin_name": call["plugin_name"],
+                "function_name": call["function_name"],
+                "parameters": call["parameters"],
+                "duration_ms": call["duration_ms"],
+            }
+            for call in capture.calls
+        ]
+        current_weather = capture.last_result("get_current_weather", "Weather")
+        forecast = capture.last_result("get_forecast", "Weather")
+        alerts = capture.last_result("get_weather_alert", "Weather")
 
         # Prepare response
         result = {"assistant_response": str(response), "function_calls": function_calls}
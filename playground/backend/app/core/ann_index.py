@@ -0,0 +1,260 @@
+import logging
+import math
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Rows scored per matrix product while assigning vectors to centroids
+ASSIGN_CHUNK_SIZE = 8192
+
+
+class IVFFlatIndex:
+    """
+    Inverted-file (IVF-flat) approximate nearest-neighbour index.
+
+    Vectors are clustered around `nlist` centroids with spherical k-means, and each
+    centroid keeps an inverted list of the rows assigned to it. A search scores only
+    the rows in the `nprobe` lists whose centroids are closest to the query, so a
+    larger nprobe gives better recall at a higher latency.
+
+    The index only stores row numbers; the normalized vectors stay in the owning
+    VectorCollection. It is trained once the collection reaches `train_size` rows,
+    and retrained when the collection has grown `retrain_growth` times since.
+
+    `build` computes the centroids and inverted lists without touching the index,
+    so that it can run in a worker thread, and `install` swaps them in.
+    """
+
+    def __init__(
+        self,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        train_size: int = 1000,
+        iterations: int = 10,
+        retrain_growth: float = 4.0,
+        seed: int = 0,
+    ):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_size = train_size
+        self.iterations = iterations
+        self.retrain_growth = retrain_growth
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_on = 0
+        self._lists: List[np.ndarray] = []
+        self._counts = np.empty(0, dtype=np.int64)
+        self._assignment = np.empty(0, dtype=np.int64)
+        self._position = np.empty(0, dtype=np.int64)
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def needs_training(self, live_rows: int) -> bool:
+        if not self.trained:
+            return live_rows >= self.train_size
+        return live_rows >= self.trained_on * self.retrain_growth
+
+    def fit(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Learn centroids from normalized vectors with spherical k-means, leaving the index unchanged.
+        """
+        rng = np.random.default_rng(self.seed)
+        nlist = self.nlist or max(1, int(math.sqrt(len(vectors))))
+        nlist = min(nlist, len(vectors))
+
+        # Train on a sample, which is plenty to place the centroids
+        sample_size = min(len(vectors), nlist * 64)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(self.iterations):
+            assignment = self._nearest(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=nlist)
+            # Re-seed empty clusters with random sample points
+            empty = np.flatnonzero(counts == 0)
+            sums[empty] = sample[rng.choice(sample_size, len(empty))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.where(norms == 0, 1, norms)
+
+        logger.info(f"Trained IVF index with {nlist} lists on {len(vectors)} vectors")
+        return centroids.astype(np.float32)
+
+    def train(self, vectors: np.ndarray) -> None:
+        """
+        Learn the centroids from normalized vectors, emptying the inverted lists.
+        """
+        self.centroids = self.fit(vectors)
+        self.trained_on = len(vectors)
+        self.clear()
+
+    def build(self, rows: np.ndarray, vectors: np.ndarray) -> Dict[str, Any]:
+        """
+        Train on the given rows and assign each of them, returning the state for `install`.
+        """
+        centroids = self.fit(vectors)
+        targets = self._nearest(vectors, centroids)
+        return {
+            "centroids": centroids,
+            "trained_on": len(vectors),
+            **self._bucket(rows, targets, len(centroids)),
+        }
+
+    def install(self, built: Dict[str, Any]) -> None:
+        """
+        Replace the centroids and inverted lists with the output of `build`.
+        """
+        self.centroids = built["centroids"]
+        self.trained_on = built["trained_on"]
+        self._lists = built["lists"]
+        self._counts = built["counts"]
+        self._assignment = built["assignment"]
+        self._position = built["position"]
+
+    def renumber(self, keep: np.ndarray) -> None:
+        """
+        Keep only the rows in `keep`, renumbered to their positions in it.
+        """
+        if not self.trained:
+            return
+        assignment = np.full(len(keep), -1, dtype=np.int64)
+        known = keep < len(self._assignment)
+        assignment[known] = self._assignment[keep[known]]
+        rows = np.flatnonzero(assignment >= 0)
+        self.install(
+            {
+                "centroids": self.centroids,
+                "trained_on": self.trained_on,
+                **self._bucket(rows, assignment[rows], len(self.centroids)),
+            }
+        )
+
+    @staticmethod
+    def _bucket(rows: np.ndarray, targets: np.ndarray, nlist: int) -> Dict[str, Any]:
+        """
+        Lay out rows in the inverted lists of their assigned centroids, all at once.
+        """
+        order = np.argsort(targets, kind="stable")
+        counts = np.bincount(targets, minlength=nlist).astype(np.int64)
+        starts = np.cumsum(counts) - counts
+        sorted_rows = rows[order]
+        lists = []
+        for start, count in zip(starts, counts):
+            inverted = np.empty(max(16, int(count)), dtype=np.int64)
+            inverted[:count] = sorted_rows[start : start + count]
+            lists.append(inverted)
+
+        size = int(rows.max()) + 1 if len(rows) else 0
+        assignment = np.full(size, -1, dtype=np.int64)
+        assignment[rows] = targets
+        position = np.zeros(size, dtype=np.int64)
+        position[sorted_rows] = np.arange(len(rows)) - np.repeat(starts, counts)
+        return {
+            "lists": lists,
+            "counts": counts,
+            "assignment": assignment,
+            "position": position,
+        }
+
+    def reset(self) -> None:
+        """
+        Forget the centroids and inverted lists, keeping the parameters.
+        """
+        self.centroids = None
+        self.trained_on = 0
+        self._assignment = np.empty(0, dtype=np.int64)
+        self._position = np.empty(0, dtype=np.int64)
+        self.clear()
+
+    def clear(self) -> None:
+        """
+        Empty the inverted lists, keeping the centroids.
+        """
+        nlist = 0 if self.centroids is None else len(self.centroids)
+        self._lists = [np.empty(16, dtype=np.int64) for _ in range(nlist)]
+        self._counts = np.zeros(nlist, dtype=np.int64)
+        self._assignment = np.full(len(self._assignment), -1, dtype=np.int64)
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), ASSIGN_CHUNK_SIZE):
+            chunk = vectors[start : start + ASSIGN_CHUNK_SIZE]
+            assignment[start : start + len(chunk)] = np.argmax(
+                chunk @ centroids.T, axis=1
+            )
+        return assignment
+
+    def _grow_rows(self, max_row: int) -> None:
+        if max_row < len(self._assignment):
+            return
+        size = max(max_row + 1, len(self._assignment) * 2)
+        assignment = np.full(size, -1, dtype=np.int64)
+        assignment[: len(self._assignment)] = self._assignment
+        position = np.zeros(size, dtype=np.int64)
+        position[: len(self._position)] = self._position
+        self._assignment, self._position = assignment, position
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        """
+        Assign rows to their nearest centroid. Rows already in the index are moved.
+        """
+        if not self.trained or len(rows) == 0:
+            return
+        self._grow_rows(int(rows.max()))
+        self.remove(rows)
+
+        for row, target in zip(rows, self._nearest(vectors, self.centroids)):
+            count = self._counts[target]
+            if count == len(self._lists[target]):
+                self._lists[target] = np.resize(self._lists[target], count * 2)
+            self._lists[target][count] = row
+            self._counts[target] = count + 1
+            self._assignment[row] = target
+            self._position[row] = count
+
+    def remove(self, rows: np.ndarray) -> None:
+        """
+        Remove rows from their inverted lists.
+        """
+        for row in rows:
+            if row >= len(self._assignment) or self._assignment[row] < 0:
+                continue
+            target = self._assignment[row]
+            position = self._position[row]
+            last = self._counts[target] - 1
+            # Move the last entry of the list into the freed slot
+            moved = self._lists[target][last]
+            self._lists[target][position] = moved
+            self._position[moved] = position
+            self._counts[target] = last
+            self._assignment[row] = -1
+
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """
+        Return the rows in the inverted lists closest to a normalized query.
+        """
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        centroid_scores = self.centroids @ query
+        if nprobe < len(centroid_scores):
+            probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probes = np.arange(len(centroid_scores))
+        return np.concatenate(
+            [self._lists[p][: self._counts[p]] for p in probes]
+        )
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "type": "ivf",
+            "trained": self.trained,
+            "nlist": len(self.centroids) if self.trained else self.nlist,
+            "nprobe": self.nprobe,
+            "train_size": self.train_size,
+        }
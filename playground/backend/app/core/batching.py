@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+import numpy as np
+from pydantic import PrivateAttr
+from semantic_kernel.connectors.ai.embedding_generator_base import (
+    EmbeddingGeneratorBase,
+)
+from semantic_kernel.connectors.ai.prompt_execution_settings import (
+    PromptExecutionSettings,
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class BatchingEmbeddingGenerator(EmbeddingGeneratorBase):
+    """
+    Embedding generator that micro-batches concurrent requests.
+
+    Texts requested within `max_wait_ms` of each other are collected, up to
+    `max_batch_size`, and sent to the wrapped service as one batched call. The
+    vectors are then handed back to each caller in order.
+    """
+
+    inner: EmbeddingGeneratorBase
+    max_batch_size: int = 64
+    max_wait_ms: float = 5.0
+    max_concurrent_batches: int = 4
+
+    _pending: List[Tuple[str, asyncio.Future]] = PrivateAttr(default_factory=list)
+    _flush_handle: Optional[asyncio.TimerHandle] = PrivateAttr(default=None)
+    _tasks: Set[asyncio.Task] = PrivateAttr(default_factory=set)
+    _semaphore: Optional[asyncio.Semaphore] = PrivateAttr(default=None)
+    _batches: int = PrivateAttr(default=0)
+    _texts: int = PrivateAttr(default=0)
+
+    def __init__(self, inner: EmbeddingGeneratorBase, **kwargs: Any):
+        super().__init__(
+            inner=inner,
+            ai_model_id=inner.ai_model_id,
+            service_id=inner.service_id,
+            **kwargs,
+        )
+
+    async def generate_embeddings(
+        self,
+        texts: list[str],
+        settings: Optional[PromptExecutionSettings] = None,
+        **kwargs: Any,
+    ) -> Any:
+        if settings is not None or kwargs:
+            return await self.inner.generate_embeddings(texts, settings, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._pending.append((text, future))
+            futures.append(future)
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+
+        if self._pending and self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+        vectors = await asyncio.gather(*futures)
+        return np.array(vectors)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        while self._pending:
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: self.max_batch_size]
+            task = asyncio.ensure_future(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        # Skip texts whose callers have already gone away
+        batch = [(text, future) for text, future in batch if not future.done()]
+        if not batch:
+            return
+
+        # Send each distinct text once
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_batches)
+        try:
+            async with self._semaphore:
+                vectors = await self.inner.generate_embeddings(unique_texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self._batches += 1
+        self._texts += len(unique_texts)
+        by_text = dict(zip(unique_texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self._batches,
+            "texts": self._texts,
+            "average_batch_size": self._texts / self._batches if self._batches else 0.0,
+            "pending": len(self._pending),
+        }
@@ -0,0 +1,274 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Generic, Optional, TypeVar
+from semantic_kernel.connectors.ai.prompt_execution_settings import (
+    PromptExecutionSettings,
+)
+from semantic_kernel.contents import ChatMessageContent, AuthorRole
+from semantic_kernel.filters import FunctionInvocationContext, PromptRenderContext
+from semantic_kernel.functions import FunctionResult
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+# Set per request to skip cache lookups (the fresh result is still stored)
+cache_bypass: ContextVar[bool] = ContextVar("cache_bypass", default=False)
+
+
+class TTLCache(Generic[V]):
+    """
+    In-memory cache with least-recently-used eviction and a time-to-live per entry.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[V, Optional[float]]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: V) -> None:
+        expires_at = (
+            time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        )
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class SQLiteCacheBackend:
+    """
+    On-disk key/value store backed by SQLite, used as a second cache tier.
+
+    Its methods block on disk I/O, so ResponseCache calls them in worker threads;
+    a lock keeps those threads from sharing the connection at the same time.
+    """
+
+    def __init__(self, path: str, ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        self._connection.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            self.delete(key)
+            return None
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            self._connection.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._connection.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM cache")
+            self._connection.commit()
+
+
+class ResponseCache:
+    """
+    Exact-match cache for prompt function responses.
+
+    The cache key is built from the rendered prompt, the execution settings and the
+    deployment name. Lookups happen in a prompt rendering filter, so a hit returns
+    the stored completion without calling the AI service. Fresh completions are
+    stored by a function invocation filter.
+
+    Only deterministic requests are cached: those with a temperature of 0 (or none
+    set) asking for at most one completion. Others are expected to vary.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: Optional[float] = 3600,
+        backend: Optional[SQLiteCacheBackend] = None,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.memory = TTLCache[str](max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @staticmethod
+    def make_key(
+        rendered_prompt: str, settings: PromptExecutionSettings, deployment: str
+    ) -> str:
+        """
+        Build a cache key from the rendered prompt, execution settings and deployment.
+        """
+        payload = json.dumps(
+            {
+                "prompt": rendered_prompt,
+                "settings": settings.model_dump(
+                    exclude_none=True, exclude={"service_id", "function_choice_behavior"}
+                ),
+                "deployment": deployment,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_deterministic(settings: PromptExecutionSettings) -> bool:
+        """
+        Whether the settings ask for one completion at temperature 0 (or the default).
+        """
+        values = {**settings.extension_data, **settings.model_dump(exclude_none=True)}
+        temperature = values.get("temperature")
+        responses = values.get("number_of_responses", values.get("n"))
+        return not temperature and (responses is None or responses <= 1)
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is None and self.backend is not None:
+            value = await asyncio.to_thread(self.backend.get, key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.backend is not None:
+            await asyncio.to_thread(self.backend.set, key, value)
+
+    async def clear(self) -> None:
+        self.memory.clear()
+        if self.backend is not None:
+            await asyncio.to_thread(self.backend.clear)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self.memory),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "persistent": self.backend is not None,
+        }
+
+    def _key_for(self, context, rendered_prompt: str) -> Optional[str]:
+        """
+        Return the cache key of a request, or None if its response is not cacheable.
+        """
+        service, settings = context.kernel.select_ai_service(
+            function=context.function, arguments=context.arguments
+        )
+        if not self.is_deterministic(settings):
+            return None
+        return self.make_key(rendered_prompt, settings, service.ai_model_id)
+
+    async def prompt_rendering_filter(
+        self,
+        context: PromptRenderContext,
+        next: Callable[[PromptRenderContext], Awaitable[None]],
+    ) -> None:
+        """
+        Filter that returns a cached completion for an already seen rendered prompt.
+        """
+        await next(context)
+
+        if not self.enabled or context.is_streaming or context.rendered_prompt is None:
+            return
+        if cache_bypass.get():
+            self.bypassed += 1
+            return
+
+        key = self._key_for(context, context.rendered_prompt)
+        if key is None:
+            return
+        cached = await self.get(key)
+        if cached is None:
+            self.misses += 1
+            return
+
+        self.hits += 1
+        context.function_result = FunctionResult(
+            function=context.function.metadata,
+            value=[ChatMessageContent(role=AuthorRole.ASSISTANT, content=cached)],
+            rendered_prompt=context.rendered_prompt,
+            metadata={"cache_hit": True},
+        )
+
+    async def function_invocation_filter(
+        self,
+        context: FunctionInvocationContext,
+        next: Callable[[FunctionInvocationContext], Awaitable[None]],
+    ) -> None:
+        """
+        Filter that stores fresh prompt function completions in the cache.
+        """
+        await next(context)
+
+        result = context.result
+        if (
+            not self.enabled
+            or result is None
+            or result.rendered_prompt is None
+            or result.metadata.get("cache_hit")
+        ):
+            return
+
+        try:
+            key = self._key_for(context, result.rendered_prompt)
+            if key is not None:
+                await self.set(key, str(result))
+        except Exception as e:
+            logger.warning(f"Could not cache response: {str(e)}")
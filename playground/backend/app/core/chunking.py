@@ -0,0 +1,71 @@
+from typing import List
+
+WHITESPACE = (" ", "\n", "\t")
+
+
+class TextChunker:
+    """
+    Splits text into overlapping chunks of at most `chunk_size` characters.
+
+    Text can be fed in pieces as it arrives; only the unfinished tail is buffered.
+    Chunks end at whitespace where possible, and each chunk repeats about
+    `overlap` characters from the end of the previous one.
+    """
+
+    def __init__(self, chunk_size: int = 1000, overlap: int = 200):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        if not 0 <= overlap < chunk_size // 2:
+            raise ValueError("overlap must be at least 0 and less than half of chunk_size")
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self._buffer = ""
+
+    @staticmethod
+    def _rfind_whitespace(text: str, start: int, end: int) -> int:
+        return max(text.rfind(c, start, end) for c in WHITESPACE)
+
+    @staticmethod
+    def _find_whitespace(text: str, start: int, end: int) -> int:
+        found = [i for i in (text.find(c, start, end) for c in WHITESPACE) if i >= 0]
+        return min(found) if found else -1
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Add text and return the chunks that are now complete.
+        """
+        self._buffer += text
+        chunks = []
+        while len(self._buffer) > self.chunk_size:
+            # Break at the last whitespace in the second half of the window
+            end = self._rfind_whitespace(
+                self._buffer, self.chunk_size // 2, self.chunk_size
+            )
+            if end <= 0:
+                end = self.chunk_size
+            chunks.append(self._buffer[:end].strip())
+
+            # Start the next chunk `overlap` characters back, at a word boundary
+            start = end - self.overlap
+            if self.overlap:
+                boundary = self._find_whitespace(self._buffer, start, end)
+                if boundary >= 0:
+                    start = boundary + 1
+            self._buffer = self._buffer[start:]
+        return [chunk for chunk in chunks if chunk]
+
+    def finish(self) -> List[str]:
+        """
+        Return the last chunk from whatever text is left.
+        """
+        chunk = self._buffer.strip()
+        self._buffer = ""
+        return [chunk] if chunk else []
+
+
+def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
+    """
+    Split a whole text into overlapping chunks.
+    """
+    chunker = TextChunker(chunk_size, overlap)
+    return chunker.feed(text) + chunker.finish()
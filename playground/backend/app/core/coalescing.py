@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from pydantic import PrivateAttr
+from semantic_kernel.connectors.ai.embedding_generator_base import (
+    EmbeddingGeneratorBase,
+)
+from semantic_kernel.connectors.ai.prompt_execution_settings import (
+    PromptExecutionSettings,
+)
+from semantic_kernel.filters import FunctionInvocationContext
+from semantic_kernel.functions.kernel_function_from_prompt import (
+    KernelFunctionFromPrompt,
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Shares one in-flight call between concurrent callers that use the same key.
+
+    The call runs in its own task, so a caller that is cancelled does not cancel it
+    for the others. The call is only cancelled once every caller waiting on it has
+    been cancelled, and it is forgotten right away, so that the next caller starts a
+    new one. Exceptions are raised to every caller.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await the in-flight call for key, starting it with `call` if there is none.
+        """
+        self.calls += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(
+                lambda _, key=key, flight=flight: self._forget(key, flight)
+            )
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                # The last waiter was cancelled
+                flight.task.cancel()
+                self._forget(key, flight)
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight,
+        }
+
+
+class InvocationCoalescer:
+    """
+    Coalesces identical concurrent prompt function invocations.
+
+    Two invocations are identical when they call the same prompt template with the
+    same arguments and execution settings.
+    """
+
+    def __init__(self):
+        self.flights = SingleFlight()
+
+    @staticmethod
+    def make_key(context: FunctionInvocationContext) -> str:
+        function = context.function
+        arguments = context.arguments
+        payload = json.dumps(
+            {
+                "function": function.fully_qualified_name,
+                "template": function.prompt_template.prompt_template_config.template,
+                "arguments": {k: v for k, v in arguments.items()},
+                "settings": {
+                    service_id: settings.model_dump(exclude_none=True)
+                    for service_id, settings in (
+                        arguments.execution_settings or {}
+                    ).items()
+                },
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def function_invocation_filter(
+        self,
+        context: FunctionInvocationContext,
+        next: Callable[[FunctionInvocationContext], Awaitable[None]],
+    ) -> None:
+        """
+        Filter that shares the result of an identical in-flight prompt invocation.
+        """
+        if context.is_streaming or not isinstance(
+            context.function, KernelFunctionFromPrompt
+        ):
+            await next(context)
+            return
+
+        async def invoke():
+            await next(context)
+            return context.result
+
+        context.result = await self.flights.do(self.make_key(context), invoke)
+
+
+class CoalescingEmbeddingGenerator(EmbeddingGeneratorBase):
+    """
+    Embedding generator that coalesces identical concurrent requests.
+
+    Wraps another embedding generator, so it can be used wherever the wrapped
+    service is, for example by SemanticTextMemory.
+    """
+
+    inner: EmbeddingGeneratorBase
+    _flights: SingleFlight = PrivateAttr(default_factory=SingleFlight)
+
+    def __init__(self, inner: EmbeddingGeneratorBase, **kwargs: Any):
+        super().__init__(
+            inner=inner,
+            ai_model_id=inner.ai_model_id,
+            service_id=inner.service_id,
+            **kwargs,
+        )
+
+    @property
+    def flights(self) -> SingleFlight:
+        return self._flights
+
+    async def generate_embeddings(
+        self,
+        texts: list[str],
+        settings: Optional[PromptExecutionSettings] = None,
+        **kwargs: Any,
+    ) -> Any:
+        if settings is not None or kwargs:
+            return await self.inner.generate_embeddings(texts, settings, **kwargs)
+
+        key = hashlib.sha256(
+            json.dumps([self.ai_model_id, texts]).encode("utf-8")
+        ).hexdigest()
+        return await self._flights.do(
+            key, lambda: self.inner.generate_embeddings(texts)
+        )
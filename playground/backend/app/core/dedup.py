@@ -0,0 +1,163 @@
+import hashlib
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from semantic_kernel.exceptions import ServiceInvalidRequestError
+from app.core.lexical_index import tokenize
+
+# What happens to a near-duplicate: it is dropped, recorded on the record it
+# duplicates, or stored anyway (and only counted)
+POLICIES = ("skip", "merge", "keep")
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 3
+MAX_DISTANCE = 15
+
+Scope = Tuple[Any, ...]
+
+
+def simhash(text: str) -> Optional[int]:
+    """
+    64-bit SimHash of the word 3-grams of a text, or None if it has no words.
+
+    Texts that share most of their 3-grams get fingerprints that differ in few
+    bits, so the Hamming distance between fingerprints measures how near they are.
+    Case, punctuation and spacing are ignored.
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return None
+    size = min(SHINGLE_SIZE, len(tokens))
+    shingles = Counter(
+        " ".join(tokens[i : i + size]) for i in range(len(tokens) - size + 1)
+    )
+    hashes = np.array(
+        [
+            int.from_bytes(
+                hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(),
+                "little",
+            )
+            for shingle in shingles
+        ],
+        dtype=np.uint64,
+    )
+    bits = np.unpackbits(hashes.view(np.uint8), bitorder="little")
+    bits = bits.reshape(len(hashes), FINGERPRINT_BITS).astype(np.int64) * 2 - 1
+    votes = np.fromiter(shingles.values(), dtype=np.int64, count=len(shingles)) @ bits
+    return int(np.packbits(votes > 0, bitorder="little").view(np.uint64)[0])
+
+
+class SimHashIndex:
+    """
+    Finds stored texts whose SimHash is within `max_distance` bits of a new one.
+
+    The 64 fingerprint bits are split into max_distance + 1 bands, with a table
+    per band from the band's bits to the keys holding them. Two fingerprints that
+    differ in at most max_distance bits agree on at least one whole band, so
+    looking up the bands of a fingerprint finds every near-duplicate while only
+    comparing against the few keys that share a band.
+
+    With `scope`, only texts whose metadata agrees on those fields are compared,
+    so for example one tenant's text never counts as another tenant's duplicate.
+    """
+
+    def __init__(
+        self,
+        policy: str = "skip",
+        max_distance: int = 3,
+        scope: Optional[List[str]] = None,
+    ):
+        if policy not in POLICIES:
+            raise ServiceInvalidRequestError(
+                f"Unknown dedup policy '{policy}', expected one of off, {', '.join(POLICIES)}"
+            )
+        if not 0 <= max_distance <= MAX_DISTANCE:
+            raise ServiceInvalidRequestError(
+                f"max_distance must be between 0 and {MAX_DISTANCE}"
+            )
+        self.policy = policy
+        self.max_distance = max_distance
+        self.scope = list(scope or [])
+        bands = max_distance + 1
+        edges = [FINGERPRINT_BITS * i // bands for i in range(bands + 1)]
+        self._bands = [
+            (start, (1 << (end - start)) - 1) for start, end in zip(edges, edges[1:])
+        ]
+        self.tables: List[Dict[Tuple[Scope, int], Set[str]]] = [
+            {} for _ in self._bands
+        ]
+        self.fingerprints: Dict[str, Tuple[int, Scope]] = {}
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+    def scope_of(self, metadata: Optional[Dict[str, Any]]) -> Scope:
+        metadata = metadata or {}
+        return tuple(str(metadata.get(field)) for field in self.scope)
+
+    def _keys(self, fingerprint: int, scope: Scope) -> List[Tuple[Scope, int]]:
+        return [(scope, (fingerprint >> start) & mask) for start, mask in self._bands]
+
+    def add(self, key: str, fingerprint: Optional[int], scope: Scope = ()) -> None:
+        self.remove(key)
+        if fingerprint is None:
+            return
+        self.fingerprints[key] = (fingerprint, scope)
+        for table, band in zip(self.tables, self._keys(fingerprint, scope)):
+            table.setdefault(band, set()).add(key)
+
+    def add_texts(
+        self, items: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]]
+    ) -> None:
+        """
+        Index (key, text, metadata) items.
+        """
+        for key, text, metadata in items:
+            self.add(key, simhash(text), self.scope_of(metadata))
+
+    def remove(self, key: str) -> None:
+        entry = self.fingerprints.pop(key, None)
+        if entry is None:
+            return
+        for table, band in zip(self.tables, self._keys(*entry)):
+            keys = table[band]
+            keys.discard(key)
+            if not keys:
+                del table[band]
+
+    def clear(self) -> None:
+        for table in self.tables:
+            table.clear()
+        self.fingerprints.clear()
+
+    def find(
+        self,
+        fingerprint: Optional[int],
+        scope: Scope = (),
+        exclude: Optional[str] = None,
+    ) -> Optional[Tuple[str, int]]:
+        """
+        The nearest stored key within max_distance bits, with its distance.
+        """
+        if fingerprint is None:
+            return None
+        best: Optional[Tuple[str, int]] = None
+        for table, band in zip(self.tables, self._keys(fingerprint, scope)):
+            for key in table.get(band, ()):
+                if key == exclude:
+                    continue
+                distance = (fingerprint ^ self.fingerprints[key][0]).bit_count()
+                if distance <= self.max_distance and (
+                    best is None or distance < best[1]
+                ):
+                    best = (key, distance)
+                    if not distance:
+                        return best
+        return best
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "policy": self.policy,
+            "max_distance": self.max_distance,
+            "scope": self.scope,
+            "fingerprints": len(self.fingerprints),
+        }
@@ -0,0 +1,164 @@
+import hashlib
+import logging
+import sqlite3
+from typing import Any, Dict, List, Optional
+import numpy as np
+from pydantic import PrivateAttr
+from semantic_kernel.connectors.ai.embedding_generator_base import (
+    EmbeddingGeneratorBase,
+)
+from semantic_kernel.connectors.ai.prompt_execution_settings import (
+    PromptExecutionSettings,
+)
+from app.core.cache import TTLCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class SQLiteEmbeddingStore:
+    """
+    On-disk embedding store keyed by content hash, with vectors stored as float32 blobs.
+
+    With `max_entries`, the least recently written vectors are evicted once the
+    store holds more than that many.
+    """
+
+    def __init__(self, path: str, max_entries: Optional[int] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._connection.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        # Stay below SQLite's limit on bound parameters
+        for start in range(0, len(keys), 500):
+            chunk = keys[start : start + 500]
+            rows = self._connection.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for key, vector in rows:
+                found[key] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def set_many(self, items: Dict[str, np.ndarray]) -> None:
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+            [
+                (key, np.asarray(vector, dtype=np.float32).tobytes())
+                for key, vector in items.items()
+            ],
+        )
+        if self.max_entries is not None:
+            # INSERT OR REPLACE gives rewritten keys a new rowid, so the lowest
+            # rowids are the least recently written
+            self._connection.execute(
+                "DELETE FROM embeddings WHERE rowid <= "
+                "(SELECT rowid FROM embeddings ORDER BY rowid DESC LIMIT 1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        self._connection.commit()
+
+    def count(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class CachingEmbeddingGenerator(EmbeddingGeneratorBase):
+    """
+    Embedding generator with a content-addressed cache.
+
+    Vectors are keyed by a hash of the embedding deployment name and the text, and
+    kept in an in-memory LRU tier backed by an optional on-disk tier. Only texts
+    missing from both tiers are sent to the wrapped service.
+    """
+
+    inner: EmbeddingGeneratorBase
+    max_entries: int = 10000
+    path: Optional[str] = None
+    disk_max_entries: Optional[int] = None
+
+    _memory: TTLCache = PrivateAttr()
+    _disk: Optional[SQLiteEmbeddingStore] = PrivateAttr(default=None)
+    _memory_hits: int = PrivateAttr(default=0)
+    _disk_hits: int = PrivateAttr(default=0)
+    _misses: int = PrivateAttr(default=0)
+
+    def __init__(self, inner: EmbeddingGeneratorBase, **kwargs: Any):
+        super().__init__(
+            inner=inner,
+            ai_model_id=inner.ai_model_id,
+            service_id=inner.service_id,
+            **kwargs,
+        )
+        self._memory = TTLCache(max_entries=self.max_entries)
+        if self.path:
+            self._disk = SQLiteEmbeddingStore(self.path, self.disk_max_entries)
+
+    def make_key(self, text: str) -> str:
+        return hashlib.sha256(
+            f"{self.ai_model_id}\0{text}".encode("utf-8")
+        ).hexdigest()
+
+    async def generate_embeddings(
+        self,
+        texts: list[str],
+        settings: Optional[PromptExecutionSettings] = None,
+        **kwargs: Any,
+    ) -> Any:
+        if settings is not None or kwargs:
+            return await self.inner.generate_embeddings(texts, settings, **kwargs)
+
+        keys = [self.make_key(text) for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+        for key in keys:
+            vector = self._memory.get(key)
+            if vector is not None:
+                vectors[key] = vector
+                self._memory_hits += 1
+
+        missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if missing and self._disk is not None:
+            for key, vector in self._disk.get_many(missing).items():
+                vectors[key] = vector
+                self._memory.set(key, vector)
+                self._disk_hits += 1
+
+        # Embed the texts that are in neither tier, each distinct text once
+        missing_texts = {
+            key: text for key, text in zip(keys, texts) if key not in vectors
+        }
+        if missing_texts:
+            self._misses += len(missing_texts)
+            embeddings = await self.inner.generate_embeddings(
+                list(missing_texts.values())
+            )
+            fresh = {
+                key: np.asarray(vector, dtype=np.float32)
+                for key, vector in zip(missing_texts, embeddings)
+            }
+            for key, vector in fresh.items():
+                self._memory.set(key, vector)
+            if self._disk is not None:
+                self._disk.set_many(fresh)
+            vectors.update(fresh)
+
+        return np.array([vectors[key] for key in keys])
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._memory_hits + self._disk_hits + self._misses
+        return {
+            "memory_entries": len(self._memory),
+            "disk_entries": self._disk.count() if self._disk is not None else None,
+            "memory_hits": self._memory_hits,
+            "disk_hits": self._disk_hits,
+            "misses": self._misses,
+            "hit_rate": (
+                (self._memory_hits + self._disk_hits) / lookups if lookups else 0.0
+            ),
+        }
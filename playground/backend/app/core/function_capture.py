@@ -0,0 +1,64 @@
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import semantic_kernel as sk
+from semantic_kernel.filters import AutoFunctionInvocationContext
+
+
+class FunctionCapture:
+    """
+    Records the plugin functions the model calls through a kernel, as they run.
+
+    Installed as an auto-function-invocation filter, so each call is recorded
+    with its arguments, the result the model was given and how long it took.
+    Endpoints read the results from here instead of invoking the functions a
+    second time, which would repeat the work and, for functions that are not
+    deterministic, return different values from the ones the model saw.
+    """
+
+    def __init__(self):
+        self.calls: List[Dict[str, Any]] = []
+
+    def install(self, kernel: sk.Kernel) -> "FunctionCapture":
+        kernel.add_filter("auto_function_invocation", self.auto_function_invocation_filter)
+        return self
+
+    async def auto_function_invocation_filter(
+        self,
+        context: AutoFunctionInvocationContext,
+        next: Callable[[AutoFunctionInvocationContext], Awaitable[None]],
+    ) -> None:
+        call: Dict[str, Any] = {
+            "plugin_name": context.function.plugin_name,
+            "function_name": context.function.name,
+            "parameters": dict(context.arguments or {}),
+        }
+        start_time = time.perf_counter()
+        try:
+            await next(context)
+        except Exception as e:
+            call["error"] = str(e)
+            raise
+        finally:
+            call["duration_ms"] = round((time.perf_counter() - start_time) * 1000, 3)
+            call["result"] = (
+                None if context.function_result is None else context.function_result.value
+            )
+            self.calls.append(call)
+
+    def results(self, function_name: str, plugin_name: Optional[str] = None) -> List[Any]:
+        """
+        Results of the completed calls to a function, in call order.
+        """
+        return [
+            call["result"]
+            for call in self.calls
+            if call["function_name"] == function_name
+            and (plugin_name is None or call["plugin_name"] == plugin_name)
+            and "error" not in call
+        ]
+
+    def last_result(
+        self, function_name: str, plugin_name: Optional[str] = None
+    ) -> Optional[Any]:
+        results = self.results(function_name, plugin_name)
+        return results[-1] if results else None
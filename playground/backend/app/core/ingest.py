@@ -0,0 +1,243 @@
+import asyncio
+import codecs
+import json
+import logging
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+from app.core.chunking import TextChunker
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# (collection, id, text, metadata), as taken by save_memories
+MemoryItemTuple = Tuple[str, str, str, Optional[Dict[str, Any]]]
+
+# Removes the ids an earlier version of a text left behind, given (collection, id,
+# number of chunks, whether the text is stored under its bare id), and returns
+# how many records it removed
+RemoveStale = Callable[[str, str, int, bool], Awaitable[int]]
+
+
+class IngestProgress:
+    """
+    Counters reported while a bulk ingest runs.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.documents = 0
+        self.chunks = 0
+        self.stored = 0
+        self.unchanged = 0
+        self.duplicates = 0
+        self.removed = 0
+        self.skipped = 0
+        self.errors: List[str] = []
+
+    def as_dict(self, status: str) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "status": status,
+            "documents": self.documents,
+            "chunks": self.chunks,
+            "stored": self.stored,
+            "unchanged": self.unchanged,
+            "duplicates": self.duplicates,
+            "removed": self.removed,
+            "skipped": self.skipped,
+            "errors": self.errors[-10:],
+            "elapsed_seconds": round(elapsed, 3),
+            "chunks_per_second": round(self.stored / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+async def iter_text(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Decode a UTF-8 byte stream, without splitting characters across pieces.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    async for data in stream:
+        text = decoder.decode(data)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Split a byte stream into lines, buffering only the current line.
+    """
+    buffer = ""
+    async for text in iter_text(stream):
+        buffer += text
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+async def ndjson_items(
+    stream: AsyncIterator[bytes],
+    progress: IngestProgress,
+    default_collection: Optional[str] = None,
+    chunk_size: int = 1000,
+    overlap: int = 200,
+    remove_stale: Optional[RemoveStale] = None,
+) -> AsyncIterator[MemoryItemTuple]:
+    """
+    Read {"id", "text", "collection", "metadata"} objects, one per line, splitting
+    long texts.
+
+    Chunks of a text that needs several are stored as "<id>#<n>", each with the
+    metadata of the text. Lines that cannot be read are counted as skipped. With
+    `remove_stale`, ids left by an earlier version of each text are removed.
+    """
+    number = 0
+    async for line in iter_lines(stream):
+        number += 1
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            collection = item.get("collection") or default_collection
+            id, text = str(item["id"]), item["text"]
+            metadata = item.get("metadata")
+            if not collection or not isinstance(text, str):
+                raise ValueError("collection and text are required")
+            if metadata is not None and not isinstance(metadata, dict):
+                raise ValueError("metadata must be an object")
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            progress.skipped += 1
+            progress.errors.append(f"line {number}: {str(e)}")
+            continue
+
+        progress.documents += 1
+        chunks = TextChunker(chunk_size, overlap)
+        parts = chunks.feed(text) + chunks.finish()
+        if len(parts) == 1:
+            yield collection, id, parts[0], metadata
+        else:
+            for n, part in enumerate(parts):
+                yield collection, f"{id}#{n}", part, metadata
+        if remove_stale is not None:
+            progress.removed += await remove_stale(
+                collection, id, len(parts), len(parts) == 1
+            )
+
+
+async def document_items(
+    stream: AsyncIterator[bytes],
+    progress: IngestProgress,
+    collection: str,
+    document_id: str,
+    chunk_size: int = 1000,
+    overlap: int = 200,
+    metadata: Optional[Dict[str, Any]] = None,
+    remove_stale: Optional[RemoveStale] = None,
+) -> AsyncIterator[MemoryItemTuple]:
+    """
+    Split one document, read as it arrives, into chunks stored as "<document_id>#<n>".
+
+    With `remove_stale`, the chunks of an earlier, longer version of the document
+    are removed once its length is known.
+    """
+    progress.documents += 1
+    chunker = TextChunker(chunk_size, overlap)
+    n = 0
+    async for text in iter_text(stream):
+        for part in chunker.feed(text):
+            yield collection, f"{document_id}#{n}", part, metadata
+            n += 1
+    for part in chunker.finish():
+        yield collection, f"{document_id}#{n}", part, metadata
+        n += 1
+    if remove_stale is not None:
+        progress.removed += await remove_stale(collection, document_id, n, False)
+
+
+async def ingest(
+    items: AsyncIterator[MemoryItemTuple],
+    save: Callable[[List[MemoryItemTuple]], Awaitable[Optional[Dict[str, int]]]],
+    progress: IngestProgress,
+    batch_size: int = 64,
+    concurrency: int = 4,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Save items in batches, with at most `concurrency` batches in flight.
+
+    Reading pauses while every slot is busy, so memory use stays flat however
+    large the input is. Yields a progress event whenever a batch has been saved,
+    then a final event. `save` may return counts, of which "unchanged" records are
+    reported apart from the ones stored, as are "duplicates", the near-duplicates
+    that were dropped or merged. Near-duplicates stored under the "keep" policy are
+    counted as stored, so every item is counted once.
+    """
+    slots = asyncio.Semaphore(concurrency)
+    pending: Set[asyncio.Task] = set()
+
+    async def save_batch(batch: List[MemoryItemTuple]) -> Tuple[int, int, int]:
+        try:
+            counts = await save(batch)
+            if not counts:
+                return len(batch), 0, 0
+            stored = counts.get("created", 0) + counts.get("updated", 0)
+            duplicates = counts.get("duplicates", 0) - counts.get("duplicates_kept", 0)
+            return stored, counts.get("unchanged", 0), duplicates
+        finally:
+            slots.release()
+
+    async def start(batch: List[MemoryItemTuple]) -> None:
+        await slots.acquire()
+        pending.add(asyncio.ensure_future(save_batch(batch)))
+
+    def collect() -> None:
+        for task in [task for task in pending if task.done()]:
+            pending.discard(task)
+            stored, unchanged, duplicates = task.result()
+            progress.stored += stored
+            progress.unchanged += unchanged
+            progress.duplicates += duplicates
+
+    try:
+        batch: List[MemoryItemTuple] = []
+        async for item in items:
+            batch.append(item)
+            progress.chunks += 1
+            if len(batch) >= batch_size:
+                await start(batch)
+                batch = []
+                saved = progress.stored + progress.unchanged + progress.duplicates
+                collect()
+                if progress.stored + progress.unchanged + progress.duplicates != saved:
+                    yield progress.as_dict("running")
+        if batch:
+            await start(batch)
+
+        while pending:
+            await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            collect()
+            yield progress.as_dict("running")
+    except Exception as e:
+        logger.error(f"Error in bulk ingest: {str(e)}")
+        progress.errors.append(str(e))
+        yield progress.as_dict("error")
+        return
+    finally:
+        # Stop saving if the client has gone away or a batch failed
+        for task in pending:
+            task.cancel()
+
+    yield progress.as_dict("success")
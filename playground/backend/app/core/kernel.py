@@ -1,20 +1,33 @@
 import os
+import asyncio
+import json
 import logging
-from typing import Tuple, List, Optional
+from typing import Any, Dict, Tuple, List, Optional
+import numpy as np
 import semantic_kernel as sk
-from semantic_kernel.connectors.ai.open_ai.services.azure_chat_completion import (
-    AzureChatCompletion,
-)
-from semantic_kernel.connectors.ai.open_ai.services.azure_text_embedding import (
-    AzureTextEmbedding,
-)
 from semantic_kernel.memory.semantic_text_memory import SemanticTextMemory
-from semantic_kernel.memory.volatile_memory_store import VolatileMemoryStore
+from semantic_kernel.memory.memory_record import MemoryRecord
 from semantic_kernel.core_plugins.text_memory_plugin import TextMemoryPlugin
 from dotenv import load_dotenv
 import time
 from semantic_kernel.filters import FunctionInvocationContext
 from typing import Callable, Awaitable
+from app.core.services import ServiceRegistry
+from app.core.prompt_functions import PromptFunctionRegistry
+from app.core.cache import ResponseCache, SQLiteCacheBackend
+from app.core.semantic_cache import SemanticCache
+from app.core.sessions import SessionStore
+from app.core.coalescing import CoalescingEmbeddingGenerator, InvocationCoalescer
+from app.core.batching import BatchingEmbeddingGenerator
+from app.core.memory_store import NumpyMemoryStore
+from app.core.persistent_store import PersistentMemoryStore
+from app.core.lexical_index import reciprocal_rank_fusion
+from app.core.dedup import SimHashIndex, simhash
+from app.core.metadata_index import parse_metadata
+from app.core.embedding_cache import CachingEmbeddingGenerator
+from semantic_kernel.connectors.ai.embedding_generator_base import (
+    EmbeddingGeneratorBase,
+)
 
 # Load environment variables
 load_dotenv("../../.env", override=True)
@@ -34,8 +47,189 @@ embedding_deployment = os.getenv(
     "AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME", "text-embedding-ada-002"
 )
 
-# Initialize memory store
-memory_store = VolatileMemoryStore()
+# HTTP connection pool settings for the shared AI service clients
+pool_max_connections = int(os.getenv("AOAI_POOL_MAX_CONNECTIONS", 100))
+pool_max_keepalive = int(os.getenv("AOAI_POOL_MAX_KEEPALIVE_CONNECTIONS", 20))
+pool_keepalive_expiry = float(os.getenv("AOAI_POOL_KEEPALIVE_EXPIRY", 30))
+
+# Shared AI service clients, built once per process
+service_registry = ServiceRegistry(
+    endpoint=base_url,
+    api_key=api_key,
+    api_version=api_version,
+    chat_deployment=deployment_name,
+    embedding_deployment=embedding_deployment,
+    max_connections=pool_max_connections,
+    max_keepalive_connections=pool_max_keepalive,
+    keepalive_expiry=pool_keepalive_expiry,
+)
+
+# Compiled prompt functions, shared by all kernels
+prompt_function_cache_size = int(os.getenv("PROMPT_FUNCTION_CACHE_SIZE", 256))
+prompt_registry = PromptFunctionRegistry(
+    max_entries=prompt_function_cache_size,
+    max_registered=int(os.getenv("PROMPT_FUNCTION_MAX_REGISTERED", 256)),
+)
+
+# Exact-match cache for prompt function responses
+response_cache_path = os.getenv("RESPONSE_CACHE_PATH")
+response_cache_ttl = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 3600))
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1024)),
+    ttl_seconds=response_cache_ttl,
+    backend=(
+        SQLiteCacheBackend(response_cache_path, ttl_seconds=response_cache_ttl)
+        if response_cache_path
+        else None
+    ),
+    enabled=os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true",
+)
+
+# Embedding-similarity cache for near-duplicate prompts, keyed per endpoint
+semantic_cache_threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))
+semantic_cache = SemanticCache(
+    embedding_service_factory=lambda: get_embedding_generator(),
+    default_threshold=semantic_cache_threshold,
+    thresholds={
+        "agent_chat": float(
+            os.getenv("SEMANTIC_CACHE_AGENT_CHAT_THRESHOLD", 0.97)
+        ),
+        "functions_semantic": float(
+            os.getenv("SEMANTIC_CACHE_FUNCTIONS_THRESHOLD", semantic_cache_threshold)
+        ),
+    },
+    ttl_seconds=float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", 3600)),
+    max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 1000)),
+    max_total_entries=int(os.getenv("SEMANTIC_CACHE_MAX_TOTAL_ENTRIES", 10000)),
+    enabled=os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true",
+)
+
+# Server-side agent conversations: the last AGENT_SESSION_KEEP_TURNS turns are kept
+# verbatim and older ones summarized, within AGENT_SESSION_TOKEN_BUDGET tokens
+agent_sessions = SessionStore(
+    max_sessions=int(os.getenv("AGENT_SESSION_MAX_SESSIONS", 1000)),
+    ttl_seconds=float(os.getenv("AGENT_SESSION_TTL_SECONDS", 3600)),
+    keep_turns=int(os.getenv("AGENT_SESSION_KEEP_TURNS", 6)),
+    token_budget=int(os.getenv("AGENT_SESSION_TOKEN_BUDGET", 3000)),
+)
+
+# Coalesces identical concurrent prompt function invocations
+invocation_coalescer = InvocationCoalescer()
+
+# Micro-batching settings for embedding requests
+embedding_batch_max_size = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", 64))
+embedding_batch_max_wait_ms = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", 5))
+embedding_batch_max_concurrency = int(os.getenv("EMBEDDING_BATCH_MAX_CONCURRENCY", 4))
+
+# Content-addressed embedding cache settings
+embedding_cache_max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 10000))
+# Set EMBEDDING_CACHE_PATH to keep embeddings on disk across restarts, up to
+# EMBEDDING_CACHE_DISK_MAX_ENTRIES vectors
+embedding_cache_path = os.getenv("EMBEDDING_CACHE_PATH")
+embedding_cache_disk_max_entries = int(
+    os.getenv("EMBEDDING_CACHE_DISK_MAX_ENTRIES", 100000)
+)
+
+# Embedding generator used by memory, built on first use
+embedding_generator: Optional[EmbeddingGeneratorBase] = None
+
+
+def get_embedding_generator() -> EmbeddingGeneratorBase:
+    """
+    Return the embedding generator used by memory and the semantic cache.
+
+    It wraps the shared embedding service so that known texts are served from the
+    embedding cache, identical concurrent requests are sent once, and different
+    concurrent requests are micro-batched into a single call.
+    """
+    global embedding_generator
+    if embedding_generator is None:
+        embedding_generator = CachingEmbeddingGenerator(
+            CoalescingEmbeddingGenerator(
+                BatchingEmbeddingGenerator(
+                    service_registry.embedding_service,
+                    max_batch_size=embedding_batch_max_size,
+                    max_wait_ms=embedding_batch_max_wait_ms,
+                    max_concurrent_batches=embedding_batch_max_concurrency,
+                )
+            ),
+            max_entries=embedding_cache_max_entries,
+            path=embedding_cache_path or None,
+            disk_max_entries=embedding_cache_disk_max_entries,
+        )
+    return embedding_generator
+
+
+def get_embedding_stats() -> Dict[str, Any]:
+    """
+    Return the statistics of each layer of the memory embedding generator.
+    """
+    caching = get_embedding_generator()
+    coalescing = caching.inner
+    batching = coalescing.inner
+    return {
+        "cache": caching.stats(),
+        "coalescing": coalescing.flights.stats(),
+        "batching": batching.stats(),
+    }
+
+
+# Initialize memory store. Collections use exact search unless MEMORY_INDEX_TYPE=ivf,
+# which enables the approximate IVF index once a collection is large enough to train it.
+memory_index_type = os.getenv("MEMORY_INDEX_TYPE", "flat")
+memory_index_params = {
+    "nprobe": int(os.getenv("MEMORY_IVF_NPROBE", 8)),
+    "train_size": int(os.getenv("MEMORY_IVF_TRAIN_SIZE", 1000)),
+}
+if os.getenv("MEMORY_IVF_NLIST"):
+    memory_index_params["nlist"] = int(os.getenv("MEMORY_IVF_NLIST"))
+
+
+# Set MEMORY_STORE_PATH to keep memory on disk across restarts, shared by all workers
+memory_store_path = os.getenv("MEMORY_STORE_PATH")
+# Store vectors as float16 or int8 to cut their size 2x or 4x; MEMORY_RESCORE re-ranks
+# the best candidates with float32 vectors (kept in memory, or on disk when persistent)
+memory_store_options = {
+    "index_type": memory_index_type,
+    "quantization": os.getenv("MEMORY_QUANTIZATION", "none"),
+    "rescore": os.getenv("MEMORY_RESCORE", "false").lower() == "true",
+}
+
+# Near-duplicate detection for new memories: MEMORY_DEDUP_POLICY=skip drops texts
+# within MEMORY_DEDUP_MAX_DISTANCE SimHash bits of a stored one, merge records their
+# ids on the stored record, keep stores them and only counts them. MEMORY_DEDUP_SCOPE
+# lists metadata fields (such as tenant) that near-duplicates must share
+memory_store_options["dedup_policy"] = os.getenv("MEMORY_DEDUP_POLICY", "off")
+memory_store_options["dedup_params"] = {
+    "max_distance": int(os.getenv("MEMORY_DEDUP_MAX_DISTANCE", 3)),
+    "scope": [f for f in os.getenv("MEMORY_DEDUP_SCOPE", "").split(",") if f],
+}
+
+
+def create_memory_store() -> NumpyMemoryStore:
+    index_params = memory_index_params if memory_index_type == "ivf" else None
+    if memory_store_path:
+        return PersistentMemoryStore(
+            memory_store_path, index_params=index_params, **memory_store_options
+        )
+    return NumpyMemoryStore(index_params=index_params, **memory_store_options)
+
+
+memory_store = create_memory_store()
+
+# Search modes: "vector" (embedding similarity), "lexical" (BM25 keyword search, with
+# no embedding call) or "hybrid" (both, fused by reciprocal rank). Hybrid search fuses
+# the top MEMORY_HYBRID_CANDIDATES matches of each kind
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+memory_hybrid_candidates = int(os.getenv("MEMORY_HYBRID_CANDIDATES", 50))
+
+
+def get_memory_store() -> NumpyMemoryStore:
+    """
+    Return the current memory store, which reset_memory replaces.
+    """
+    return memory_store
+
 
 # Sample collections
 FINANCE_COLLECTION = "finance"
@@ -64,17 +258,27 @@ async def logger_filter(
     )
 
 
-def create_kernel(
-    plugins: Optional[List[str]] = None,
-) -> Tuple[sk.Kernel, SemanticTextMemory]:
+# Plugins that can be requested through create_kernel(plugins=...)
+AVAILABLE_PLUGINS = ("Weather",)
+
+# Pre-built kernel templates keyed by the normalized plugin list
+kernel_templates: Dict[Tuple[str, ...], Tuple[sk.Kernel, SemanticTextMemory]] = {}
+
+
+def _normalize_plugins(plugins: Optional[List[str]]) -> Tuple[str, ...]:
     """
-    Create a fresh kernel instance with the necessary services and plugins.
+    Normalize a requested plugin list into a template cache key.
 
-    Args:
-        plugins (list, optional): List of plugin names to add to the kernel. Defaults to None.
+    Unknown plugin names are dropped, so arbitrary client input cannot grow the cache.
+    """
+    return tuple(sorted({p for p in plugins or [] if p in AVAILABLE_PLUGINS}))
 
-    Returns:
-        Tuple[Kernel, SemanticTextMemory]: A new kernel instance and memory instance.
+
+def _build_kernel_template(
+    plugins: Tuple[str, ...],
+) -> Tuple[sk.Kernel, SemanticTextMemory]:
+    """
+    Build a kernel from scratch with the necessary services and plugins.
     """
     # Create a new kernel instance
     kernel = sk.Kernel()
@@ -82,23 +286,11 @@ def create_kernel(
     # Remove any existing services (just to be safe)
     kernel.remove_all_services()
 
-    # Add chat completion service
-    chat_completion = AzureChatCompletion(
-        endpoint=base_url,
-        deployment_name=deployment_name,
-        api_key=api_key,
-        service_id="chat",
-        api_version=api_version,
-    )
-    kernel.add_service(chat_completion)
-
-    # Add embedding service
-    embedding_service = AzureTextEmbedding(
-        endpoint=base_url,
-        deployment_name=embedding_deployment,
-        api_key=api_key,
-        service_id="embeddings",
-    )
+    # Add the shared chat completion service
+    kernel.add_service(service_registry.chat_service)
+
+    # Add the shared embedding service
+    embedding_service = get_embedding_generator()
     kernel.add_service(embedding_service)
 
     # Create memory instance
@@ -112,6 +304,15 @@ def create_kernel(
     # Add the logger filter
     kernel.add_filter("function_invocation", logger_filter)
 
+    # Add the response cache filters
+    kernel.add_filter("function_invocation", response_cache.function_invocation_filter)
+    kernel.add_filter("prompt_rendering", response_cache.prompt_rendering_filter)
+
+    # Share results between identical concurrent prompt invocations
+    kernel.add_filter(
+        "function_invocation", invocation_coalescer.function_invocation_filter
+    )
+
     # Import plugins here to avoid circular imports
     if plugins:
         from app.plugins.weather import WeatherPlugin
@@ -124,69 +325,422 @@ def create_kernel(
     return kernel, memory
 
 
-async def initialize_memory():
+def _clone_kernel(template: sk.Kernel) -> sk.Kernel:
     """
-    Initialize memory with sample data.
-    """
-    # Create a memory instance for initial data
-    _, memory_instance = create_kernel()
+    Create an isolated copy of a kernel template.
 
-    # Finance collection
-    await memory_instance.save_information(
-        collection=FINANCE_COLLECTION,
-        id="budget",
-        text="Your budget for 2024 is $100,000",
-    )
-    await memory_instance.save_information(
-        collection=FINANCE_COLLECTION,
-        id="savings",
-        text="Your savings from 2023 are $50,000",
-    )
-    await memory_instance.save_information(
-        collection=FINANCE_COLLECTION,
-        id="investments",
-        text="Your investments are $80,000",
+    Plugins, their function tables, services and filter lists are copied so that
+    anything a request adds to its kernel never reaches the template. The function
+    objects themselves are shared, as they are not mutated when invoked.
+    """
+    return sk.Kernel(
+        plugins={
+            name: plugin.model_copy(update={"functions": dict(plugin.functions)})
+            for name, plugin in template.plugins.items()
+        },
+        services=dict(template.services),
+        function_invocation_filters=list(template.function_invocation_filters),
+        prompt_rendering_filters=list(template.prompt_rendering_filters),
+        auto_function_invocation_filters=list(
+            template.auto_function_invocation_filters
+        ),
     )
 
-    # Personal collection
-    await memory_instance.save_information(
-        collection=PERSONAL_COLLECTION,
-        id="fact1",
-        text="John was born in Seattle in 1980",
-    )
-    await memory_instance.save_information(
-        collection=PERSONAL_COLLECTION,
-        id="fact2",
-        text="John graduated from University of Washington in 2002",
-    )
-    await memory_instance.save_information(
-        collection=PERSONAL_COLLECTION,
-        id="fact3",
-        text="John has two children named Alex and Sam",
-    )
 
+def create_kernel(
+    plugins: Optional[List[str]] = None,
+) -> Tuple[sk.Kernel, SemanticTextMemory]:
+    """
+    Create a fresh kernel instance with the necessary services and plugins.
+
+    The AI services are shared across kernels through the service registry, so
+    creating a kernel does not open new HTTP connections. Kernels are cloned from a
+    template that is built once per plugin set.
+
+    Args:
+        plugins (list, optional): List of plugin names to add to the kernel. Defaults to None.
+
+    Returns:
+        Tuple[Kernel, SemanticTextMemory]: A new kernel instance and memory instance.
+    """
+    key = _normalize_plugins(plugins)
+    template = kernel_templates.get(key)
+    if template is None:
+        template = _build_kernel_template(key)
+        kernel_templates[key] = template
+
+    template_kernel, memory = template
+    return _clone_kernel(template_kernel), memory
+
+
+# Sample data used to seed memory: (collection, id, text)
+SEED_MEMORIES = [
+    # Finance collection
+    (FINANCE_COLLECTION, "budget", "Your budget for 2024 is $100,000"),
+    (FINANCE_COLLECTION, "savings", "Your savings from 2023 are $50,000"),
+    (FINANCE_COLLECTION, "investments", "Your investments are $80,000"),
+    # Personal collection
+    (PERSONAL_COLLECTION, "fact1", "John was born in Seattle in 1980"),
+    (
+        PERSONAL_COLLECTION,
+        "fact2",
+        "John graduated from University of Washington in 2002",
+    ),
+    (PERSONAL_COLLECTION, "fact3", "John has two children named Alex and Sam"),
     # Weather collection
-    await memory_instance.save_information(
-        collection=WEATHER_COLLECTION,
-        id="fact1",
-        text="The weather in New York is typically hot and humid in summer",
-    )
-    await memory_instance.save_information(
-        collection=WEATHER_COLLECTION,
-        id="fact2",
-        text="London often experiences rain throughout the year",
-    )
-    await memory_instance.save_information(
-        collection=WEATHER_COLLECTION,
-        id="fact3",
-        text="Tokyo has a rainy season in June and July",
-    )
+    (
+        WEATHER_COLLECTION,
+        "fact1",
+        "The weather in New York is typically hot and humid in summer",
+    ),
+    (WEATHER_COLLECTION, "fact2", "London often experiences rain throughout the year"),
+    (WEATHER_COLLECTION, "fact3", "Tokyo has a rainy season in June and July"),
+]
+
+# Whether the sample data has been loaded into the current memory store
+memory_initialized = False
+memory_init_lock = asyncio.Lock()
+
+
+def metadata_json(metadata: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Serialize structured metadata for MemoryRecord.additional_metadata.
+    """
+    return json.dumps(metadata) if metadata else None
+
+
+def _same_metadata(stored: Optional[str], metadata: Optional[Dict[str, Any]]) -> bool:
+    if stored == metadata_json(metadata):
+        return True
+    return bool(metadata) and parse_metadata(stored) == metadata
+
+
+def _with_duplicates(
+    metadata: Optional[Dict[str, Any]], ids: List[str]
+) -> Dict[str, Any]:
+    duplicate_ids = list((metadata or {}).get("duplicate_ids") or [])
+    duplicate_ids += [id for id in ids if id not in duplicate_ids]
+    return {**(metadata or {}), "duplicate_ids": duplicate_ids}
+
+
+async def save_memories(
+    items: List[Tuple[str, str, str, Optional[Dict[str, Any]]]],
+) -> Dict[str, int]:
+    """
+    Upsert many memories with one batched embedding call and one bulk upsert per collection.
+
+    Records whose text and metadata are unchanged are skipped, and records whose
+    text is unchanged keep their stored embedding, so only new text is embedded.
+    In collections with near-duplicate detection, new records that nearly repeat
+    a stored record or an earlier item are handled by the collection's policy
+    before embedding: "skip" drops them, "merge" adds their ids to the
+    "duplicate_ids" metadata of the record they repeat, and "keep" stores them.
+
+    Args:
+        items (list): (collection, id, text, metadata) tuples to save.
+
+    Returns:
+        dict: The number of records created, updated and left unchanged, the
+            number of near-duplicates found, and how many of those were stored
+            (and are also counted as created).
+    """
+    counts = {
+        "created": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "duplicates": 0,
+        "duplicates_kept": 0,
+    }
+    if not items:
+        return counts
+    items = list(items)
+
+    ids_by_collection: Dict[str, List[str]] = {}
+    for collection, id, _, _ in items:
+        ids_by_collection.setdefault(collection, []).append(id)
+    existing: Dict[Tuple[str, str], MemoryRecord] = {}
+    for collection, ids in ids_by_collection.items():
+        if not await memory_store.does_collection_exist(collection_name=collection):
+            await memory_store.create_collection(collection_name=collection)
+            continue
+        for record in await memory_store.get_batch(
+            collection_name=collection, keys=ids, with_embeddings=True
+        ):
+            existing[(collection, record._id)] = record
+
+    # Embed only the texts that are new or have changed
+    embeddings: Dict[int, Any] = {}
+    to_embed = []
+    for position, (collection, id, text, metadata) in enumerate(items):
+        record = existing.get((collection, id))
+        if record is None or record._text != text:
+            to_embed.append(position)
+            counts["created" if record is None else "updated"] += 1
+        elif _same_metadata(record._additional_metadata, metadata):
+            counts["unchanged"] += 1
+        else:
+            embeddings[position] = record._embedding
+            counts["updated"] += 1
+
+    merges: Dict[Tuple[str, str], List[str]] = {}
+    batch_indexes: Dict[str, SimHashIndex] = {}
+    for position in list(to_embed):
+        collection, id, text, metadata = items[position]
+        index = memory_store.dedup_index(collection)
+        if index is None or (collection, id) in existing:
+            continue
+        if collection not in batch_indexes:
+            batch_indexes[collection] = SimHashIndex(
+                index.policy, index.max_distance, index.scope
+            )
+        batch_index = batch_indexes[collection]
+        fingerprint = simhash(text)
+        scope = index.scope_of(metadata)
+        match = index.find(fingerprint, scope, exclude=id) or batch_index.find(
+            fingerprint, scope
+        )
+        if match is None or index.policy == "keep":
+            batch_index.add(id, fingerprint, scope)
+        if match is None:
+            continue
+        counts["duplicates"] += 1
+        if index.policy == "keep":
+            memory_store.record_duplicate(collection, "kept")
+            counts["duplicates_kept"] += 1
+            continue
+        memory_store.record_duplicate(
+            collection, "skipped" if index.policy == "skip" else "merged", text
+        )
+        to_embed.remove(position)
+        counts["created"] -= 1
+        if index.policy == "merge":
+            merges.setdefault((collection, match[0]), []).append(id)
+
+    records_by_collection: Dict[str, List[MemoryRecord]] = {}
+    positions = {
+        (items[position][0], items[position][1]): position
+        for position in [*to_embed, *embeddings]
+    }
+    stored_merges: Dict[str, Dict[str, List[str]]] = {}
+    for (collection, key), ids in merges.items():
+        position = positions.get((collection, key))
+        if position is not None:
+            # The record is being written by this batch, so it takes the ids there
+            collection, id, text, metadata = items[position]
+            items[position] = (collection, id, text, _with_duplicates(metadata, ids))
+        else:
+            stored_merges.setdefault(collection, {})[key] = ids
+    for collection, ids_by_key in stored_merges.items():
+        # get_batch leaves out records removed since they were matched
+        for record in await memory_store.get_batch(
+            collection_name=collection, keys=list(ids_by_key), with_embeddings=True
+        ):
+            records_by_collection.setdefault(collection, []).append(
+                MemoryRecord.local_record(
+                    id=record._id,
+                    text=record._text,
+                    description=record._description,
+                    additional_metadata=metadata_json(
+                        _with_duplicates(
+                            parse_metadata(record._additional_metadata),
+                            ids_by_key[record._id],
+                        )
+                    ),
+                    embedding=record._embedding,
+                )
+            )
+
+    if to_embed:
+        vectors = await get_embedding_generator().generate_embeddings(
+            [items[position][2] for position in to_embed]
+        )
+        embeddings.update(zip(to_embed, vectors))
+
+    for position in sorted(embeddings):
+        collection, id, text, metadata = items[position]
+        records_by_collection.setdefault(collection, []).append(
+            MemoryRecord.local_record(
+                id=id,
+                text=text,
+                description=None,
+                additional_metadata=metadata_json(metadata),
+                embedding=embeddings[position],
+            )
+        )
+
+    for collection, records in records_by_collection.items():
+        await memory_store.upsert_batch(collection_name=collection, records=records)
+    return counts
+
+
+async def remove_stale_chunks(collection: str, id: str, chunks: int, bare: bool) -> int:
+    """
+    Remove the chunks an earlier version of a text left behind.
+
+    A text saved in `chunks` chunks has the ids "<id>#0" to "<id>#<chunks - 1>", or
+    just "<id>" if `bare`. Its other ids, the bare one or chunks numbered from
+    `chunks` on, belong to an earlier version and are removed. Chunks are numbered
+    without gaps, so they are looked up in runs until one is missing.
+
+    Returns:
+        int: The number of records removed.
+    """
+    if not await memory_store.does_collection_exist(collection_name=collection):
+        return 0
+    keys = [] if bare else [id]
+    start = 0 if bare else chunks
+    while True:
+        run = [f"{id}#{n}" for n in range(start, start + 64)]
+        found = await memory_store.get_batch(collection_name=collection, keys=run)
+        keys += [record._id for record in found]
+        if len(found) < len(run):
+            break
+        start += len(run)
+    removed = await memory_store.remove_matching(collection, keys)
+    return len(removed)
+
+
+def _candidates(limit: int, mode: str) -> int:
+    return max(limit, memory_hybrid_candidates) if mode == "hybrid" else limit
+
+
+async def search_memories(
+    queries: List[Tuple[str, str, int, str, Optional[Dict[str, Any]]]],
+) -> List[List[Tuple[MemoryRecord, float]]]:
+    """
+    Search many queries with one batched embedding call and one scan per collection.
+
+    Lexical queries are answered from the BM25 index alone and are not embedded.
+    Relevance is the cosine similarity for vector queries, the BM25 score for
+    lexical queries and the reciprocal-rank fusion score for hybrid queries.
+    Queries with a metadata filter only score the records that pass it.
+
+    Args:
+        queries (list): (collection, query, limit, mode, filter) tuples to search;
+            filter may be None.
+
+    Returns:
+        list: (record, relevance) matches for each query, in the order given.
+    """
+    for _, _, _, mode, _ in queries:
+        if mode not in SEARCH_MODES:
+            raise ValueError(
+                f"Unknown search mode '{mode}', expected one of {', '.join(SEARCH_MODES)}"
+            )
+
+    embedded = [
+        position
+        for position, (_, _, _, mode, _) in enumerate(queries)
+        if mode != "lexical"
+    ]
+    embeddings: Dict[int, np.ndarray] = {}
+    if embedded:
+        vectors = await get_embedding_generator().generate_embeddings(
+            [queries[position][1] for position in embedded]
+        )
+        embeddings = dict(zip(embedded, np.asarray(vectors)))
+
+    depths = [_candidates(limit, mode) for _, _, limit, mode, _ in queries]
+    results: List[List[Tuple[MemoryRecord, float]]] = [[] for _ in queries]
+    positions_by_collection: Dict[str, List[int]] = {}
+    for position in embedded:
+        collection, _, _, _, filter = queries[position]
+        if filter is None:
+            positions_by_collection.setdefault(collection, []).append(position)
+            continue
+        # Each filter selects its own rows, so filtered queries are searched one by one
+        results[position] = await memory_store.get_filtered_matches(
+            collection_name=collection,
+            embedding=embeddings[position],
+            limit=depths[position],
+            filter=filter,
+        )
+
+    for collection, positions in positions_by_collection.items():
+        matches = await memory_store.get_nearest_matches_batch(
+            collection_name=collection,
+            embeddings=np.stack([embeddings[position] for position in positions]),
+            limit=max(depths[position] for position in positions),
+        )
+        for position, found in zip(positions, matches):
+            results[position] = found[: depths[position]]
+
+    for position, (collection, query, limit, mode, filter) in enumerate(queries):
+        if mode == "vector":
+            results[position] = results[position][:limit]
+            continue
+        lexical = await memory_store.get_lexical_matches(
+            collection, query, depths[position], filter
+        )
+        if mode == "lexical":
+            results[position] = lexical
+            continue
+        records = {record._id: record for record, _ in results[position] + lexical}
+        fused = reciprocal_rank_fusion(
+            [
+                [record._id for record, _ in results[position]],
+                [record._id for record, _ in lexical],
+            ]
+        )
+        results[position] = [(records[id], score) for id, score in fused[:limit]]
+    return results
+
+
+async def initialize_memory():
+    """
+    Initialize memory with sample data, skipping records the store already holds.
+    """
+    missing = []
+    for collection, id, text in SEED_MEMORIES:
+        if await memory_store.does_collection_exist(
+            collection_name=collection
+        ) and await memory_store.get_batch(collection_name=collection, keys=[id]):
+            continue
+        missing.append((collection, id, text, None))
+    await save_memories(missing)
+
+
+async def ensure_memory_initialized() -> None:
+    """
+    Initialize memory with sample data once, even when called concurrently.
+    """
+    global memory_initialized
+    if memory_initialized:
+        return
+    async with memory_init_lock:
+        if memory_initialized:
+            return
+        await initialize_memory()
+        memory_initialized = True
+        logger.info("Memory initialized with sample data")
 
 
 async def reset_memory() -> None:
     """
     Reset the memory store and reinitialize with sample data.
     """
-    global memory_store
-    memory_store = VolatileMemoryStore()
-    await initialize_memory()
+    global memory_store, memory_initialized
+    async with memory_init_lock:
+        # Drop the old collections, which a persistent store would otherwise reload
+        for collection in await memory_store.get_collections():
+            await memory_store.delete_collection(collection_name=collection)
+        memory_store = create_memory_store()
+        memory_initialized = False
+        # Templates hold memory bound to the old store, so rebuild them on next use
+        kernel_templates.clear()
+        await initialize_memory()
+        memory_initialized = True
+
+
+async def close_services() -> None:
+    """
+    Close the shared AI service connection pool on shutdown.
+
+    Kernel templates and the embedding generator hold services bound to the
+    closed pool, so they are dropped too and rebuilt on next use, for example
+    when the app is started again in the same process.
+    """
+    global embedding_generator
+    kernel_templates.clear()
+    embedding_generator = None
+    await service_registry.aclose()
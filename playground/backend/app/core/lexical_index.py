@@ -0,0 +1,123 @@
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Container, Dict, Iterable, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Rank constant of reciprocal-rank fusion; larger values flatten the weight of top ranks
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase word tokens, keeping numbers such as "2024" whole.
+    """
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+class BM25Index:
+    """
+    Inverted index over the texts of one collection, scored with BM25.
+
+    Documents are keyed by record id and can be added, replaced and removed one at
+    a time: each update touches only the posting lists of the terms in that text,
+    and the collection statistics (document count and average length) are kept as
+    running totals, so the index never needs rebuilding.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> {key: term frequency}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.documents: Dict[str, Counter] = {}
+        self.lengths: Dict[str, int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.documents
+
+    def add(self, key: str, text: str) -> None:
+        """
+        Index a text under key, replacing the text indexed under it before.
+        """
+        self.remove(key)
+        tokens = tokenize(text)
+        counts = Counter(tokens)
+        for term, count in counts.items():
+            self.postings.setdefault(term, {})[key] = count
+        self.documents[key] = counts
+        self.lengths[key] = len(tokens)
+        self.total_length += len(tokens)
+
+    def add_many(self, documents: Iterable[Tuple[str, str]]) -> None:
+        for key, text in documents:
+            self.add(key, text)
+
+    def remove(self, key: str) -> None:
+        counts = self.documents.pop(key, None)
+        if counts is None:
+            return
+        for term in counts:
+            postings = self.postings[term]
+            del postings[key]
+            if not postings:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(key)
+
+    def clear(self) -> None:
+        self.postings.clear()
+        self.documents.clear()
+        self.lengths.clear()
+        self.total_length = 0
+
+    def search(
+        self, query: str, limit: int, allowed: Optional[Container[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Score the documents containing any query term, best first.
+
+        With `allowed`, only the documents whose keys it contains are scored.
+        """
+        count = len(self.documents)
+        if not count or limit <= 0:
+            return []
+        average_length = self.total_length / count or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for key, frequency in postings.items():
+                if allowed is not None and key not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[key] / average_length)
+                scores[key] = scores.get(key, 0.0) + idf * frequency * (
+                    self.k1 + 1
+                ) / (frequency + norm)
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    def describe(self) -> Dict[str, int]:
+        return {"documents": len(self.documents), "terms": len(self.postings)}
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[str]], k: int = RRF_K
+) -> List[Tuple[str, float]]:
+    """
+    Merge ranked lists of keys, scoring each key by the sum of 1 / (k + rank).
+
+    Only ranks are used, so scores on different scales (cosine similarity and
+    BM25) can be combined without calibrating them.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
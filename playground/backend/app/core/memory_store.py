@@ -0,0 +1,927 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from semantic_kernel.exceptions import (
+    ServiceInvalidRequestError,
+    ServiceResourceNotFoundError,
+)
+from semantic_kernel.memory.memory_record import MemoryRecord
+from semantic_kernel.memory.memory_store_base import MemoryStoreBase
+from app.core.ann_index import IVFFlatIndex
+from app.core.dedup import SimHashIndex, simhash
+from app.core.lexical_index import BM25Index
+from app.core.metadata_index import MetadataIndex, parse_metadata
+from app.core.quantization import make_quantizer
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class CollectionStats:
+    """
+    Usage counters of one collection, updated as it is written and searched.
+
+    Reading them takes constant time, however large the collection is.
+    """
+
+    def __init__(self):
+        self.last_write: Optional[float] = None
+        self.searches = 0
+        self.search_seconds = 0.0
+        self.duplicates = {"skipped": 0, "merged": 0, "kept": 0}
+        self.dedup_bytes_saved = 0
+
+    def record_write(self) -> None:
+        self.last_write = time.time()
+
+    def record_duplicate(self, outcome: str, bytes_saved: int = 0) -> None:
+        self.duplicates[outcome] += 1
+        self.dedup_bytes_saved += bytes_saved
+
+    @contextmanager
+    def timed_search(self, queries: int = 1) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.searches += queries
+            self.search_seconds += time.perf_counter() - start
+
+    def as_dict(self, last_write: Optional[float] = None) -> Dict[str, Any]:
+        last_write = last_write or self.last_write
+        return {
+            "last_write": (
+                datetime.fromtimestamp(last_write, timezone.utc).isoformat()
+                if last_write
+                else None
+            ),
+            "searches": self.searches,
+            "avg_search_ms": (
+                round(self.search_seconds / self.searches * 1000, 3)
+                if self.searches
+                else None
+            ),
+            "duplicates": dict(self.duplicates),
+            "dedup_bytes_saved": self.dedup_bytes_saved,
+        }
+
+
+class VectorCollection:
+    """
+    Records of one collection, laid out for vectorized similarity search.
+
+    Embeddings are kept pre-normalized in a contiguous float32 matrix, with their
+    norms, ids and records (stored without embeddings) in parallel arrays. Rows are
+    appended into spare capacity that grows geometrically. Deleted rows are marked
+    as tombstones and removed by compaction once enough of them accumulate.
+
+    Searches score every row, unless the collection has an approximate index, in
+    which case only the candidate rows it returns are scored. When a write brings
+    the index to (re)training, it is built in a worker thread from a snapshot of
+    the rows and swapped in when ready; searches stay exact until the first build,
+    and use the previous centroids during a retrain.
+
+    With a quantizer the matrix holds float16 or int8 codes instead. With `rescore`
+    a float32 copy is kept too: the codes pick RESCORE_FACTOR times more candidates
+    than requested, and those are ranked by their exact scores.
+
+    The texts are also kept in a BM25 inverted index for keyword search, and the
+    metadata fields in a MetadataIndex. When near-duplicate detection is enabled,
+    a SimHashIndex holds the fingerprints of the texts. A filtered search scores only the rows that
+    pass the filter, or the index candidates that do when the filter leaves more
+    rows than the index would probe.
+    """
+
+    INITIAL_CAPACITY = 64
+    COMPACTION_RATIO = 0.25
+    RESCORE_FACTOR = 4
+    # Above this fraction of rows passing a filter, all rows are scored and the
+    # others masked, as gathering the passing rows would cost more
+    FILTER_SCAN_RATIO = 0.5
+
+    def __init__(self, quantizer: Optional[Any] = None, rescore: bool = False):
+        self.vectors: Optional[np.ndarray] = None
+        self.full: Optional[np.ndarray] = None
+        self.quantizer = quantizer
+        self.rescore = rescore and quantizer is not None
+        self.norms = np.empty(0, dtype=np.float32)
+        self.live = np.empty(0, dtype=bool)
+        self.ids: List[str] = []
+        self.records: List[Optional[MemoryRecord]] = []
+        self.rows: Dict[str, int] = {}
+        self.size = 0
+        self.deleted = 0
+        self.index: Optional[IVFFlatIndex] = None
+        # Background index build, and the rows written since its snapshot
+        self.training: Optional[asyncio.Task] = None
+        self._training_rows: set = set()
+        self.lexical = BM25Index()
+        self.metadata = MetadataIndex()
+        self.dedup: Optional[SimHashIndex] = None
+        self.stats = CollectionStats()
+
+    def __len__(self) -> int:
+        return self.size - self.deleted
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.rows
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return None if self.vectors is None else self.vectors.shape[1]
+
+    @property
+    def capacity(self) -> int:
+        return 0 if self.vectors is None else self.vectors.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes held by the vector matrices and norms, including spare capacity.
+        """
+        total = self.norms.nbytes
+        if self.vectors is not None:
+            total += self.vectors.nbytes
+        if self.full is not None:
+            total += self.full.nbytes
+        if self.quantizer is not None:
+            total += self.quantizer.nbytes
+        return total
+
+    def _allocate(
+        self, capacity: int, dimension: int
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        dtype = np.float32 if self.quantizer is None else self.quantizer.dtype
+        vectors = np.zeros((capacity, dimension), dtype=dtype)
+        full = np.zeros((capacity, dimension), dtype=np.float32) if self.rescore else None
+        return vectors, full
+
+    def _reserve(self, rows: int, dimension: int) -> None:
+        if self.vectors is None:
+            capacity = max(self.INITIAL_CAPACITY, rows)
+            self.vectors, self.full = self._allocate(capacity, dimension)
+            self.norms = np.zeros(capacity, dtype=np.float32)
+            self.live = np.zeros(capacity, dtype=bool)
+            return
+        if dimension != self.dimension:
+            raise ServiceInvalidRequestError(
+                f"Embedding dimension {dimension} does not match collection dimension {self.dimension}"
+            )
+        needed = self.size + rows
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, self.capacity * 2)
+        vectors, full = self._allocate(capacity, dimension)
+        vectors[: self.size] = self.vectors[: self.size]
+        if full is not None:
+            full[: self.size] = self.full[: self.size]
+        norms = np.zeros(capacity, dtype=np.float32)
+        norms[: self.size] = self.norms[: self.size]
+        live = np.zeros(capacity, dtype=bool)
+        live[: self.size] = self.live[: self.size]
+        self.vectors, self.full, self.norms, self.live = vectors, full, norms, live
+
+    def float_rows(self, rows: Any) -> np.ndarray:
+        """
+        Normalized float32 vectors of rows, decoded when only codes are kept.
+        """
+        if self.full is not None:
+            return self.full[rows]
+        if self.quantizer is not None:
+            return self.quantizer.decode(self.vectors[rows])
+        return self.vectors[rows]
+
+    def _score_rows(self, rows: Any, query: np.ndarray) -> np.ndarray:
+        # One column of scores per query when query is a matrix of queries
+        if self.quantizer is not None:
+            return self.quantizer.scores(self.vectors[rows], query)
+        return self.vectors[rows] @ query.T
+
+    def set_index(self, index: Optional[IVFFlatIndex]) -> None:
+        """
+        Replace the approximate index; None switches back to exact search.
+        """
+        self._cancel_training()
+        self.index = index
+        if index is not None:
+            self._update_index(np.empty(0, dtype=np.int64))
+
+    def set_dedup(self, dedup: Optional[SimHashIndex]) -> None:
+        """
+        Enable near-duplicate detection with an empty SimHashIndex, or disable it with None.
+        """
+        if dedup is not None:
+            dedup.add_texts(
+                (record._id, record._text, parse_metadata(record._additional_metadata))
+                for record in self.records
+                if record is not None
+            )
+        self.dedup = dedup
+
+    def describe_dedup(self) -> Dict[str, Any]:
+        return {"policy": "off"} if self.dedup is None else self.dedup.describe()
+
+    def _update_index(self, rows: np.ndarray) -> None:
+        if self.index is None:
+            return
+        if self.training is not None:
+            self._training_rows.update(rows.tolist())
+        elif self.index.needs_training(len(self)):
+            live = np.flatnonzero(self.live[: self.size])
+            vectors = self.float_rows(live)
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                # No event loop to keep responsive, so build in place
+                self.index.install(self.index.build(live, vectors))
+                return
+            self._training_rows = set()
+            self.training = loop.create_task(self._train_index(self.index, live, vectors))
+        if len(rows):
+            # A batch may write the same row more than once
+            rows = np.unique(rows)
+            self.index.add(rows, self.float_rows(rows))
+
+    async def _train_index(
+        self, index: IVFFlatIndex, rows: np.ndarray, vectors: np.ndarray
+    ) -> None:
+        task = asyncio.current_task()
+        try:
+            built = await asyncio.to_thread(index.build, rows, vectors)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error training IVF index: {str(e)}")
+            return
+        finally:
+            if self.training is task:
+                self.training = None
+        if index is not self.index:
+            return
+        index.install(built)
+        # Re-assign the rows written or removed while the index was being built
+        changed = np.fromiter(self._training_rows, dtype=np.int64)
+        self._training_rows = set()
+        index.remove(changed)
+        changed = changed[self.live[changed]]
+        index.add(changed, self.float_rows(changed))
+
+    def _cancel_training(self) -> None:
+        if self.training is not None:
+            self.training.cancel()
+            self.training = None
+
+    def upsert(self, records: List[MemoryRecord]) -> None:
+        if not records:
+            return
+        matrix = np.asarray([r.embedding for r in records], dtype=np.float32)
+        matrix = matrix.reshape(len(records), -1)
+        self._reserve(len(records), matrix.shape[1])
+
+        norms = np.linalg.norm(matrix, axis=1)
+        safe_norms = np.where(norms == 0, 1, norms)
+        matrix = matrix / safe_norms[:, np.newaxis]
+        codes = matrix
+        if self.quantizer is not None:
+            self.quantizer.fit(matrix, self.vectors[: self.size])
+            codes = self.quantizer.encode(matrix)
+
+        changed = []
+        for record, vector, code, norm in zip(records, matrix, codes, norms):
+            record._key = record._id
+            row = self.rows.get(record._id)
+            if row is None:
+                row = self.size
+                self.size += 1
+                self.ids.append(record._id)
+                self.records.append(None)
+                self.rows[record._id] = row
+            self.vectors[row] = code
+            if self.full is not None:
+                self.full[row] = vector
+            self.norms[row] = norm
+            self.live[row] = True
+            self.records[row] = _without_embedding(record)
+            self.lexical.add(record._id, record._text)
+            metadata = parse_metadata(record._additional_metadata)
+            self.metadata.add(row, metadata)
+            if self.dedup is not None:
+                self.dedup.add(
+                    record._id, simhash(record._text), self.dedup.scope_of(metadata)
+                )
+            changed.append(row)
+        self._update_index(np.asarray(changed, dtype=np.int64))
+        self.stats.record_write()
+
+    def remove(self, keys: List[str]) -> None:
+        removed = []
+        for key in keys:
+            row = self.rows.pop(key, None)
+            if row is None:
+                continue
+            self.live[row] = False
+            self.records[row] = None
+            self.lexical.remove(key)
+            self.metadata.remove(row)
+            if self.dedup is not None:
+                self.dedup.remove(key)
+            self.deleted += 1
+            removed.append(row)
+        if removed:
+            self.stats.record_write()
+        if self.training is not None:
+            self._training_rows.update(removed)
+        if self.index is not None:
+            self.index.remove(removed)
+        if self.deleted > max(self.INITIAL_CAPACITY, self.size * self.COMPACTION_RATIO):
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Drop tombstoned rows, keeping the live rows contiguous.
+        """
+        if not self.deleted:
+            return
+        keep = np.flatnonzero(self.live[: self.size])
+        self.vectors[: len(keep)] = self.vectors[keep]
+        if self.full is not None:
+            self.full[: len(keep)] = self.full[keep]
+        self.norms[: len(keep)] = self.norms[keep]
+        self.live[: len(keep)] = True
+        self.live[len(keep) :] = False
+        self.ids = [self.ids[i] for i in keep]
+        self.records = [self.records[i] for i in keep]
+        self.rows = {id: row for row, id in enumerate(self.ids)}
+        self.metadata.renumber(keep)
+        self.size = len(keep)
+        self.deleted = 0
+        if self.index is not None:
+            self.index.renumber(keep)
+            # A build in progress holds the old row numbers, so start it again
+            if self.training is not None:
+                self._cancel_training()
+                self._update_index(np.empty(0, dtype=np.int64))
+
+    def record(self, row: int, with_embedding: bool) -> MemoryRecord:
+        record = self.records[row]
+        embedding = (
+            self.float_rows(row) * self.norms[row] if with_embedding else None
+        )
+        return _copy_record(record, embedding)
+
+    def get(self, key: str, with_embedding: bool) -> Optional[MemoryRecord]:
+        row = self.rows.get(key)
+        return None if row is None else self.record(row, with_embedding)
+
+    @staticmethod
+    def _normalize_query(embedding: np.ndarray) -> np.ndarray:
+        query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        return query / norm if norm > 0 else query
+
+    @staticmethod
+    def _normalize_queries(embeddings: np.ndarray) -> np.ndarray:
+        queries = np.asarray(embeddings, dtype=np.float32)
+        queries = queries.reshape(len(queries), -1)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        return queries / np.where(norms == 0, 1, norms)
+
+    def filter_mask(self, filter: Dict[str, Any]) -> np.ndarray:
+        """
+        Mask of the live rows whose metadata passes a filter.
+        """
+        return self.metadata.mask(filter, self.size) & self.live[: self.size]
+
+    def filter_keys(self, filter: Dict[str, Any]) -> List[str]:
+        return [self.ids[row] for row in np.flatnonzero(self.filter_mask(filter))]
+
+    def scores(self, embedding: np.ndarray) -> np.ndarray:
+        """
+        Cosine similarity of the query with every row; tombstoned rows score -inf.
+        """
+        query = self._normalize_query(embedding)
+        scores = self._score_rows(slice(0, self.size), query)
+        if self.deleted:
+            scores[~self.live[: self.size]] = -np.inf
+        return scores
+
+    def top_k(
+        self, scores: np.ndarray, limit: int, min_relevance_score: float
+    ) -> List[Tuple[int, float]]:
+        """
+        Select the rows with the highest scores, best first.
+        """
+        k = min(limit, len(scores))
+        if k <= 0:
+            return []
+        if k < len(scores):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [
+            (int(row), float(scores[row]))
+            for row in candidates
+            if scores[row] >= min_relevance_score
+        ]
+
+    @staticmethod
+    def rerank(
+        rows: List[int],
+        vectors: np.ndarray,
+        query: np.ndarray,
+        limit: int,
+        min_relevance_score: float,
+    ) -> List[Tuple[int, float]]:
+        """
+        Rank candidate rows by their exact scores against float32 vectors.
+        """
+        if not rows:
+            return []
+        rows = np.asarray(rows)
+        scores = vectors[rows] @ query
+        order = np.argsort(-scores, kind="stable")[:limit]
+        return [
+            (int(rows[i]), float(scores[i]))
+            for i in order
+            if scores[i] >= min_relevance_score
+        ]
+
+    def search(
+        self,
+        embedding: np.ndarray,
+        limit: int,
+        min_relevance_score: float = 0.0,
+        nprobe: Optional[int] = None,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the best rows for a query, through the approximate index when it is trained.
+
+        Falls back to exact search when the probed lists hold fewer than `limit` rows.
+        With a filter, only rows whose metadata passes it are scored.
+        """
+        if self.size == 0:
+            return []
+        query = self._normalize_query(embedding)
+        rows = allowed = None
+        if filter is not None:
+            allowed = self.filter_mask(filter)
+            rows = np.flatnonzero(allowed)
+        if self.index is not None and self.index.trained:
+            candidates = self.index.candidates(query, nprobe)
+            if allowed is not None:
+                # A selective filter leaves fewer rows than the probed lists hold,
+                # and those are scored exactly
+                candidates = (
+                    candidates[allowed[candidates]]
+                    if len(rows) > len(candidates)
+                    else candidates[:0]
+                )
+            if len(candidates) >= limit:
+                rows, allowed = candidates, None
+        if allowed is not None and len(rows) > self.FILTER_SCAN_RATIO * self.size:
+            rows = None
+
+        if rows is None:
+            scores = self.scores(query)
+            if allowed is not None:
+                scores[~allowed] = -np.inf
+        else:
+            scores = self._score_rows(rows, query)
+
+        if self.rescore:
+            # Skip tombstones (-inf) but no other candidate before re-scoring
+            matches = self.top_k(
+                scores, limit * self.RESCORE_FACTOR, np.finfo(np.float32).min
+            )
+        else:
+            matches = self.top_k(scores, limit, min_relevance_score)
+        if rows is not None:
+            matches = [(int(rows[i]), score) for i, score in matches]
+        if self.rescore:
+            matches = self.rerank(
+                [row for row, _ in matches], self.full, query, limit, min_relevance_score
+            )
+        return matches
+
+    def search_batch(
+        self, embeddings: np.ndarray, limit: int, min_relevance_score: float = 0.0
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Find the best rows for several queries, scoring all of them with one matrix product.
+
+        With a trained approximate index, each query is searched through it instead.
+        """
+        queries = self._normalize_queries(embeddings)
+        if self.index is not None and self.index.trained:
+            return [self.search(query, limit, min_relevance_score) for query in queries]
+
+        # One row of scores per query
+        scores = self._score_rows(slice(0, self.size), queries).T
+        if self.deleted:
+            scores[:, ~self.live[: self.size]] = -np.inf
+        results = []
+        for row, query in zip(scores, queries):
+            if not self.rescore:
+                results.append(self.top_k(row, limit, min_relevance_score))
+                continue
+            candidates = self.top_k(
+                row, limit * self.RESCORE_FACTOR, np.finfo(np.float32).min
+            )
+            results.append(
+                self.rerank(
+                    [r for r, _ in candidates],
+                    self.full,
+                    query,
+                    limit,
+                    min_relevance_score,
+                )
+            )
+        return results
+
+    def describe_index(self) -> Dict[str, Any]:
+        description = {"type": "flat"} if self.index is None else self.index.describe()
+        if self.index is not None:
+            description["training"] = self.training is not None
+        description["quantization"] = (
+            "none" if self.quantizer is None else self.quantizer.kind
+        )
+        description["rescore"] = self.rescore
+        return description
+
+    def describe(self) -> Dict[str, Any]:
+        """
+        Size and usage of the collection, from counters kept up to date on writes.
+        """
+        return {
+            "count": len(self),
+            "dimension": self.dimension,
+            "bytes": self.nbytes,
+            "index_type": "flat" if self.index is None else "ivf",
+            "quantization": "none" if self.quantizer is None else self.quantizer.kind,
+            "dedup": "off" if self.dedup is None else self.dedup.policy,
+            **self.stats.as_dict(),
+        }
+
+
+def _without_embedding(record: MemoryRecord) -> MemoryRecord:
+    return _copy_record(record, None)
+
+
+def _copy_record(record: MemoryRecord, embedding: Optional[np.ndarray]) -> MemoryRecord:
+    return MemoryRecord(
+        is_reference=record._is_reference,
+        external_source_name=record._external_source_name,
+        id=record._id,
+        description=record._description,
+        text=record._text,
+        additional_metadata=record._additional_metadata,
+        embedding=embedding,
+        key=record._key,
+        timestamp=record._timestamp,
+    )
+
+
+class NumpyMemoryStore(MemoryStoreBase):
+    """
+    In-memory store that scores a whole collection with one matrix-vector product.
+
+    A drop-in replacement for VolatileMemoryStore: each collection keeps its
+    embeddings in a VectorCollection and top-k selection uses argpartition.
+
+    New collections use `index_type` ("flat" for exact search, or "ivf"), with
+    `index_params` passed to the index; `configure_index` changes one collection.
+    They store vectors with the given `quantization` ("none", "float16" or "int8"),
+    re-scoring the best candidates with float32 vectors when `rescore` is set.
+    They detect near-duplicate texts with `dedup_policy` ("off", "skip", "merge"
+    or "keep") and `dedup_params`; `configure_dedup` changes one collection.
+    """
+
+    INDEX_TYPES = ("flat", "ivf")
+
+    def __init__(
+        self,
+        index_type: str = "flat",
+        index_params: Optional[Dict[str, Any]] = None,
+        quantization: Optional[str] = None,
+        rescore: bool = False,
+        dedup_policy: str = "off",
+        dedup_params: Optional[Dict[str, Any]] = None,
+    ):
+        self._collections: Dict[str, VectorCollection] = {}
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        # Fail early on an unknown quantization or dedup policy
+        make_quantizer(quantization)
+        self.quantization = quantization
+        self.rescore = rescore
+        self.make_dedup(dedup_policy, **(dedup_params or {}))
+        self.dedup_policy = dedup_policy
+        self.dedup_params = dedup_params or {}
+
+    @classmethod
+    def make_index(cls, index_type: str, **params: Any) -> Optional[IVFFlatIndex]:
+        if index_type not in cls.INDEX_TYPES:
+            raise ServiceInvalidRequestError(
+                f"Unknown index type '{index_type}', expected one of {', '.join(cls.INDEX_TYPES)}"
+            )
+        return IVFFlatIndex(**params) if index_type == "ivf" else None
+
+    def configure_index(
+        self, collection_name: str, index_type: str, **params: Any
+    ) -> Dict[str, Any]:
+        """
+        Switch a collection to exact search or to an IVF index with the given parameters.
+        """
+        collection = self._collection(collection_name)
+        current = collection.index
+        if (
+            index_type == "ivf"
+            and current is not None
+            and params.get("nlist", current.nlist) == current.nlist
+            and params.get("train_size", current.train_size) == current.train_size
+        ):
+            # Only the number of probed lists changes, which needs no retraining
+            current.nprobe = params.get("nprobe", current.nprobe)
+        else:
+            collection.set_index(self.make_index(index_type, **params))
+        return collection.describe_index()
+
+    def describe_index(self, collection_name: str) -> Dict[str, Any]:
+        return self._collection(collection_name).describe_index()
+
+    async def wait_for_index(self, collection_name: str) -> Dict[str, Any]:
+        """
+        Wait until no index build of the collection is running, then describe the index.
+        """
+        collection = self._collection(collection_name)
+        while collection.training is not None:
+            # A build restarted by compaction replaces the one being waited on
+            await asyncio.wait({collection.training})
+        return collection.describe_index()
+
+    @staticmethod
+    def make_dedup(policy: str, **params: Any) -> Optional[SimHashIndex]:
+        return None if policy == "off" else SimHashIndex(policy, **params)
+
+    def configure_dedup(
+        self, collection_name: str, policy: str, **params: Any
+    ) -> Dict[str, Any]:
+        """
+        Set how a collection treats near-duplicate texts, or turn detection off.
+        """
+        collection = self._collection(collection_name)
+        collection.set_dedup(self.make_dedup(policy, **params))
+        return collection.describe_dedup()
+
+    def describe_dedup(self, collection_name: str) -> Dict[str, Any]:
+        collection = self._collection(collection_name)
+        return {
+            **collection.describe_dedup(),
+            "duplicates": dict(collection.stats.duplicates),
+            "bytes_saved": collection.stats.dedup_bytes_saved,
+        }
+
+    def dedup_index(self, collection_name: str) -> Optional[SimHashIndex]:
+        collection = self._find(collection_name)
+        return None if collection is None else collection.dedup
+
+    def record_duplicate(
+        self, collection_name: str, outcome: str, text: str = ""
+    ) -> None:
+        """
+        Count a near-duplicate; one that was not stored saves its text and vector.
+        """
+        collection = self._collection(collection_name)
+        bytes_saved = 0
+        if outcome != "kept":
+            # Estimated as the text plus a float32 vector and its norm
+            bytes_saved = len(text.encode("utf-8")) + 4 * ((collection.dimension or 0) + 1)
+        collection.stats.record_duplicate(outcome, bytes_saved)
+
+    async def describe_collections(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Record count, dimension, bytes, index, last write and search latency per collection.
+        """
+        descriptions = {}
+        for name in await self.get_collections():
+            collection = self._find(name)
+            if collection is not None:
+                descriptions[name] = collection.describe()
+        return descriptions
+
+    def _find(self, collection_name: str) -> Optional[VectorCollection]:
+        return self._collections.get(collection_name)
+
+    def _collection(self, collection_name: str) -> VectorCollection:
+        collection = self._find(collection_name)
+        if collection is None:
+            raise ServiceResourceNotFoundError(
+                f"Collection '{collection_name}' does not exist"
+            )
+        return collection
+
+    def _new_collection(self, collection_name: str) -> VectorCollection:
+        collection = VectorCollection(make_quantizer(self.quantization), self.rescore)
+        collection.set_index(self.make_index(self.index_type, **self.index_params))
+        collection.set_dedup(self.make_dedup(self.dedup_policy, **self.dedup_params))
+        return collection
+
+    async def create_collection(self, collection_name: str) -> None:
+        if self._find(collection_name) is None:
+            self._collections[collection_name] = self._new_collection(collection_name)
+
+    async def get_collections(self) -> List[str]:
+        return list(self._collections.keys())
+
+    async def delete_collection(self, collection_name: str) -> None:
+        self._collections.pop(collection_name, None)
+
+    async def does_collection_exist(self, collection_name: str) -> bool:
+        return self._find(collection_name) is not None
+
+    async def upsert(self, collection_name: str, record: MemoryRecord) -> str:
+        self._collection(collection_name).upsert([record])
+        return record._key
+
+    async def upsert_batch(
+        self, collection_name: str, records: List[MemoryRecord]
+    ) -> List[str]:
+        self._collection(collection_name).upsert(records)
+        return [record._key for record in records]
+
+    async def get(
+        self, collection_name: str, key: str, with_embedding: bool = False
+    ) -> MemoryRecord:
+        record = self._collection(collection_name).get(key, with_embedding)
+        if record is None:
+            raise ServiceResourceNotFoundError(
+                f"Key '{key}' not found in collection '{collection_name}'"
+            )
+        return record
+
+    async def get_batch(
+        self, collection_name: str, keys: List[str], with_embeddings: bool = False
+    ) -> List[MemoryRecord]:
+        collection = self._collection(collection_name)
+        records = [collection.get(key, with_embeddings) for key in keys]
+        return [record for record in records if record is not None]
+
+    async def remove(self, collection_name: str, key: str) -> None:
+        collection = self._collection(collection_name)
+        if key not in collection:
+            raise ServiceResourceNotFoundError(
+                f"Key '{key}' not found in collection '{collection_name}'"
+            )
+        collection.remove([key])
+
+    async def remove_batch(self, collection_name: str, keys: List[str]) -> None:
+        self._collection(collection_name).remove(keys)
+
+    async def remove_matching(
+        self,
+        collection_name: str,
+        keys: Optional[List[str]] = None,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[str]:
+        """
+        Remove the records with the given keys, or whose metadata passes a filter, or both.
+
+        Rows are tombstoned rather than rewritten, and compacted once enough accumulate.
+
+        Returns:
+            list: The keys of the records removed.
+        """
+        collection = self._collection(collection_name)
+        if filter is not None:
+            matched = collection.filter_keys(filter)
+            if keys is not None:
+                wanted = set(keys)
+                matched = [key for key in matched if key in wanted]
+            keys = matched
+        else:
+            keys = [key for key in dict.fromkeys(keys or []) if key in collection]
+        if keys:
+            await self.remove_batch(collection_name, keys)
+        return keys
+
+    async def get_nearest_matches(
+        self,
+        collection_name: str,
+        embedding: np.ndarray,
+        limit: int,
+        min_relevance_score: float = 0.0,
+        with_embeddings: bool = False,
+    ) -> List[Tuple[MemoryRecord, float]]:
+        collection = self._find(collection_name)
+        if collection is None:
+            logger.warning(
+                f"Collection '{collection_name}' does not exist in collections: "
+                f"{', '.join(self._collections.keys())}"
+            )
+            return []
+        if not len(collection):
+            return []
+
+        with collection.stats.timed_search():
+            return [
+                (collection.record(row, with_embeddings), score)
+                for row, score in collection.search(
+                    embedding, limit, min_relevance_score
+                )
+            ]
+
+    async def get_filtered_matches(
+        self,
+        collection_name: str,
+        embedding: np.ndarray,
+        limit: int,
+        filter: Dict[str, Any],
+        min_relevance_score: float = 0.0,
+        with_embeddings: bool = False,
+    ) -> List[Tuple[MemoryRecord, float]]:
+        """
+        Nearest matches among the records whose metadata passes a filter.
+        """
+        collection = self._find(collection_name)
+        if collection is None:
+            logger.warning(f"Collection '{collection_name}' does not exist")
+            return []
+        with collection.stats.timed_search():
+            return [
+                (collection.record(row, with_embeddings), score)
+                for row, score in collection.search(
+                    embedding, limit, min_relevance_score, filter=filter
+                )
+            ]
+
+    async def get_nearest_matches_batch(
+        self,
+        collection_name: str,
+        embeddings: np.ndarray,
+        limit: int,
+        min_relevance_score: float = 0.0,
+        with_embeddings: bool = False,
+    ) -> List[List[Tuple[MemoryRecord, float]]]:
+        """
+        Nearest matches for several query embeddings, searched together.
+        """
+        collection = self._find(collection_name)
+        if collection is None:
+            logger.warning(f"Collection '{collection_name}' does not exist")
+            return [[] for _ in embeddings]
+        if not len(collection):
+            return [[] for _ in embeddings]
+
+        with collection.stats.timed_search(len(embeddings)):
+            return [
+                [
+                    (collection.record(row, with_embeddings), score)
+                    for row, score in matches
+                ]
+                for matches in collection.search_batch(
+                    embeddings, limit, min_relevance_score
+                )
+            ]
+
+    async def get_lexical_matches(
+        self,
+        collection_name: str,
+        query: str,
+        limit: int,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[MemoryRecord, float]]:
+        """
+        Best BM25 matches for the terms of a query; needs no embedding.
+        """
+        collection = self._find(collection_name)
+        if collection is None:
+            logger.warning(f"Collection '{collection_name}' does not exist")
+            return []
+        with collection.stats.timed_search():
+            allowed = None if filter is None else set(collection.filter_keys(filter))
+            return [
+                (collection.get(key, False), score)
+                for key, score in collection.lexical.search(query, limit, allowed)
+            ]
+
+    async def get_nearest_match(
+        self,
+        collection_name: str,
+        embedding: np.ndarray,
+        min_relevance_score: float = 0.0,
+        with_embedding: bool = False,
+    ) -> Tuple[MemoryRecord, float]:
+        matches = await self.get_nearest_matches(
+            collection_name=collection_name,
+            embedding=embedding,
+            limit=1,
+            min_relevance_score=min_relevance_score,
+            with_embeddings=with_embedding,
+        )
+        return matches[0] if matches else None
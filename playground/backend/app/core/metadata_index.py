@@ -0,0 +1,218 @@
+import json
+import operator
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from semantic_kernel.exceptions import ServiceInvalidRequestError
+
+RANGES: Dict[str, Callable[[Any, Any], Any]] = {
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+}
+OPERATORS = ("$eq", "$ne", "$in", "$nin", "$exists", *RANGES)
+
+
+def parse_metadata(additional_metadata: Optional[str]) -> Dict[str, Any]:
+    """
+    Structured metadata of a record, stored as a JSON object in additional_metadata.
+
+    Anything else (no metadata, or free text) reads as no fields.
+    """
+    if not additional_metadata:
+        return {}
+    try:
+        metadata = json.loads(additional_metadata)
+    except ValueError:
+        return {}
+    return metadata if isinstance(metadata, dict) else {}
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _hashable(value: Any) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def _key(value: Any) -> Any:
+    # True == 1 and False == 0 in Python, so booleans get keys of their own
+    return ("bool", value) if isinstance(value, bool) else value
+
+
+def _index_keys(value: Any) -> List[Any]:
+    # A list value (such as tags) matches each of its elements
+    values = value if isinstance(value, list) else [value]
+    return [_key(v) for v in values if _hashable(v)]
+
+
+class MetadataIndex:
+    """
+    Indexes of the metadata fields of one collection's rows, used to pre-filter searches.
+
+    Each field has a hash index from value to the rows holding it, which answers
+    equality and membership conditions by reading only the matching rows, and
+    numeric fields also have a column of values (NaN where missing) for range
+    conditions. Filters evaluate to a boolean mask over the rows, so similarity is
+    only scored for the rows that pass.
+
+    Filters are JSON objects mapping fields to a value or to conditions:
+        {"tenant": "acme", "year": {"$gte": 2023}, "source": {"$in": ["a", "b"]}}
+    Supported conditions are $eq, $ne, $in, $nin, $exists, $gt, $gte, $lt and $lte;
+    "$and" and "$or" take lists of filters and "$not" one filter.
+    """
+
+    INITIAL_CAPACITY = 64
+
+    def __init__(self):
+        self.values: Dict[str, Dict[Any, Set[int]]] = {}
+        self.numbers: Dict[str, np.ndarray] = {}
+        self.metadata: Dict[int, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+    def _column(self, field: str, row: int) -> np.ndarray:
+        column = self.numbers.get(field)
+        if column is None or row >= len(column):
+            capacity = max(self.INITIAL_CAPACITY, row + 1)
+            if column is not None:
+                capacity = max(capacity, len(column) * 2)
+            grown = np.full(capacity, np.nan)
+            if column is not None:
+                grown[: len(column)] = column
+            self.numbers[field] = column = grown
+        return column
+
+    def add(self, row: int, metadata: Dict[str, Any]) -> None:
+        """
+        Index the metadata of a row, replacing what was indexed for it before.
+        """
+        self.remove(row)
+        if not metadata:
+            return
+        self.metadata[row] = metadata
+        for field, value in metadata.items():
+            for key in _index_keys(value):
+                self.values.setdefault(field, {}).setdefault(key, set()).add(row)
+            if _is_number(value):
+                self._column(field, row)[row] = value
+
+    def add_many(self, items: Iterable[Tuple[int, Dict[str, Any]]]) -> None:
+        for row, metadata in items:
+            self.add(row, metadata)
+
+    def remove(self, row: int) -> None:
+        metadata = self.metadata.pop(row, None)
+        if metadata is None:
+            return
+        for field, value in metadata.items():
+            if _is_number(value):
+                self.numbers[field][row] = np.nan
+            values = self.values.get(field, {})
+            for key in _index_keys(value):
+                rows = values[key]
+                rows.discard(row)
+                if not rows:
+                    del values[key]
+            if field in self.values and not values:
+                del self.values[field]
+
+    def clear(self) -> None:
+        self.values.clear()
+        self.numbers.clear()
+        self.metadata.clear()
+
+    def renumber(self, keep: np.ndarray) -> None:
+        """
+        Re-index after compaction, where row keep[i] has become row i.
+        """
+        # clear() empties the dict in place, so keep it aside first
+        metadata, self.metadata = self.metadata, {}
+        self.clear()
+        for row, previous in enumerate(keep):
+            fields = metadata.get(int(previous))
+            if fields:
+                self.add(row, fields)
+
+    @staticmethod
+    def _rows_mask(rows: Iterable[int], size: int) -> np.ndarray:
+        mask = np.zeros(size, dtype=bool)
+        rows = np.fromiter(rows, dtype=np.int64)
+        mask[rows[rows < size]] = True
+        return mask
+
+    def mask(self, filter: Dict[str, Any], size: int) -> np.ndarray:
+        """
+        Evaluate a filter to a boolean mask over the first `size` rows.
+        """
+        if not isinstance(filter, dict):
+            raise ServiceInvalidRequestError("A filter must be a JSON object")
+        mask = np.ones(size, dtype=bool)
+        for field, condition in filter.items():
+            if field in ("$and", "$or"):
+                if not isinstance(condition, list) or not condition:
+                    raise ServiceInvalidRequestError(
+                        f"{field} takes a non-empty list of filters"
+                    )
+                masks = [self.mask(sub, size) for sub in condition]
+                combine = np.logical_and if field == "$and" else np.logical_or
+                mask &= combine.reduce(masks)
+            elif field == "$not":
+                mask &= ~self.mask(condition, size)
+            elif field.startswith("$"):
+                raise ServiceInvalidRequestError(f"Unknown filter operator '{field}'")
+            elif isinstance(condition, dict):
+                for op, operand in condition.items():
+                    mask &= self._condition(field, op, operand, size)
+            else:
+                mask &= self._condition(field, "$eq", condition, size)
+        return mask
+
+    def _condition(self, field: str, op: str, operand: Any, size: int) -> np.ndarray:
+        values = self.values.get(field, {})
+        if op in ("$eq", "$ne"):
+            if not _hashable(operand):
+                raise ServiceInvalidRequestError(
+                    f"{op} on '{field}' takes a string, number, boolean or null"
+                )
+            mask = self._rows_mask(values.get(_key(operand), ()), size)
+            return mask if op == "$eq" else ~mask
+        if op in ("$in", "$nin"):
+            if not isinstance(operand, list) or not all(map(_hashable, operand)):
+                raise ServiceInvalidRequestError(
+                    f"{op} on '{field}' takes a list of strings, numbers or booleans"
+                )
+            rows: Set[int] = set()
+            for value in operand:
+                rows.update(values.get(_key(value), ()))
+            mask = self._rows_mask(rows, size)
+            return mask if op == "$in" else ~mask
+        if op == "$exists":
+            rows = set().union(*values.values()) if values else set()
+            mask = self._rows_mask(rows, size)
+            return mask if operand else ~mask
+        if op in RANGES:
+            compare = RANGES[op]
+            if _is_number(operand):
+                mask = np.zeros(size, dtype=bool)
+                column = self.numbers.get(field)
+                if column is not None:
+                    column = column[:size]
+                    with np.errstate(invalid="ignore"):
+                        mask[: len(column)] = compare(column, operand)
+                return mask
+            if isinstance(operand, str):
+                # Strings such as ISO dates compare in order over the distinct values
+                rows = set()
+                for value, value_rows in values.items():
+                    if isinstance(value, str) and compare(value, operand):
+                        rows.update(value_rows)
+                return self._rows_mask(rows, size)
+            raise ServiceInvalidRequestError(
+                f"{op} on '{field}' takes a number or a string"
+            )
+        raise ServiceInvalidRequestError(
+            f"Unknown filter operator '{op}', expected one of {', '.join(OPERATORS)}"
+        )
@@ -0,0 +1,350 @@
+import asyncio
+import logging
+import math
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from semantic_kernel.agents import Agent, ChatCompletionAgent
+from semantic_kernel.agents.chat_completion.chat_completion_agent import (
+    ChatHistoryAgentThread,
+)
+from semantic_kernel.agents.strategies import (
+    SequentialSelectionStrategy,
+    TerminationStrategy,
+)
+from semantic_kernel.contents import (
+    AuthorRole,
+    ChatMessageContent,
+    FunctionCallContent,
+    FunctionResultContent,
+)
+from semantic_kernel.contents.chat_history import ChatHistory
+from semantic_kernel.exceptions import ServiceInvalidRequestError
+from semantic_kernel.functions import KernelArguments
+from app.core.lexical_index import tokenize
+from app.core.semantic_cache import usage_tokens
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# "sequential" runs the agents in turn, as an AgentGroupChat would; "parallel" runs
+# every agent but the synthesizer at once, then the synthesizer over their answers
+ORCHESTRATIONS = ("sequential", "parallel")
+DEFAULT_SYNTHESIZER = "Synthesizer"
+
+# Name of the agent whose turn is running, for filters that report what it does
+active_agent: ContextVar[Optional[str]] = ContextVar("active_agent", default=None)
+
+# Receives (agent name, text delta) while agents stream their answers
+OnChunk = Callable[[str, str], Awaitable[None]]
+
+# Rough characters per token, for turns whose completion reports no usage
+CHARS_PER_TOKEN = 4
+
+
+def text_similarity(a: str, b: str) -> float:
+    """
+    Cosine similarity of the word counts of two texts, from 0 (no shared words) to 1.
+    """
+    counts_a, counts_b = Counter(tokenize(a)), Counter(tokenize(b))
+    dot = sum(count * counts_b[token] for token, count in counts_a.items())
+    if not dot:
+        return 0.0
+    norm_a = math.sqrt(sum(count * count for count in counts_a.values()))
+    norm_b = math.sqrt(sum(count * count for count in counts_b.values()))
+    return dot / (norm_a * norm_b)
+
+
+def message_tokens(message: ChatMessageContent) -> int:
+    """
+    Tokens a message cost, from its usage metadata or estimated from its length.
+
+    A message without text is estimated from its function call arguments and results.
+    """
+    text = message.content or "".join(
+        str(item.result if isinstance(item, FunctionResultContent) else item.arguments or "")
+        for item in message.items
+        if isinstance(item, (FunctionCallContent, FunctionResultContent))
+    )
+    return usage_tokens(message.metadata) or len(text) // CHARS_PER_TOKEN
+
+
+class ConvergenceTerminationStrategy(TerminationStrategy):
+    """
+    Ends a group chat as soon as a cheap local signal says it is done.
+
+    After each turn the chat stops if the answer contains `completion_marker`,
+    if it repeats the previous turn or the same agent's previous turn (word-count
+    cosine similarity of at least `similarity_threshold`), or once the turns have
+    used `token_budget` tokens. None of the checks calls a model. With no signal
+    set it runs for maximum_iterations turns, as DefaultTerminationStrategy does.
+
+    The budget counts every message added to the history since the previous check,
+    such as the function calls and results of a turn, not only its final answer.
+    """
+
+    completion_marker: Optional[str] = None
+    similarity_threshold: Optional[float] = None
+    token_budget: Optional[int] = None
+    turns: int = 0
+    tokens: int = 0
+    # Length of the history at the previous check
+    counted: int = 0
+    reason: Optional[str] = None
+
+    def _converged(self, agent: Agent, history: List[ChatMessageContent]) -> bool:
+        answers = [
+            message
+            for message in history
+            if message.role == AuthorRole.ASSISTANT and message.content
+        ]
+        if len(answers) < 2:
+            return False
+        latest = answers[-1]
+        previous = [answers[-2]]
+        # The same agent's previous turn, when the rotation has come back to it
+        previous += [m for m in answers[-2::-1] if m.name == agent.name][:1]
+        return any(
+            text_similarity(latest.content, message.content) >= self.similarity_threshold
+            for message in previous
+        )
+
+    def start(self, history: List[ChatMessageContent]) -> None:
+        """
+        Count only the messages added to `history` from now on against the budget.
+        """
+        self.counted = len(history)
+
+    async def should_agent_terminate(
+        self, agent: Agent, history: List[ChatMessageContent]
+    ) -> bool:
+        if self.counted > len(history):
+            # A new or truncated history
+            self.counted = 0
+        self.tokens += sum(message_tokens(m) for m in history[self.counted :])
+        self.counted = len(history)
+        message = history[-1]
+        if not message.content:
+            # A function call, not yet the agent's answer
+            return False
+        self.turns += 1
+        if self.completion_marker and self.completion_marker in message.content:
+            self.reason = "completion_marker"
+        elif self.similarity_threshold is not None and self._converged(agent, history):
+            self.reason = "converged"
+        elif self.token_budget is not None and self.tokens >= self.token_budget:
+            self.reason = "token_budget"
+        return self.reason is not None
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Why the chat ended, and the turns and (estimated) tokens that stopping early saved.
+        """
+        skipped = max(self.maximum_iterations - self.turns, 0) if self.reason else 0
+        per_turn = self.tokens / self.turns if self.turns else 0
+        return {
+            "reason": self.reason or "max_iterations",
+            "turns": self.turns,
+            "turns_skipped": skipped,
+            "tokens_used": self.tokens,
+            "tokens_saved_estimate": round(skipped * per_turn),
+        }
+
+
+def make_termination_strategy(
+    maximum_iterations: int,
+    completion_marker: Optional[str] = None,
+    similarity_threshold: Optional[float] = None,
+    token_budget: Optional[int] = None,
+) -> ConvergenceTerminationStrategy:
+    if maximum_iterations < 1:
+        raise ServiceInvalidRequestError("max_iterations must be at least 1")
+    if similarity_threshold is not None and not 0 < similarity_threshold <= 1:
+        raise ServiceInvalidRequestError(
+            "convergence_threshold must be greater than 0 and at most 1"
+        )
+    if token_budget is not None and token_budget < 1:
+        raise ServiceInvalidRequestError("token_budget must be at least 1")
+    return ConvergenceTerminationStrategy(
+        maximum_iterations=maximum_iterations,
+        completion_marker=completion_marker or None,
+        similarity_threshold=similarity_threshold,
+        token_budget=token_budget,
+    )
+
+
+class TrackingSelectionStrategy(SequentialSelectionStrategy):
+    """
+    Round-robin selection that records each selected agent in active_agent.
+    """
+
+    async def select_agent(
+        self, agents: List[Agent], history: List[ChatMessageContent]
+    ) -> Agent:
+        agent = await super().select_agent(agents, history)
+        active_agent.set(agent.name)
+        return agent
+
+
+def select_synthesizer(
+    agents: Sequence[ChatCompletionAgent], name: Optional[str] = None
+) -> ChatCompletionAgent:
+    """
+    The agent named `name`, else the one named "Synthesizer", else the last agent.
+    """
+    if name is not None:
+        for agent in agents:
+            if agent.name == name:
+                return agent
+        raise ServiceInvalidRequestError(f"No agent named '{name}' to synthesize with")
+    for agent in agents:
+        if agent.name == DEFAULT_SYNTHESIZER:
+            return agent
+    return agents[-1]
+
+
+def _copy_arguments(arguments: Optional[KernelArguments]) -> Optional[KernelArguments]:
+    """
+    A copy of arguments with copies of their execution settings, which function
+    calling writes the kernel's tools into while an agent runs.
+    """
+    if arguments is None:
+        return None
+    settings = {
+        service_id: settings.model_copy(deep=True)
+        for service_id, settings in (arguments.execution_settings or {}).items()
+    }
+    return KernelArguments(settings=settings or None, **arguments)
+
+
+async def _respond(
+    agent: ChatCompletionAgent,
+    history: ChatHistory,
+    arguments: Optional[KernelArguments],
+    slots: asyncio.Semaphore,
+    on_chunk: Optional[OnChunk] = None,
+) -> List[ChatMessageContent]:
+    # The agent answers in its own thread, started with a copy of the conversation,
+    # which collects its function calls and answer; only the new messages are returned.
+    # Agents may run concurrently, so each gets its own copy of the arguments
+    active_agent.set(agent.name)
+    arguments = _copy_arguments(arguments)
+    thread = ChatHistoryAgentThread()
+    async with slots:
+        if on_chunk is None:
+            await agent.get_response(
+                messages=list(history.messages), thread=thread, arguments=arguments
+            )
+        else:
+            async for item in agent.invoke_stream(
+                messages=list(history.messages), thread=thread, arguments=arguments
+            ):
+                if item.message.content:
+                    await on_chunk(agent.name, item.message.content)
+    messages = [message async for message in thread.get_messages()]
+    messages = messages[len(history.messages) :]
+    for message in messages:
+        if message.role == AuthorRole.ASSISTANT:
+            message.name = agent.name
+    return messages
+
+
+def _answer(messages: List[ChatMessageContent]) -> Optional[ChatMessageContent]:
+    for message in reversed(messages):
+        if message.role == AuthorRole.ASSISTANT and message.content:
+            return message
+    return None
+
+
+async def fan_out_fan_in(
+    agents: Sequence[ChatCompletionAgent],
+    synthesizer: ChatCompletionAgent,
+    chat_history: ChatHistory,
+    arguments: Optional[KernelArguments] = None,
+    max_concurrency: int = 4,
+    on_chunk: Optional[OnChunk] = None,
+) -> List[ChatMessageContent]:
+    """
+    Run the independent agents concurrently, then the synthesizer over their answers.
+
+    Every agent but the synthesizer answers the conversation in `chat_history` on
+    its own, at most `max_concurrency` at a time, so the round takes about as long
+    as the slowest of them. The synthesizer then sees the conversation followed by
+    all of their answers, named by agent, and answers once.
+
+    The messages of each agent (function calls included) are appended to
+    `chat_history` in agent order, as a sequential group chat would. Returns the
+    final answer of each agent, the synthesizer's last. With `on_chunk`, the agents
+    stream their answers to it as they are generated, interleaved across agents.
+    If an agent fails, the others are cancelled and its error is raised.
+    """
+    if max_concurrency < 1:
+        raise ServiceInvalidRequestError("max_concurrency must be at least 1")
+    slots = asyncio.Semaphore(max_concurrency)
+    independent = [agent for agent in agents if agent is not synthesizer]
+    tasks = [
+        asyncio.ensure_future(_respond(agent, chat_history, arguments, slots, on_chunk))
+        for agent in independent
+    ]
+    try:
+        outputs = await asyncio.gather(*tasks)
+    except BaseException:
+        # gather leaves the other agents running when one fails
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    answers: List[ChatMessageContent] = []
+
+    def collect(agent: ChatCompletionAgent, messages: List[ChatMessageContent]) -> None:
+        for message in messages:
+            chat_history.add_message(message)
+        answer = _answer(messages)
+        if answer is None:
+            logger.warning(f"Agent {agent.name} gave no answer")
+        else:
+            answers.append(answer)
+
+    for agent, messages in zip(independent, outputs):
+        collect(agent, messages)
+    collect(
+        synthesizer,
+        await _respond(synthesizer, chat_history, arguments, slots, on_chunk),
+    )
+    return answers
+
+
+async def run_group_chat(
+    agents: Sequence[ChatCompletionAgent],
+    chat_history: ChatHistory,
+    selection_strategy: SequentialSelectionStrategy,
+    termination_strategy: TerminationStrategy,
+    on_chunk: Optional[OnChunk] = None,
+    arguments: Optional[KernelArguments] = None,
+) -> List[ChatMessageContent]:
+    """
+    Run agents in turn, as AgentGroupChat.invoke does, streaming their answers to
+    on_chunk if given.
+
+    AgentGroupChat.invoke_stream does not add streamed answers to the group
+    history in this Semantic Kernel version, and AgentGroupChat.invoke takes no
+    arguments, so the agents would run without the request's execution settings.
+    Here every agent is invoked with `arguments`, and every turn is appended to
+    `chat_history` before the next agent is selected. Returns the answer of each turn.
+    """
+    slots = asyncio.Semaphore(1)
+    answers: List[ChatMessageContent] = []
+    if isinstance(termination_strategy, ConvergenceTerminationStrategy):
+        termination_strategy.start(chat_history.messages)
+    for _ in range(termination_strategy.maximum_iterations):
+        agent = await selection_strategy.next(list(agents), chat_history.messages)
+        messages = await _respond(agent, chat_history, arguments, slots, on_chunk)
+        for message in messages:
+            chat_history.add_message(message)
+        answer = _answer(messages)
+        if answer is not None:
+            answers.append(answer)
+        if await termination_strategy.should_terminate(agent, chat_history.messages):
+            break
+    return answers
@@ -0,0 +1,979 @@
+import asyncio
+import base64
+import glob
+import json
+import logging
+import mmap
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+import numpy as np
+from semantic_kernel.exceptions import ServiceInvalidRequestError
+from semantic_kernel.memory.memory_record import MemoryRecord
+from app.core.ann_index import IVFFlatIndex
+from app.core.dedup import SimHashIndex
+from app.core.lexical_index import BM25Index
+from app.core.metadata_index import MetadataIndex, parse_metadata
+from app.core.memory_store import CollectionStats, NumpyMemoryStore, VectorCollection
+from app.core.quantization import make_quantizer
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single worker process, so no file locking
+    fcntl = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Rows copied at a time while writing a new generation
+COPY_CHUNK_SIZE = 8192
+
+
+@contextmanager
+def _file_lock(path: str, exclusive: bool = True) -> Iterator[None]:
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _fsync(path: str) -> None:
+    """
+    Flush a file written through another handle (or by NumPy) to disk.
+    """
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def _try_file_lock(path: str):
+    """
+    Take an exclusive lock without waiting; returns the open file, or None if it is held.
+    """
+    f = open(path, "a")
+    if fcntl is not None:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            return None
+    return f
+
+
+def _record_to_json(record: MemoryRecord) -> Dict[str, Any]:
+    return {
+        "id": record._id,
+        "text": record._text,
+        "description": record._description,
+        "additional_metadata": record._additional_metadata,
+        "external_source_name": record._external_source_name,
+        "is_reference": record._is_reference,
+        "timestamp": record._timestamp.isoformat() if record._timestamp else None,
+    }
+
+
+def _record_from_json(
+    data: Dict[str, Any], embedding: Optional[np.ndarray]
+) -> MemoryRecord:
+    return MemoryRecord(
+        is_reference=data["is_reference"],
+        external_source_name=data["external_source_name"],
+        id=data["id"],
+        description=data["description"],
+        text=data["text"],
+        additional_metadata=data["additional_metadata"],
+        embedding=embedding,
+        key=data["id"],
+        timestamp=(
+            datetime.fromisoformat(data["timestamp"]) if data["timestamp"] else None
+        ),
+    )
+
+
+class PersistentVectorCollection:
+    """
+    Collection persisted as a memory-mapped base generation plus an append log.
+
+    A generation is a set of files written once and never modified:
+    `base-<n>.vectors.npy` holds the normalized embeddings as a fixed-width float32
+    matrix and `base-<n>.norms.npy` their norms, `base-<n>.ids.json` the record ids
+    in row order, and `base-<n>.records.jsonl` the text and metadata of each row,
+    located through the byte offsets in `base-<n>.offsets.npy`. `manifest.json`
+    names the current generation. With a quantization, `base-<n>.codes.npy` and
+    `base-<n>.quantizer.npz` hold the quantized matrix that searches scan; the
+    float32 matrix is then only read to re-score the best candidates.
+
+    Loading a generation maps the files without reading or copying them, so
+    several worker processes share the same physical pages. Writes are appended to
+    `log.jsonl` and applied to an in-memory VectorCollection (the delta), and rows
+    they replace in the base are tombstoned. Compaction merges the base and the log
+    into the next generation. Each process replays log entries and picks up new
+    generations written by the others before it reads or writes.
+
+    The BM25 index for keyword search is built from the base records on first use,
+    then kept up to date as log entries are applied. So is the MetadataIndex of
+    the base rows used by filtered searches; the delta keeps its own. With
+    near-duplicate detection on, the SimHashIndex is built the same way. Dedup
+    settings made through `save_dedup` are kept in the manifest, so every process
+    applies them.
+    """
+
+    COMPACTION_MIN_ROWS = 1000
+    COMPACTION_RATIO = 0.1
+
+    def __init__(
+        self, path: str, quantization: Optional[str] = None, rescore: bool = False
+    ):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.quantization = None if quantization == "none" else quantization
+        self.rescore = rescore
+        self.generation = 0
+        self.compacting = False
+        self.delta = self._new_delta()
+        self.stats = CollectionStats()
+        self._dedup: Optional[SimHashIndex] = None
+        self._dedup_built = False
+        # Dedup settings saved in the manifest, or None to use the store's default
+        self.dedup_config: Optional[Dict[str, Any]] = None
+        self._manifest_mtime: Optional[int] = None
+        self._log_offset = 0
+        with _file_lock(self.lock_path, exclusive=False):
+            self._load()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.path, "manifest.json")
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.path, "log.jsonl")
+
+    @property
+    def lock_path(self) -> str:
+        return os.path.join(self.path, "lock")
+
+    def _new_delta(self) -> VectorCollection:
+        # The delta is bounded by compaction, so it keeps exact float32 vectors
+        # that the next generation is written from
+        return VectorCollection()
+
+    def _base_prefix(self, generation: int) -> str:
+        return os.path.join(self.path, f"base-{generation}")
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"generation": 0, "rows": 0, "dimension": None}
+
+    def _manifest_stat(self) -> Optional[int]:
+        try:
+            return os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _manifest_changed(self) -> bool:
+        return self._manifest_stat() != self._manifest_mtime
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        with open(f"{self.manifest_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f"{self.manifest_path}.tmp", self.manifest_path)
+
+    def _apply_config(self, manifest: Dict[str, Any]) -> None:
+        """
+        Use the dedup settings saved in the manifest, if they have changed.
+        """
+        config = manifest.get("dedup")
+        if config is None or config == self.dedup_config:
+            return
+        self.dedup_config = config
+        self.set_dedup(None if config["policy"] == "off" else SimHashIndex(**config))
+
+    def _load(self) -> None:
+        """
+        Map the current generation and replay the append log on top of it.
+        """
+        manifest = self._read_manifest()
+        self.generation = manifest["generation"]
+        prefix = self._base_prefix(self.generation)
+        self.base_codes = None
+        self.base_quantizer = None
+        if manifest["rows"]:
+            self.base_vectors = np.load(f"{prefix}.vectors.npy", mmap_mode="r")
+            self.base_norms = np.load(f"{prefix}.norms.npy", mmap_mode="r")
+            self.base_offsets = np.load(f"{prefix}.offsets.npy", mmap_mode="r")
+            with open(f"{prefix}.records.jsonl", "rb") as f:
+                self._segment = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            with open(f"{prefix}.ids.json", "r", encoding="utf-8") as f:
+                self.base_ids: List[str] = json.load(f)
+            if manifest.get("quantization"):
+                self.base_codes = np.load(f"{prefix}.codes.npy", mmap_mode="r")
+                with np.load(f"{prefix}.quantizer.npz") as state:
+                    self.base_quantizer = make_quantizer(
+                        manifest["quantization"],
+                        **{key: state[key] for key in state.files},
+                    )
+        else:
+            self.base_vectors = None
+            self.base_norms = np.empty(0, dtype=np.float32)
+            self.base_offsets = np.zeros(1, dtype=np.int64)
+            self._segment = None
+            self.base_ids = []
+        self.base_rows = {id: row for row, id in enumerate(self.base_ids)}
+        self.base_live = np.ones(len(self.base_ids), dtype=bool)
+        self.base_deleted = 0
+        self._lexical: Optional[BM25Index] = None
+        self._base_metadata: Optional[MetadataIndex] = None
+        self._dedup_built = False
+
+        index = self.delta.index
+        if index is not None:
+            index.reset()
+        self.delta = self._new_delta()
+        self.delta.set_index(index)
+
+        self._apply_config(manifest)
+        self._log_offset = 0
+        self._replay()
+        self._manifest_mtime = self._manifest_stat()
+
+    def _replay(self) -> None:
+        """
+        Apply the complete log entries written since the last replay.
+        """
+        try:
+            with open(self.log_path, "rb") as f:
+                f.seek(self._log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            entry = json.loads(line)
+            if entry["op"] == "upsert":
+                self._apply_upsert(
+                    [
+                        _record_from_json(
+                            r,
+                            np.frombuffer(
+                                base64.b64decode(r["embedding"]), dtype=np.float32
+                            ),
+                        )
+                        for r in entry["records"]
+                    ]
+                )
+            else:
+                self._apply_remove(entry["ids"])
+        self._log_offset += end
+
+    def _refresh(self) -> None:
+        manifest = self._read_manifest()
+        if manifest["generation"] != self.generation:
+            self._load()
+            return
+        if self._manifest_changed():
+            # Another process changed the settings of the collection
+            self._apply_config(manifest)
+            self._manifest_mtime = self._manifest_stat()
+        self._replay()
+
+    def sync(self) -> None:
+        """
+        Pick up writes and compactions made by other processes.
+        """
+        try:
+            log_size = os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            log_size = 0
+        if not self._manifest_changed() and log_size == self._log_offset:
+            return
+        with _file_lock(self.lock_path, exclusive=False):
+            self._refresh()
+
+    def _tombstone_base(self, key: str) -> None:
+        row = self.base_rows.pop(key, None)
+        if row is not None:
+            self.base_live[row] = False
+            self.base_deleted += 1
+            if self._base_metadata is not None:
+                self._base_metadata.remove(row)
+
+    def _apply_upsert(self, records: List[MemoryRecord]) -> None:
+        for record in records:
+            self._tombstone_base(record._id)
+        self.delta.upsert(records)
+        if self._lexical is not None:
+            self._lexical.add_many((record._id, record._text) for record in records)
+        if self._dedup_built:
+            self._dedup.add_texts(
+                (record._id, record._text, parse_metadata(record._additional_metadata))
+                for record in records
+            )
+
+    def _apply_remove(self, keys: List[str]) -> None:
+        for key in keys:
+            self._tombstone_base(key)
+        self.delta.remove(keys)
+        if self._lexical is not None:
+            for key in keys:
+                self._lexical.remove(key)
+        if self._dedup_built:
+            for key in keys:
+                self._dedup.remove(key)
+
+    @property
+    def lexical(self) -> BM25Index:
+        if self._lexical is None:
+            lexical = BM25Index()
+            lexical.add_many(
+                (key, self.record(row, False)._text)
+                for key, row in self.base_rows.items()
+            )
+            lexical.add_many(
+                (key, self.delta.get(key, False)._text) for key in self.delta.rows
+            )
+            self._lexical = lexical
+        return self._lexical
+
+    @property
+    def base_metadata(self) -> MetadataIndex:
+        if self._base_metadata is None:
+            metadata = MetadataIndex()
+            metadata.add_many(
+                (row, parse_metadata(self.record(row, False)._additional_metadata))
+                for row in self.base_rows.values()
+            )
+            self._base_metadata = metadata
+        return self._base_metadata
+
+    @property
+    def dedup(self) -> Optional[SimHashIndex]:
+        if self._dedup is not None and not self._dedup_built:
+            self._dedup.clear()
+            records = [self.record(row, False) for row in self.base_rows.values()]
+            records += [self.delta.get(key, False) for key in self.delta.rows]
+            self._dedup.add_texts(
+                (record._id, record._text, parse_metadata(record._additional_metadata))
+                for record in records
+            )
+            self._dedup_built = True
+        return self._dedup
+
+    def set_dedup(self, dedup: Optional[SimHashIndex]) -> None:
+        self._dedup = dedup
+        self._dedup_built = False
+
+    def describe_dedup(self) -> Dict[str, Any]:
+        return {"policy": "off"} if self.dedup is None else self.dedup.describe()
+
+    def save_dedup(self, dedup: Optional[SimHashIndex]) -> None:
+        """
+        Set near-duplicate detection and save it in the manifest, so that other
+        processes and later runs use it too.
+        """
+        config = (
+            {"policy": "off"}
+            if dedup is None
+            else {
+                "policy": dedup.policy,
+                "max_distance": dedup.max_distance,
+                "scope": dedup.scope,
+            }
+        )
+        with _file_lock(self.lock_path):
+            self._refresh()
+            self._write_manifest({**self._read_manifest(), "dedup": config})
+            self._manifest_mtime = self._manifest_stat()
+            self.dedup_config = config
+            self.set_dedup(dedup)
+
+    def _base_filter_mask(self, filter: Dict[str, Any]) -> np.ndarray:
+        return self.base_metadata.mask(filter, len(self.base_ids)) & self.base_live
+
+    def filter_keys(self, filter: Dict[str, Any]) -> List[str]:
+        rows = np.flatnonzero(self._base_filter_mask(filter))
+        return [self.base_ids[row] for row in rows] + self.delta.filter_keys(filter)
+
+    def _truncate_torn_tail(self) -> None:
+        """
+        Cut off a partial line left at the end of the log by a writer that died.
+
+        Replay stops at the last complete line, so the log must end there before
+        anything is appended; otherwise the next entry would be joined to the
+        partial one. Called under the exclusive lock, after a refresh.
+        """
+        try:
+            size = os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            return
+        if size > self._log_offset:
+            logger.warning(
+                f"Truncating {size - self._log_offset} bytes of a partial entry "
+                f"at the end of {self.log_path}"
+            )
+            os.truncate(self.log_path, self._log_offset)
+
+    def _write(self, entry: Dict[str, Any], apply: Callable[[], None]) -> None:
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        with _file_lock(self.lock_path):
+            self._refresh()
+            self._truncate_torn_tail()
+            with open(self.log_path, "ab") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            apply()
+            self._log_offset += len(line)
+
+    def __len__(self) -> int:
+        return len(self.base_rows) + len(self.delta)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.base_rows or key in self.delta
+
+    @property
+    def dimension(self) -> Optional[int]:
+        if self.base_vectors is not None:
+            return self.base_vectors.shape[1]
+        return self.delta.dimension
+
+    @property
+    def index(self) -> Optional[IVFFlatIndex]:
+        return self.delta.index
+
+    def set_index(self, index: Optional[IVFFlatIndex]) -> None:
+        self.delta.set_index(index)
+
+    def describe_index(self) -> Dict[str, Any]:
+        return {
+            **self.delta.describe_index(),
+            "quantization": self.quantization or "none",
+            "rescore": self.rescore and self.quantization is not None,
+            "storage": "mmap",
+            "generation": self.generation,
+            "base_rows": len(self.base_rows),
+            "log_rows": len(self.delta),
+        }
+
+    def describe(self) -> Dict[str, Any]:
+        """
+        Size and usage of the collection, with writes by other processes dated by
+        the modification times of the log and manifest.
+        """
+        mtimes = [self.stats.last_write or 0.0]
+        for path in (self.log_path, self.manifest_path):
+            try:
+                mtimes.append(os.stat(path).st_mtime)
+            except FileNotFoundError:
+                pass
+        return {
+            "count": len(self),
+            "dimension": self.dimension,
+            "bytes": self.nbytes,
+            "index_type": "flat" if self.index is None else "ivf",
+            "quantization": self.quantization or "none",
+            "storage": "mmap",
+            "dedup": "off" if self._dedup is None else self._dedup.policy,
+            **self.stats.as_dict(max(mtimes)),
+        }
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes of the mapped matrix that searches scan, plus the in-memory delta.
+        """
+        scanned = self.base_codes if self.base_codes is not None else self.base_vectors
+        return self.delta.nbytes + (0 if scanned is None else scanned.nbytes)
+
+    def upsert(self, records: List[MemoryRecord]) -> None:
+        if not records:
+            return
+        embeddings = [np.asarray(r.embedding, dtype=np.float32) for r in records]
+        dimension = self.dimension
+        for embedding in embeddings:
+            if dimension is not None and embedding.size != dimension:
+                raise ServiceInvalidRequestError(
+                    f"Embedding dimension {embedding.size} does not match collection dimension {dimension}"
+                )
+        entry = {
+            "op": "upsert",
+            "records": [
+                {
+                    **_record_to_json(record),
+                    "embedding": base64.b64encode(embedding.tobytes()).decode("ascii"),
+                }
+                for record, embedding in zip(records, embeddings)
+            ],
+        }
+        self._write(entry, lambda: self._apply_upsert(records))
+        self.stats.record_write()
+
+    def remove(self, keys: List[str]) -> None:
+        keys = [key for key in keys if key in self]
+        if keys:
+            self._write({"op": "remove", "ids": keys}, lambda: self._apply_remove(keys))
+            self.stats.record_write()
+
+    def record(self, row: int, with_embedding: bool) -> MemoryRecord:
+        base_size = len(self.base_ids)
+        if row >= base_size:
+            return self.delta.record(row - base_size, with_embedding)
+        data = json.loads(
+            self._segment[self.base_offsets[row] : self.base_offsets[row + 1]]
+        )
+        embedding = (
+            self.base_vectors[row] * self.base_norms[row] if with_embedding else None
+        )
+        return _record_from_json(data, embedding)
+
+    def get(self, key: str, with_embedding: bool) -> Optional[MemoryRecord]:
+        if key in self.delta:
+            return self.delta.get(key, with_embedding)
+        row = self.base_rows.get(key)
+        return None if row is None else self.record(row, with_embedding)
+
+    def _base_scores(
+        self, query: np.ndarray, rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        # One column of scores per query when query is a matrix of queries. Only
+        # the pages of the given rows are read from the mapped files
+        if self.base_codes is not None:
+            codes = self.base_codes if rows is None else self.base_codes[rows]
+            return self.base_quantizer.scores(codes, query)
+        vectors = self.base_vectors if rows is None else self.base_vectors[rows]
+        return vectors @ query.T
+
+    def _base_matches(
+        self,
+        scores: np.ndarray,
+        query: np.ndarray,
+        limit: int,
+        min_relevance_score: float,
+        rows: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        # Without `rows`, scores cover the whole base, tombstones included
+        if rows is None and self.base_deleted:
+            scores[~self.base_live] = -np.inf
+        rescore = self.base_codes is not None and self.rescore
+        if rescore:
+            matches = self.delta.top_k(
+                scores,
+                limit * VectorCollection.RESCORE_FACTOR,
+                np.finfo(np.float32).min,
+            )
+        else:
+            matches = self.delta.top_k(scores, limit, min_relevance_score)
+        if rows is not None:
+            matches = [(int(rows[i]), score) for i, score in matches]
+        if rescore:
+            matches = VectorCollection.rerank(
+                [row for row, _ in matches],
+                self.base_vectors,
+                query,
+                limit,
+                min_relevance_score,
+            )
+        return matches
+
+    def _merge(
+        self,
+        base: List[Tuple[int, float]],
+        delta: List[Tuple[int, float]],
+        limit: int,
+    ) -> List[Tuple[int, float]]:
+        base_size = len(self.base_ids)
+        matches = base + [(base_size + row, score) for row, score in delta]
+        return sorted(matches, key=lambda match: -match[1])[:limit]
+
+    def search(
+        self,
+        embedding: np.ndarray,
+        limit: int,
+        min_relevance_score: float = 0.0,
+        nprobe: Optional[int] = None,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Score the mapped base and the log through the delta, then merge.
+
+        The base is scanned through its quantized codes when it has them, re-scoring
+        the best candidates against the mapped float32 matrix if `rescore` is set.
+        With a filter, only the base rows whose metadata passes it are read.
+        """
+        base: List[Tuple[int, float]] = []
+        if self.base_ids:
+            query = VectorCollection._normalize_query(embedding)
+            rows = allowed = None
+            if filter is not None:
+                allowed = self._base_filter_mask(filter)
+                rows = np.flatnonzero(allowed)
+                if len(rows) > VectorCollection.FILTER_SCAN_RATIO * len(allowed):
+                    rows = None
+            scores = self._base_scores(query, rows)
+            if rows is None and allowed is not None:
+                scores[~allowed] = -np.inf
+            base = self._base_matches(scores, query, limit, min_relevance_score, rows)
+        delta: List[Tuple[int, float]] = []
+        if len(self.delta):
+            delta = self.delta.search(
+                embedding, limit, min_relevance_score, nprobe, filter
+            )
+        return self._merge(base, delta, limit)
+
+    def search_batch(
+        self, embeddings: np.ndarray, limit: int, min_relevance_score: float = 0.0
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Search several queries with one matrix product over the base and the delta.
+        """
+        queries = VectorCollection._normalize_queries(embeddings)
+        base: List[List[Tuple[int, float]]] = [[] for _ in queries]
+        if self.base_ids:
+            scores = self._base_scores(queries).T
+            base = [
+                self._base_matches(row, query, limit, min_relevance_score)
+                for row, query in zip(scores, queries)
+            ]
+        delta: List[List[Tuple[int, float]]] = [[] for _ in queries]
+        if len(self.delta):
+            delta = self.delta.search_batch(queries, limit, min_relevance_score)
+        return [self._merge(b, d, limit) for b, d in zip(base, delta)]
+
+    def needs_compaction(self) -> bool:
+        pending = self.delta.size + self.base_deleted
+        return pending > max(
+            self.COMPACTION_MIN_ROWS, len(self.base_ids) * self.COMPACTION_RATIO
+        )
+
+    def _snapshot(self) -> Dict[str, Any]:
+        delta_rows = np.flatnonzero(self.delta.live[: self.delta.size])
+        return {
+            "log_offset": self._log_offset,
+            "dimension": self.dimension,
+            "base_rows": np.flatnonzero(self.base_live),
+            "base_vectors": self.base_vectors,
+            "base_norms": self.base_norms,
+            "base_offsets": self.base_offsets,
+            "base_ids": self.base_ids,
+            "segment": self._segment,
+            "delta_vectors": (
+                self.delta.vectors[delta_rows] if len(delta_rows) else None
+            ),
+            "delta_norms": self.delta.norms[delta_rows].copy(),
+            "delta_records": [self.delta.records[row] for row in delta_rows],
+        }
+
+    def _write_generation(self, generation: int, snapshot: Dict[str, Any]) -> int:
+        """
+        Write the snapshot as a new generation and return its row count.
+        """
+        prefix = self._base_prefix(generation)
+        base_rows = snapshot["base_rows"]
+        delta_records = snapshot["delta_records"]
+        rows = len(base_rows) + len(delta_records)
+        if not rows:
+            return 0
+
+        vectors = np.lib.format.open_memmap(
+            f"{prefix}.vectors.npy",
+            mode="w+",
+            dtype=np.float32,
+            shape=(rows, snapshot["dimension"]),
+        )
+        for start in range(0, len(base_rows), COPY_CHUNK_SIZE):
+            chunk = base_rows[start : start + COPY_CHUNK_SIZE]
+            vectors[start : start + len(chunk)] = snapshot["base_vectors"][chunk]
+        if delta_records:
+            vectors[len(base_rows) :] = snapshot["delta_vectors"]
+        vectors.flush()
+
+        quantizer = make_quantizer(self.quantization)
+        if quantizer is not None:
+            # Fit on every row first, so that no row is encoded with a narrower range
+            for start in range(0, rows, COPY_CHUNK_SIZE):
+                quantizer.fit(vectors[start : start + COPY_CHUNK_SIZE])
+            codes = np.lib.format.open_memmap(
+                f"{prefix}.codes.npy",
+                mode="w+",
+                dtype=quantizer.dtype,
+                shape=vectors.shape,
+            )
+            for start in range(0, rows, COPY_CHUNK_SIZE):
+                codes[start : start + COPY_CHUNK_SIZE] = quantizer.encode(
+                    vectors[start : start + COPY_CHUNK_SIZE]
+                )
+            codes.flush()
+            del codes
+            np.savez(f"{prefix}.quantizer.npz", **quantizer.state())
+        del vectors
+
+        np.save(
+            f"{prefix}.norms.npy",
+            np.concatenate(
+                [snapshot["base_norms"][base_rows], snapshot["delta_norms"]]
+            ).astype(np.float32),
+        )
+
+        offsets = np.zeros(rows + 1, dtype=np.int64)
+        base_offsets = snapshot["base_offsets"]
+        with open(f"{prefix}.records.jsonl", "wb") as f:
+            # Base records are copied as raw bytes, without parsing them
+            for i, row in enumerate(base_rows):
+                data = snapshot["segment"][base_offsets[row] : base_offsets[row + 1]]
+                f.write(data)
+                offsets[i + 1] = offsets[i] + len(data)
+            for i, record in enumerate(delta_records, start=len(base_rows)):
+                data = (json.dumps(_record_to_json(record)) + "\n").encode("utf-8")
+                f.write(data)
+                offsets[i + 1] = offsets[i] + len(data)
+        np.save(f"{prefix}.offsets.npy", offsets)
+
+        ids = [snapshot["base_ids"][row] for row in base_rows]
+        ids += [record._id for record in delta_records]
+        with open(f"{prefix}.ids.json", "w", encoding="utf-8") as f:
+            json.dump(ids, f)
+
+        # The manifest that names this generation must not reach the disk before it
+        for path in glob.glob(f"{prefix}.*"):
+            _fsync(path)
+        return rows
+
+    def _install(self, generation: int, rows: int, log_offset: int) -> None:
+        """
+        Switch to a new generation, keeping the log entries written since its snapshot.
+        """
+        with _file_lock(self.lock_path):
+            # The new generation holds the same records, so once the log is
+            # replayed the keyword index carries over instead of being rebuilt
+            self._refresh()
+            lexical = self._lexical
+            dedup_built = self._dedup_built
+            try:
+                with open(self.log_path, "rb") as f:
+                    f.seek(log_offset)
+                    tail = f.read()
+            except FileNotFoundError:
+                tail = b""
+            # Leave out a partial entry of a writer that died
+            tail = tail[: tail.rfind(b"\n") + 1]
+
+            # Replace the manifest before the log: if we stop in between, replaying
+            # the old log over the new generation gives the same records
+            manifest = {
+                **self._read_manifest(),
+                "generation": generation,
+                "rows": rows,
+                "dimension": self.dimension,
+                "quantization": self.quantization if rows else None,
+            }
+            self._write_manifest(manifest)
+            with open(f"{self.log_path}.tmp", "wb") as f:
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(f"{self.log_path}.tmp", self.log_path)
+
+            previous = self.generation
+            self._load()
+            self._lexical = lexical
+            self._dedup_built = dedup_built
+
+        # Processes that still map the old files keep them until they reload
+        for path in glob.glob(f"{self._base_prefix(previous)}.*"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    async def compact(self) -> None:
+        """
+        Merge the append log into a new generation, writing it in a worker thread.
+        """
+        if self.compacting:
+            return
+        lock = _try_file_lock(os.path.join(self.path, "compact.lock"))
+        if lock is None:
+            # Another process is compacting this collection
+            return
+        self.compacting = True
+        try:
+            with _file_lock(self.lock_path, exclusive=False):
+                self._refresh()
+            snapshot = self._snapshot()
+            generation = self.generation + 1
+            rows = await asyncio.to_thread(
+                self._write_generation, generation, snapshot
+            )
+            self._install(generation, rows, snapshot["log_offset"])
+            logger.info(
+                f"Compacted {self.path} into generation {generation} with {rows} rows"
+            )
+        finally:
+            self.compacting = False
+            lock.close()
+
+
+class PersistentMemoryStore(NumpyMemoryStore):
+    """
+    Memory store that keeps each collection in its own directory under `path`.
+
+    Collections survive restarts and are shared by worker processes using the same
+    path. A collection is compacted in the background once its append log holds
+    enough writes.
+
+    Searches are exact: an IVF index would only cover the append log, which each
+    compaction empties, so "ivf" is not accepted as an index type.
+    """
+
+    INDEX_TYPES = ("flat",)
+
+    def __init__(
+        self,
+        path: str,
+        index_type: str = "flat",
+        index_params: Optional[Dict[str, Any]] = None,
+        quantization: Optional[str] = None,
+        rescore: bool = False,
+        dedup_policy: str = "off",
+        dedup_params: Optional[Dict[str, Any]] = None,
+    ):
+        if index_type == "ivf":
+            logger.warning(
+                "IVF indexes are not supported by the persistent memory store, "
+                "using exact search"
+            )
+            index_type, index_params = "flat", None
+        super().__init__(
+            index_type=index_type,
+            index_params=index_params,
+            quantization=quantization,
+            rescore=rescore,
+            dedup_policy=dedup_policy,
+            dedup_params=dedup_params,
+        )
+        self.path = path
+        self._compactions: Set[asyncio.Task] = set()
+        os.makedirs(path, exist_ok=True)
+
+    def configure_dedup(
+        self, collection_name: str, policy: str, **params: Any
+    ) -> Dict[str, Any]:
+        """
+        Set how a collection treats near-duplicate texts, saved with the collection.
+        """
+        collection = self._collection(collection_name)
+        collection.save_dedup(self.make_dedup(policy, **params))
+        return collection.describe_dedup()
+
+    @classmethod
+    def make_index(cls, index_type: str, **params: Any) -> Optional[IVFFlatIndex]:
+        if index_type == "ivf":
+            raise ServiceInvalidRequestError(
+                "IVF indexes are not supported with MEMORY_STORE_PATH, "
+                "persistent collections use exact search"
+            )
+        return super().make_index(index_type, **params)
+
+    def _collection_path(self, collection_name: str) -> str:
+        # Collection names become directory names, so keep them inside `path`
+        if (
+            not collection_name
+            or collection_name.startswith(".")
+            or os.path.basename(collection_name) != collection_name
+        ):
+            raise ServiceInvalidRequestError(
+                f"Invalid collection name '{collection_name}'"
+            )
+        return os.path.join(self.path, collection_name)
+
+    def _new_collection(self, collection_name: str) -> PersistentVectorCollection:
+        collection = PersistentVectorCollection(
+            self._collection_path(collection_name), self.quantization, self.rescore
+        )
+        collection.set_index(self.make_index(self.index_type, **self.index_params))
+        if collection.dedup_config is None:
+            collection.set_dedup(
+                self.make_dedup(self.dedup_policy, **self.dedup_params)
+            )
+        return collection
+
+    def _find(self, collection_name: str) -> Optional[PersistentVectorCollection]:
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            # Open collections written by another process, or by an earlier run
+            try:
+                path = self._collection_path(collection_name)
+            except ServiceInvalidRequestError:
+                return None
+            if not os.path.isdir(path):
+                return None
+            collection = self._new_collection(collection_name)
+            self._collections[collection_name] = collection
+        collection.sync()
+        return collection
+
+    async def get_collections(self) -> List[str]:
+        return sorted(
+            name
+            for name in os.listdir(self.path)
+            if os.path.isdir(os.path.join(self.path, name))
+        )
+
+    async def delete_collection(self, collection_name: str) -> None:
+        self._collections.pop(collection_name, None)
+        shutil.rmtree(self._collection_path(collection_name), ignore_errors=True)
+
+    def _maybe_compact(self, collection_name: str) -> None:
+        collection = self._collections.get(collection_name)
+        if collection is None or collection.compacting:
+            return
+        if not collection.needs_compaction():
+            return
+        task = asyncio.ensure_future(self._compact(collection))
+        self._compactions.add(task)
+        task.add_done_callback(self._compactions.discard)
+
+    @staticmethod
+    async def _compact(collection: PersistentVectorCollection) -> None:
+        try:
+            await collection.compact()
+        except Exception as e:
+            logger.error(f"Error compacting {collection.path}: {str(e)}")
+
+    async def upsert(self, collection_name: str, record: MemoryRecord) -> str:
+        key = await super().upsert(collection_name, record)
+        self._maybe_compact(collection_name)
+        return key
+
+    async def upsert_batch(
+        self, collection_name: str, records: List[MemoryRecord]
+    ) -> List[str]:
+        keys = await super().upsert_batch(collection_name, records)
+        self._maybe_compact(collection_name)
+        return keys
+
+    async def remove(self, collection_name: str, key: str) -> None:
+        await super().remove(collection_name, key)
+        self._maybe_compact(collection_name)
+
+    async def remove_batch(self, collection_name: str, keys: List[str]) -> None:
+        await super().remove_batch(collection_name, keys)
+        self._maybe_compact(collection_name)
+
+    async def compact(self) -> None:
+        """
+        Compact every open collection now, for example before shutting down.
+        """
+        for collection in list(self._collections.values()):
+            await collection.compact()
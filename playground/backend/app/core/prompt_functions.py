@@ -0,0 +1,138 @@
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from semantic_kernel.connectors.ai.prompt_execution_settings import (
+    PromptExecutionSettings,
+)
+from semantic_kernel.exceptions import ServiceInvalidRequestError
+from semantic_kernel.functions.kernel_function import KernelFunction
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class PromptFunctionRegistry:
+    """
+    Registry of compiled prompt functions.
+
+    Compiling a prompt function parses its template and builds the function
+    metadata, so each distinct template is compiled once and reused. Ad-hoc prompts
+    are kept in an LRU cache of `max_entries`, and named functions registered
+    through `register` in an LRU cache of `max_registered`. Reserved functions,
+    the built-ins other endpoints rely on, are never evicted or replaced.
+    """
+
+    def __init__(self, max_entries: int = 256, max_registered: int = 256):
+        self.max_entries = max_entries
+        self.max_registered = max_registered
+        self._compiled: "OrderedDict[Tuple, KernelFunction]" = OrderedDict()
+        self._named: "OrderedDict[Tuple[str, str], KernelFunction]" = OrderedDict()
+        self._reserved: Dict[Tuple[str, str], KernelFunction] = {}
+
+    @property
+    def reserved_plugins(self) -> List[str]:
+        return sorted({plugin_name for plugin_name, _ in self._reserved})
+
+    @staticmethod
+    def _compile(
+        prompt: str,
+        function_name: str,
+        plugin_name: str,
+        description: Optional[str] = None,
+        **settings: Any,
+    ) -> KernelFunction:
+        return KernelFunction.from_prompt(
+            function_name=function_name,
+            plugin_name=plugin_name,
+            description=description,
+            prompt=prompt,
+            prompt_execution_settings=PromptExecutionSettings(extension_data=settings),
+        )
+
+    def get_or_compile(
+        self, prompt: str, function_name: str, plugin_name: str, **settings: Any
+    ) -> KernelFunction:
+        """
+        Return the compiled function for a prompt, compiling it on first use.
+
+        Args:
+            prompt (str): The prompt template.
+            function_name (str): The name of the function.
+            plugin_name (str): The name of the plugin the function belongs to.
+            **settings: Execution settings such as max_tokens.
+
+        Returns:
+            KernelFunction: The compiled prompt function.
+        """
+        key = (plugin_name, function_name, prompt, tuple(sorted(settings.items())))
+        function = self._compiled.get(key)
+        if function is not None:
+            self._compiled.move_to_end(key)
+            return function
+
+        function = self._compile(prompt, function_name, plugin_name, **settings)
+        self._compiled[key] = function
+        if len(self._compiled) > self.max_entries:
+            self._compiled.popitem(last=False)
+        return function
+
+    def register(
+        self,
+        prompt: str,
+        function_name: str,
+        plugin_name: str,
+        description: Optional[str] = None,
+        reserved: bool = False,
+        **settings: Any,
+    ) -> KernelFunction:
+        """
+        Compile a prompt function and register it under plugin_name/function_name.
+
+        Registering the same name again replaces the previous function. Functions
+        that are not `reserved` cannot use the plugin name of a reserved one.
+        """
+        if not reserved and plugin_name in self.reserved_plugins:
+            raise ServiceInvalidRequestError(
+                f"Plugin name '{plugin_name}' is reserved for built-in functions"
+            )
+        function = self._compile(
+            prompt, function_name, plugin_name, description=description, **settings
+        )
+        key = (plugin_name, function_name)
+        if reserved:
+            self._reserved[key] = function
+        else:
+            self._named[key] = function
+            self._named.move_to_end(key)
+            if len(self._named) > self.max_registered:
+                evicted, _ = self._named.popitem(last=False)
+                logger.info(f"Evicted prompt function {'/'.join(evicted)}")
+        logger.info(f"Registered prompt function {plugin_name}/{function_name}")
+        return function
+
+    def get(self, plugin_name: str, function_name: str) -> Optional[KernelFunction]:
+        """
+        Return a registered function by name, or None if it is not registered.
+        """
+        key = (plugin_name, function_name)
+        function = self._reserved.get(key)
+        if function is None:
+            function = self._named.get(key)
+            if function is not None:
+                self._named.move_to_end(key)
+        return function
+
+    def list_functions(self) -> List[Dict[str, Any]]:
+        """
+        Describe the registered functions.
+        """
+        return [
+            {
+                "plugin_name": plugin_name,
+                "function_name": function_name,
+                "description": function.description,
+                "parameters": [p.name for p in function.parameters],
+            }
+            for functions in (self._reserved, self._named)
+            for (plugin_name, function_name), function in functions.items()
+        ]
@@ -0,0 +1,139 @@
+from typing import Dict, Optional
+import numpy as np
+from semantic_kernel.exceptions import ServiceInvalidRequestError
+
+# Rows converted back to float32 at a time while scoring quantized vectors, small
+# enough for the converted chunk to stay in cache
+SCORE_CHUNK_SIZE = 1024
+
+
+def _chunked_scores(codes: np.ndarray, weights: np.ndarray, bias=0.0) -> np.ndarray:
+    # weights is one query vector, or a matrix with one column per query
+    scores = np.empty((len(codes),) + weights.shape[1:], dtype=np.float32)
+    for start in range(0, len(codes), SCORE_CHUNK_SIZE):
+        chunk = codes[start : start + SCORE_CHUNK_SIZE]
+        scores[start : start + len(chunk)] = chunk.astype(np.float32) @ weights + bias
+    return scores
+
+
+class Float16Quantizer:
+    """
+    Stores vectors as float16, halving their size.
+
+    NumPy converts float16 back to float32 slowly, so scans are slower than with
+    float32 or int8; prefer int8 where search latency matters.
+    """
+
+    kind = "float16"
+    dtype = np.float16
+
+    def fit(self, vectors: np.ndarray, codes: Optional[np.ndarray] = None) -> None:
+        pass
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.astype(np.float16)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """
+        Dot products with one query, or with each row of a matrix of queries.
+        """
+        return _chunked_scores(codes, query.T)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {}
+
+    @property
+    def nbytes(self) -> int:
+        return 0
+
+
+class Int8Quantizer:
+    """
+    Stores vectors as int8 codes with a per-dimension scale and offset.
+
+    A value is stored as round((value - offset) / scale), clipped to [-127, 127].
+    The range of each dimension is taken from the vectors seen so far; when a new
+    batch falls outside it, the range is widened and the existing codes of the
+    affected dimensions are re-encoded.
+    """
+
+    kind = "int8"
+    dtype = np.int8
+    LEVELS = 127
+
+    def __init__(
+        self, scale: Optional[np.ndarray] = None, offset: Optional[np.ndarray] = None
+    ):
+        self.scale = scale
+        self.offset = offset
+
+    def _params(self, low: np.ndarray, high: np.ndarray):
+        scale = np.maximum((high - low) / (2 * self.LEVELS), 1e-8)
+        return scale.astype(np.float32), ((high + low) / 2).astype(np.float32)
+
+    def fit(self, vectors: np.ndarray, codes: Optional[np.ndarray] = None) -> None:
+        """
+        Widen the range to cover vectors, re-encoding `codes` in place if it changes.
+        """
+        if not len(vectors):
+            return
+        low, high = vectors.min(axis=0), vectors.max(axis=0)
+        if self.scale is None:
+            self.scale, self.offset = self._params(low, high)
+            return
+
+        current_low = self.offset - self.scale * self.LEVELS
+        current_high = self.offset + self.scale * self.LEVELS
+        dims = np.flatnonzero((low < current_low) | (high > current_high))
+        if not len(dims):
+            return
+        scale, offset = self._params(
+            np.minimum(low[dims], current_low[dims]),
+            np.maximum(high[dims], current_high[dims]),
+        )
+        if codes is not None and len(codes):
+            values = codes[:, dims] * self.scale[dims] + self.offset[dims]
+            codes[:, dims] = np.clip(
+                np.rint((values - offset) / scale), -self.LEVELS, self.LEVELS
+            )
+        self.scale[dims], self.offset[dims] = scale, offset
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((vectors - self.offset) / self.scale)
+        return np.clip(codes, -self.LEVELS, self.LEVELS).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scale + self.offset
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """
+        Dot products with one query, or with each row of a matrix of queries.
+        """
+        # query . (code * scale + offset) = code . (query * scale) + query . offset
+        return _chunked_scores(codes, (query * self.scale).T, query @ self.offset)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"scale": self.scale, "offset": self.offset}
+
+    @property
+    def nbytes(self) -> int:
+        return 0 if self.scale is None else self.scale.nbytes + self.offset.nbytes
+
+
+QUANTIZERS = {"float16": Float16Quantizer, "int8": Int8Quantizer}
+
+
+def make_quantizer(kind: Optional[str], **state: np.ndarray):
+    """
+    Create a quantizer by name; "none" (or None) keeps full float32 vectors.
+    """
+    if kind in (None, "none"):
+        return None
+    if kind not in QUANTIZERS:
+        raise ServiceInvalidRequestError(
+            f"Unknown quantization '{kind}', expected one of none, {', '.join(QUANTIZERS)}"
+        )
+    return QUANTIZERS[kind](**state)
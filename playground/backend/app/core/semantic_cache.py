@@ -0,0 +1,266 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import numpy as np
+from semantic_kernel.connectors.ai.embedding_generator_base import (
+    EmbeddingGeneratorBase,
+)
+from semantic_kernel.functions import FunctionResult
+from app.core.cache import cache_bypass
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def usage_tokens(metadata: Optional[Dict[str, Any]]) -> int:
+    """
+    Return the total token count recorded in a completion's metadata.
+    """
+    usage = (metadata or {}).get("usage")
+    if usage is None:
+        return 0
+    return (usage.prompt_tokens or 0) + (usage.completion_tokens or 0)
+
+
+def function_result_tokens(result: FunctionResult) -> int:
+    """
+    Return the total token count of all completions in a prompt function result.
+    """
+    return sum(usage_tokens(m) for m in result.metadata.get("metadata", []))
+
+
+class _SemanticCacheIndex:
+    """
+    Vectors and responses for one cache namespace and scope.
+
+    Embeddings are stored normalized, so cosine similarity is a dot product. Entries
+    live in a ring of slots that grows geometrically up to the size cap, after which
+    each new entry replaces the oldest. All entries share one TTL, so they expire in
+    the order they were added.
+    """
+
+    INITIAL_CAPACITY = 16
+
+    def __init__(self, dimension: int):
+        self.embeddings = np.empty((self.INITIAL_CAPACITY, dimension), dtype=np.float32)
+        self.responses: list[Optional[str]] = [None] * self.INITIAL_CAPACITY
+        self.tokens = np.zeros(self.INITIAL_CAPACITY, dtype=np.int64)
+        self.expires_at = np.zeros(self.INITIAL_CAPACITY, dtype=np.float64)
+        self.head = 0
+        self.size = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.responses)
+
+    def _slots(self) -> np.ndarray:
+        """
+        Return the occupied slots, oldest first.
+        """
+        return (self.head + np.arange(self.size)) % self.capacity
+
+    def _grow(self, capacity: int) -> None:
+        slots = self._slots()
+        embeddings = np.empty((capacity, self.embeddings.shape[1]), dtype=np.float32)
+        embeddings[: self.size] = self.embeddings[slots]
+        responses: list[Optional[str]] = [None] * capacity
+        responses[: self.size] = [self.responses[slot] for slot in slots]
+        tokens = np.zeros(capacity, dtype=np.int64)
+        tokens[: self.size] = self.tokens[slots]
+        expires_at = np.zeros(capacity, dtype=np.float64)
+        expires_at[: self.size] = self.expires_at[slots]
+        self.embeddings, self.responses = embeddings, responses
+        self.tokens, self.expires_at = tokens, expires_at
+        self.head = 0
+
+    def pop_oldest(self) -> None:
+        self.responses[self.head] = None
+        self.head = (self.head + 1) % self.capacity
+        self.size -= 1
+
+    def purge_expired(self, now: float) -> None:
+        while self.size and self.expires_at[self.head] < now:
+            self.pop_oldest()
+
+    def best_match(self, embedding: np.ndarray) -> Tuple[int, float]:
+        if not self.size:
+            return -1, 0.0
+        # Score every slot, which is cheaper than gathering the occupied ones
+        scores = self.embeddings @ embedding
+        slots = self._slots()
+        best = slots[int(np.argmax(scores[slots]))]
+        return int(best), float(scores[best])
+
+    def add(
+        self,
+        embedding: np.ndarray,
+        response: str,
+        tokens: int,
+        expires_at: float,
+        max_entries: int,
+    ) -> None:
+        # Drop the oldest entries to stay within the size cap
+        while self.size >= max_entries:
+            self.pop_oldest()
+        if self.size == self.capacity:
+            self._grow(min(max_entries, self.capacity * 2))
+        slot = (self.head + self.size) % self.capacity
+        self.embeddings[slot] = embedding
+        self.responses[slot] = response
+        self.tokens[slot] = tokens
+        self.expires_at[slot] = expires_at
+        self.size += 1
+
+
+class SemanticCache:
+    """
+    Cache that returns stored completions for prompts that are semantically close.
+
+    Prompts are embedded and compared by cosine similarity with earlier prompts in the
+    same namespace (one per endpoint) and scope (settings that must match exactly,
+    such as the system prompt). A prompt at or above the namespace threshold is a hit.
+
+    Each namespace and scope holds at most `max_entries` entries, and the cache as a
+    whole at most `max_total_entries`, beyond which entries are evicted from the
+    least recently used scope first.
+    """
+
+    def __init__(
+        self,
+        embedding_service_factory: Callable[[], EmbeddingGeneratorBase],
+        default_threshold: float = 0.95,
+        thresholds: Optional[Dict[str, float]] = None,
+        ttl_seconds: float = 3600,
+        max_entries: int = 1000,
+        max_total_entries: int = 10000,
+        enabled: bool = False,
+    ):
+        self.embedding_service_factory = embedding_service_factory
+        self.default_threshold = default_threshold
+        self.thresholds = thresholds or {}
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_total_entries = max_total_entries
+        self.enabled = enabled
+        self._indexes: "OrderedDict[Tuple[str, str], _SemanticCacheIndex]" = OrderedDict()
+        self._metrics: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _scope_key(scope: str) -> str:
+        return hashlib.sha256(scope.encode("utf-8")).hexdigest()
+
+    def _namespace_metrics(self, namespace: str) -> Dict[str, int]:
+        return self._metrics.setdefault(
+            namespace, {"hits": 0, "misses": 0, "tokens_saved": 0}
+        )
+
+    async def lookup(
+        self, namespace: str, prompt: str, scope: str = ""
+    ) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Look up a cached completion for a prompt.
+
+        Args:
+            namespace (str): The cache namespace, usually the endpoint name.
+            prompt (str): The prompt text to embed and compare.
+            scope (str): Text that must match exactly for an entry to be reused.
+
+        Returns:
+            Tuple[Optional[str], Optional[ndarray]]: The cached completion, or None on a
+            miss, and the prompt embedding to pass to `store`.
+        """
+        if not self.enabled:
+            return None, None
+
+        embeddings = await self.embedding_service_factory().generate_embeddings(
+            [prompt]
+        )
+        embedding = np.asarray(embeddings[0], dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        if norm > 0:
+            embedding = embedding / norm
+
+        metrics = self._namespace_metrics(namespace)
+        if cache_bypass.get():
+            # Skip the lookup, but return the embedding so the fresh result is stored
+            return None, embedding
+
+        key = (namespace, self._scope_key(scope))
+        index = self._indexes.get(key)
+        if index is not None:
+            index.purge_expired(time.monotonic())
+            if index.size:
+                self._indexes.move_to_end(key)
+            else:
+                del self._indexes[key]
+            position, score = index.best_match(embedding)
+            threshold = self.thresholds.get(namespace, self.default_threshold)
+            if position >= 0 and score >= threshold:
+                metrics["hits"] += 1
+                metrics["tokens_saved"] += index.tokens[position]
+                logger.info(f"Semantic cache hit in {namespace} (score {score:.3f})")
+                return index.responses[position], embedding
+
+        metrics["misses"] += 1
+        return None, embedding
+
+    def store(
+        self,
+        namespace: str,
+        embedding: Optional[np.ndarray],
+        response: str,
+        tokens: int = 0,
+        scope: str = "",
+    ) -> None:
+        """
+        Store a completion under the prompt embedding returned by `lookup`.
+        """
+        if not self.enabled or embedding is None:
+            return
+
+        key = (namespace, self._scope_key(scope))
+        index = self._indexes.get(key)
+        if index is None:
+            index = self._indexes[key] = _SemanticCacheIndex(embedding.shape[0])
+        self._indexes.move_to_end(key)
+        index.add(
+            embedding,
+            response,
+            tokens,
+            time.monotonic() + self.ttl_seconds,
+            self.max_entries,
+        )
+        self._evict()
+
+    def _evict(self) -> None:
+        """
+        Drop entries from the least recently used scopes until the total fits the cap.
+        """
+        total = sum(index.size for index in self._indexes.values())
+        while total > self.max_total_entries:
+            key, index = next(iter(self._indexes.items()))
+            index.pop_oldest()
+            total -= 1
+            if not index.size:
+                del self._indexes[key]
+
+    def clear(self) -> None:
+        self._indexes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        namespaces = {}
+        for namespace, metrics in self._metrics.items():
+            lookups = metrics["hits"] + metrics["misses"]
+            namespaces[namespace] = {
+                **metrics,
+                "entries": sum(
+                    index.size
+                    for (name, _), index in self._indexes.items()
+                    if name == namespace
+                ),
+                "threshold": self.thresholds.get(namespace, self.default_threshold),
+                "hit_rate": metrics["hits"] / lookups if lookups else 0.0,
+            }
+        return {"enabled": self.enabled, "namespaces": namespaces}
@@ -0,0 +1,106 @@
+import logging
+from typing import Optional
+import httpx
+from openai import AsyncAzureOpenAI
+from semantic_kernel.connectors.ai.open_ai.services.azure_chat_completion import (
+    AzureChatCompletion,
+)
+from semantic_kernel.connectors.ai.open_ai.services.azure_text_embedding import (
+    AzureTextEmbedding,
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """
+    Process-wide registry of AI service clients.
+
+    The chat completion and embedding services are built once and share a single
+    keep-alive HTTP connection pool, so requests reuse open TLS connections instead
+    of paying for connection setup on every kernel that is created.
+    """
+
+    def __init__(
+        self,
+        endpoint: Optional[str],
+        api_key: Optional[str],
+        api_version: str,
+        chat_deployment: Optional[str],
+        embedding_deployment: str,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 60.0,
+    ):
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.api_version = api_version
+        self.chat_deployment = chat_deployment
+        self.embedding_deployment = embedding_deployment
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._chat_service: Optional[AzureChatCompletion] = None
+        self._embedding_service: Optional[AzureTextEmbedding] = None
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """The shared HTTP client holding the keep-alive connection pool."""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                limits=self.limits, timeout=self.timeout
+            )
+            logger.info(
+                f"Created shared HTTP connection pool "
+                f"(max_connections={self.limits.max_connections}, "
+                f"max_keepalive_connections={self.limits.max_keepalive_connections})"
+            )
+        return self._http_client
+
+    def _create_openai_client(self, deployment: Optional[str]) -> AsyncAzureOpenAI:
+        return AsyncAzureOpenAI(
+            azure_endpoint=self.endpoint,
+            azure_deployment=deployment,
+            api_key=self.api_key,
+            api_version=self.api_version,
+            http_client=self.http_client,
+        )
+
+    @property
+    def chat_service(self) -> AzureChatCompletion:
+        """The shared chat completion service."""
+        if self._chat_service is None:
+            self._chat_service = AzureChatCompletion(
+                deployment_name=self.chat_deployment,
+                service_id="chat",
+                async_client=self._create_openai_client(self.chat_deployment),
+            )
+        return self._chat_service
+
+    @property
+    def embedding_service(self) -> AzureTextEmbedding:
+        """The shared text embedding service."""
+        if self._embedding_service is None:
+            self._embedding_service = AzureTextEmbedding(
+                deployment_name=self.embedding_deployment,
+                service_id="embeddings",
+                async_client=self._create_openai_client(self.embedding_deployment),
+            )
+        return self._embedding_service
+
+    async def aclose(self) -> None:
+        """
+        Close the shared connection pool and drop the cached services.
+        """
+        if self._http_client is not None and not self._http_client.is_closed:
+            await self._http_client.aclose()
+        self._http_client = None
+        self._chat_service = None
+        self._embedding_service = None
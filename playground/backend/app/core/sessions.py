@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import re
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from app.core.cache import TTLCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Words, numbers and single punctuation marks, a close local stand-in for model tokens
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Summarizes (previous summary, transcript of the turns to fold in) into a new summary
+Summarize = Callable[[str, str], Awaitable[str]]
+
+
+def count_tokens(text: str) -> int:
+    return sum(1 for _ in TOKEN_PATTERN.finditer(text)) if text else 0
+
+
+def truncate_tokens(text: str, limit: int) -> str:
+    """
+    The start of text, up to its first `limit` tokens.
+    """
+    for count, match in enumerate(TOKEN_PATTERN.finditer(text), start=1):
+        if count == limit:
+            return text[: match.end()]
+    return text
+
+
+class AgentSession:
+    """
+    One agent conversation kept on the server.
+
+    The latest turns are kept verbatim, each with its token count, and older turns
+    are folded into a rolling summary. `lock` serializes the turns and compactions
+    of the session.
+    """
+
+    def __init__(
+        self,
+        system_prompt: str,
+        temperature: float = 0.7,
+        plugins: Optional[List[str]] = None,
+    ):
+        self.id = str(uuid.uuid4())
+        self.system_prompt = system_prompt
+        self.temperature = temperature
+        self.plugins = list(plugins or [])
+        self.summary = ""
+        # (user message, assistant message, tokens of both)
+        self.turns: List[Tuple[str, str, int]] = []
+        self.total_turns = 0
+        self.summarized_turns = 0
+        self.created = time.time()
+        self.lock = asyncio.Lock()
+
+    @property
+    def history_tokens(self) -> int:
+        """
+        Tokens of the summary and verbatim turns sent to the model with each message.
+        """
+        return count_tokens(self.summary) + sum(tokens for _, _, tokens in self.turns)
+
+    def instructions(self) -> str:
+        if not self.summary:
+            return self.system_prompt
+        return f"{self.system_prompt}\n\nSummary of the earlier conversation:\n{self.summary}"
+
+    def add_turn(self, user: str, assistant: str) -> None:
+        self.turns.append((user, assistant, count_tokens(user) + count_tokens(assistant)))
+        self.total_turns += 1
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.id,
+            "turns": self.total_turns,
+            "verbatim_turns": len(self.turns),
+            "summarized_turns": self.summarized_turns,
+            "history_tokens": self.history_tokens,
+            "summary": self.summary,
+            "chat_history": [
+                message
+                for user, assistant, _ in self.turns
+                for message in (
+                    {"role": "user", "content": user},
+                    {"role": "assistant", "content": assistant},
+                )
+            ],
+        }
+
+
+class SessionStore:
+    """
+    Agent sessions, evicted when least recently used or idle for `ttl_seconds`.
+
+    A session keeps its last `keep_turns` turns verbatim. Once it holds twice that
+    many, or its history passes `token_budget` tokens, the older turns are folded
+    into its summary in one summarization call, so a message costs about the same
+    however long the conversation has been. Compaction runs in the background
+    after a reply, under the session lock, so the next turn of that session waits
+    for it but the reply does not.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        ttl_seconds: Optional[float] = 3600,
+        keep_turns: int = 6,
+        token_budget: int = 3000,
+    ):
+        self.keep_turns = keep_turns
+        self.token_budget = token_budget
+        self._sessions: TTLCache[AgentSession] = TTLCache(
+            max_entries=max_sessions, ttl_seconds=ttl_seconds
+        )
+        self._compactions: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(
+        self,
+        system_prompt: str,
+        temperature: float = 0.7,
+        plugins: Optional[List[str]] = None,
+    ) -> AgentSession:
+        session = AgentSession(system_prompt, temperature, plugins)
+        self._sessions.set(session.id, session)
+        return session
+
+    def get(self, session_id: str) -> Optional[AgentSession]:
+        return self._sessions.get(session_id)
+
+    def delete(self, session_id: str) -> None:
+        self._sessions.delete(session_id)
+
+    def needs_compaction(self, session: AgentSession) -> bool:
+        return (
+            len(session.turns) > 2 * self.keep_turns
+            or session.history_tokens > self.token_budget
+        )
+
+    async def compact(self, session: AgentSession, summarize: Summarize) -> None:
+        """
+        Fold all but the last keep_turns turns into the summary, and more while the
+        history is over the token budget (always keeping the latest turn).
+        """
+        # The summary may take at most half of the budget
+        summary_budget = self.token_budget // 2
+        keep = min(self.keep_turns, len(session.turns))
+        kept_tokens = sum(tokens for _, _, tokens in session.turns[-keep:]) if keep else 0
+        while keep > 1 and summary_budget + kept_tokens > self.token_budget:
+            kept_tokens -= session.turns[-keep][2]
+            keep -= 1
+        fold = len(session.turns) - keep
+        if fold <= 0:
+            return
+        transcript = "\n".join(
+            f"user: {user}\nassistant: {assistant}"
+            for user, assistant, _ in session.turns[:fold]
+        )
+        summary = await summarize(session.summary, transcript)
+        session.summary = truncate_tokens(summary.strip(), summary_budget)
+        del session.turns[:fold]
+        session.summarized_turns += fold
+
+    def schedule_compaction(self, session: AgentSession, summarize: Summarize) -> None:
+        """
+        Compact the session in the background if it has outgrown its limits.
+        """
+        if not self.needs_compaction(session):
+            return
+
+        async def run() -> None:
+            async with session.lock:
+                try:
+                    await self.compact(session, summarize)
+                except Exception as e:
+                    # The turns stay verbatim and compaction is retried after the next one
+                    logger.error(f"Error compacting session {session.id}: {str(e)}")
+
+        task = asyncio.ensure_future(run())
+        self._compactions.add(task)
+        task.add_done_callback(self._compactions.discard)
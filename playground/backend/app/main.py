@@ -1,7 +1,11 @@
+import os
 import logging
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import memory, functions, weather, agents, filters, kernel, process
+from app.core.kernel import close_services, ensure_memory_initialized
+from app.core.cache import cache_bypass
 
 # Configure logging
 logging.basicConfig(
@@ -9,7 +13,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Semantic Kernel Demo API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Optionally seed memory at startup instead of on first access
+    if os.getenv("MEMORY_EAGER_INIT", "false").lower() == "true":
+        try:
+            await ensure_memory_initialized()
+        except Exception as e:
+            logger.error(f"Error initializing memory at startup: {str(e)}")
+    yield
+    # Close the shared AI service connection pool on shutdown
+    await close_services()
+
+
+app = FastAPI(title="Semantic Kernel Demo API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -20,6 +38,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+# Let clients skip the response cache with "X-Cache-Bypass: true" or "Cache-Control: no-cache"
+@app.middleware("http")
+async def cache_bypass_middleware(request: Request, call_next):
+    bypass = request.headers.get("x-cache-bypass", "").lower() in ("1", "true") or (
+        "no-cache" in request.headers.get("cache-control", "").lower()
+    )
+    token = cache_bypass.set(bypass)
+    try:
+        return await call_next(request)
+    finally:
+        cache_bypass.reset(token)
+
+
 # Include routers
 app.include_router(memory.router)
 app.include_router(functions.router)
@@ -36,7 +68,8 @@ async def root():
     return {"message": "Semantic Kernel Demo API is running"}
 
 
-# Note: Memory initialization is now done on-demand when accessing memory endpoints
+# Note: Memory initialization is done on-demand when accessing memory endpoints,
+# or at startup when MEMORY_EAGER_INIT is set
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,4 +1,4 @@
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 from pydantic import BaseModel
 
 
@@ -6,12 +6,44 @@ class MemoryItem(BaseModel):
     id: str
     text: str
     collection: str
+    metadata: Optional[Dict[str, Any]] = None  # e.g. {"tenant": "acme", "year": 2024}
+
+
+class MemoryUpsertRequest(BaseModel):
+    items: List[MemoryItem]
+
+
+class MemoryDeleteRequest(BaseModel):
+    ids: Optional[List[str]] = None
+    # Metadata conditions, as in SearchQuery; with ids, both must match
+    filter: Optional[Dict[str, Any]] = None
 
 
 class SearchQuery(BaseModel):
     collection: str
     query: str
     limit: int = 5
+    mode: str = "vector"  # "vector", "lexical" (keywords, no embedding) or "hybrid"
+    # Metadata conditions, e.g. {"tenant": "acme", "year": {"$gte": 2023}}
+    filter: Optional[Dict[str, Any]] = None
+
+
+class BatchSearchQuery(BaseModel):
+    queries: List[SearchQuery]
+
+
+class IndexConfig(BaseModel):
+    index_type: str = "ivf"  # "flat" for exact search, or "ivf"
+    nlist: Optional[int] = None
+    nprobe: int = 8
+    train_size: int = 1000
+
+
+class DedupConfig(BaseModel):
+    policy: str = "skip"  # "off", "skip", "merge" or "keep"
+    max_distance: int = 3  # SimHash bits two near-duplicates may differ in
+    # Metadata fields near-duplicates must share, e.g. ["tenant"]
+    scope: Optional[List[str]] = None
 
 
 class FunctionInput(BaseModel):
@@ -22,6 +54,19 @@ class FunctionInput(BaseModel):
     parameters: Optional[Dict[str, str]] = None
 
 
+class FunctionRegistration(BaseModel):
+    function_name: str
+    plugin_name: str
+    prompt: str
+    description: Optional[str] = None
+    max_tokens: int = 500
+
+
+class NamedFunctionInput(BaseModel):
+    input_text: str
+    parameters: Optional[Dict[str, str]] = None
+
+
 class AgentRequest(BaseModel):
     message: str
     system_prompt: str = (
@@ -32,6 +77,18 @@ class AgentRequest(BaseModel):
     chat_history: List[Dict[str, str]] = []
 
 
+class AgentSessionRequest(BaseModel):
+    system_prompt: str = (
+        "You are a helpful assistant that provides concise and accurate information."
+    )
+    temperature: float = 0.7
+    available_plugins: List[str] = []
+
+
+class AgentSessionMessage(BaseModel):
+    message: str
+
+
 class MultiAgentRequest(BaseModel):
     message: str
     system_prompt: str = (
@@ -42,6 +99,18 @@ class MultiAgentRequest(BaseModel):
     chat_history: List[Dict[str, str]] = []
     agent_configs: List[Dict[str, str]] = []
     max_iterations: int = 8
+    # "sequential" (agents take turns) or "parallel" (all but the synthesizer
+    # answer at once, then the synthesizer aggregates; max_iterations is unused)
+    orchestration: str = "sequential"
+    max_concurrency: int = 4
+    # Name of the aggregating agent in parallel mode; defaults to "Synthesizer",
+    # or else the last agent
+    synthesizer: Optional[str] = None
+    # Sequential chats stop before max_iterations once a turn contains the marker,
+    # nearly repeats an earlier turn (0-1 word similarity), or the budget is spent
+    completion_marker: Optional[str] = None
+    convergence_threshold: Optional[float] = None
+    token_budget: Optional[int] = None
 
 
 class TranslationRequest(BaseModel):
@@ -0,0 +1,77 @@
+"""
+Benchmark of recall and latency of the IVF index against exact search.
+
+Embeddings are drawn around random topic centres, which is closer to real text
+embeddings than uniform noise. Run from playground/backend:
+    python -m benchmarks.ann_recall --records 100000 --dimension 1536
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.core.memory_store import NumpyMemoryStore
+from benchmarks.memory_search import COLLECTION, load, time_search
+
+
+def clustered(rng, count: int, centres: np.ndarray, spread: float) -> np.ndarray:
+    picks = rng.integers(len(centres), size=count)
+    noise = rng.standard_normal((count, centres.shape[1]), dtype=np.float32)
+    return centres[picks] + spread * noise
+
+
+def recall(exact: list, approximate: list) -> float:
+    found = sum(len(set(e) & set(a)) for e, a in zip(exact, approximate))
+    return found / sum(len(e) for e in exact)
+
+
+async def main(
+    records: int, dimension: int, queries: int, limit: int, topics: int, spread: float
+) -> None:
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((topics, dimension), dtype=np.float32)
+    embeddings = clustered(rng, records, centres, spread)
+    query_vectors = clustered(rng, queries, centres, spread)
+
+    store = NumpyMemoryStore()
+    await load(store, embeddings)
+    exact_time, exact_ids = await time_search(store, query_vectors, limit)
+
+    start = time.perf_counter()
+    store.configure_index(COLLECTION, "ivf")
+    index = await store.wait_for_index(COLLECTION)
+    build_time = time.perf_counter() - start
+
+    print(f"{records} records x {dimension} dimensions, {queries} queries, top {limit}")
+    print(f"  IVF index with {index['nlist']} lists built in {build_time:.2f} s")
+    print(f"  {'exact':12s} {exact_time * 1000:9.2f} ms/search  recall@{limit} 1.000")
+    for nprobe in (1, 2, 4, 8, 16, 32, 64):
+        store.configure_index(COLLECTION, "ivf", nprobe=nprobe)
+        ivf_time, ivf_ids = await time_search(store, query_vectors, limit)
+        print(
+            f"  {f'nprobe={nprobe}':12s} {ivf_time * 1000:9.2f} ms/search"
+            f"  recall@{limit} {recall(exact_ids, ivf_ids):.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--topics", type=int, default=1000)
+    parser.add_argument("--spread", type=float, default=1.5)
+    args = parser.parse_args()
+    asyncio.run(
+        main(
+            args.records,
+            args.dimension,
+            args.queries,
+            args.limit,
+            args.topics,
+            args.spread,
+        )
+    )
@@ -0,0 +1,44 @@
+"""
+Micro-benchmark comparing kernel acquisition time.
+
+Builds a kernel from scratch on every call (the previous behaviour of
+create_kernel) versus cloning a cached template.
+
+Run from playground/backend:
+    python -m benchmarks.kernel_acquisition
+"""
+
+import os
+import timeit
+
+# The services are never called, so placeholder credentials are enough
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "https://example.openai.azure.com/")
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-4o")
+
+from app.core.kernel import (  # noqa: E402
+    _build_kernel_template,
+    _normalize_plugins,
+    create_kernel,
+)
+
+ITERATIONS = 2000
+
+
+def main():
+    for plugins in ([], ["Weather"]):
+        key = _normalize_plugins(plugins)
+        # Warm the template cache and the shared services
+        create_kernel(plugins=plugins)
+
+        before = timeit.timeit(lambda: _build_kernel_template(key), number=ITERATIONS)
+        after = timeit.timeit(lambda: create_kernel(plugins=plugins), number=ITERATIONS)
+
+        print(f"plugins={key}")
+        print(f"  build from scratch: {before / ITERATIONS * 1e6:9.1f} us/kernel")
+        print(f"  clone template:     {after / ITERATIONS * 1e6:9.1f} us/kernel")
+        print(f"  speedup:            {before / after:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark comparing similarity search in VolatileMemoryStore and NumpyMemoryStore,
+and one query at a time with a batch of queries searched together.
+
+Exact search reads the whole embedding matrix for every query, so it is bound
+by memory bandwidth: at 100k x 1536 that is 614 MB per query, about 60 ms on a
+typical machine. Batching queries shares the reads and lowers that somewhat.
+Single-query latency of a few ms at that size needs the IVF index instead; see
+benchmarks/ann_recall.py.
+
+Run from playground/backend:
+    python -m benchmarks.memory_search --records 100000 --dimension 1536
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from semantic_kernel.memory.memory_record import MemoryRecord
+from semantic_kernel.memory.volatile_memory_store import VolatileMemoryStore
+
+from app.core.memory_store import NumpyMemoryStore
+
+COLLECTION = "benchmark"
+
+
+async def load(store, embeddings: np.ndarray) -> None:
+    await store.create_collection(COLLECTION)
+    records = [
+        MemoryRecord.local_record(
+            id=str(i),
+            text=f"record {i}",
+            description=None,
+            additional_metadata=None,
+            embedding=embedding,
+        )
+        for i, embedding in enumerate(embeddings)
+    ]
+    await store.upsert_batch(COLLECTION, records)
+
+
+async def time_search(store, queries: np.ndarray, limit: int) -> tuple[float, list]:
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        matches = await store.get_nearest_matches(COLLECTION, query, limit=limit)
+        results.append([record.id for record, _ in matches])
+    return (time.perf_counter() - start) / len(queries), results
+
+
+async def time_search_batch(
+    store, queries: np.ndarray, limit: int
+) -> tuple[float, list]:
+    start = time.perf_counter()
+    matches = await store.get_nearest_matches_batch(COLLECTION, queries, limit=limit)
+    results = [[record.id for record, _ in found] for found in matches]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+async def main(records: int, dimension: int, queries: int, limit: int) -> None:
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((records, dimension), dtype=np.float32)
+    query_vectors = rng.standard_normal((queries, dimension), dtype=np.float32)
+
+    print(f"{records} records x {dimension} dimensions, {queries} queries, top {limit}")
+    timings = {}
+    for name, store in (
+        ("VolatileMemoryStore", VolatileMemoryStore()),
+        ("NumpyMemoryStore", NumpyMemoryStore()),
+    ):
+        await load(store, embeddings)
+        timings[name] = await time_search(store, query_vectors, limit)
+        print(f"  {name:20s} {timings[name][0] * 1000:9.2f} ms/search")
+
+    timings["batch"] = await time_search_batch(store, query_vectors, limit)
+    print(f"  {'NumpyMemoryStore batch':20s} {timings['batch'][0] * 1000:9.2f} ms/search")
+
+    same = timings["VolatileMemoryStore"][1] == timings["NumpyMemoryStore"][1]
+    print(f"  identical top-{limit} ids: {same}")
+    same = timings["batch"][1] == timings["NumpyMemoryStore"][1]
+    print(f"  identical batch top-{limit} ids: {same}")
+
+    # An exact search cannot go faster than reading the matrix once
+    scanned = records * dimension * np.dtype(np.float32).itemsize
+    bandwidth = scanned / timings["NumpyMemoryStore"][0]
+    print(
+        f"  exact search scans {scanned / 1e6:.0f} MB per query"
+        f" ({bandwidth / 1e9:.1f} GB/s); searching faster than that needs"
+        " the IVF index (benchmarks.ann_recall)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.records, args.dimension, args.queries, args.limit))
@@ -0,0 +1,82 @@
+"""
+Benchmark of memory footprint, recall and latency of quantized vector storage.
+
+Compares float32, float16 and int8 storage, with and without float32 re-scoring,
+in the in-memory store and in the memory-mapped store (where the float32 matrix
+used for re-scoring stays on disk). Run from playground/backend:
+    python -m benchmarks.quantization --records 100000 --dimension 1536
+"""
+
+import argparse
+import asyncio
+import tempfile
+
+import numpy as np
+
+from app.core.memory_store import NumpyMemoryStore
+from app.core.persistent_store import PersistentMemoryStore
+from benchmarks.ann_recall import clustered, recall
+from benchmarks.memory_search import COLLECTION, load, time_search
+
+MODES = (
+    ("none", False),
+    ("float16", False),
+    ("float16", True),
+    ("int8", False),
+    ("int8", True),
+)
+
+
+def bytes_per_vector(collection) -> float:
+    # In-memory collections hold spare capacity, which is allocated per row too
+    rows = getattr(collection, "capacity", None) or len(collection)
+    return collection.nbytes / rows
+
+
+async def main(
+    records: int, dimension: int, queries: int, limit: int, persistent: bool
+) -> None:
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((1000, dimension), dtype=np.float32)
+    embeddings = clustered(rng, records, centres, spread=1.5)
+    query_vectors = clustered(rng, queries, centres, spread=1.5)
+
+    store_name = "PersistentMemoryStore" if persistent else "NumpyMemoryStore"
+    print(
+        f"{store_name}: {records} records x {dimension} dimensions, "
+        f"{queries} queries, top {limit}"
+    )
+    exact_ids = None
+    for quantization, rescore in MODES:
+        if persistent:
+            store = PersistentMemoryStore(
+                tempfile.mkdtemp(), quantization=quantization, rescore=rescore
+            )
+        else:
+            store = NumpyMemoryStore(quantization=quantization, rescore=rescore)
+        await load(store, embeddings)
+        if persistent:
+            await store.compact()
+        search_time, ids = await time_search(store, query_vectors, limit)
+        exact_ids = exact_ids or ids
+
+        collection = store._collection(COLLECTION)
+        name = quantization + (" + rescore" if rescore else "")
+        print(
+            f"  {name:17s} {bytes_per_vector(collection):8.0f} bytes/vector"
+            f"  {search_time * 1000:8.2f} ms/search"
+            f"  recall@{limit} {recall(exact_ids, ids):.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--persistent", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(
+        main(args.records, args.dimension, args.queries, args.limit, args.persistent)
+    )
@@ -0,0 +1,25 @@
+import json
+from typing import Any, Dict, Optional
+import numpy as np
+from semantic_kernel.memory.memory_record import MemoryRecord
+
+
+def make_record(
+    id: str,
+    embedding: Any,
+    text: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> MemoryRecord:
+    return MemoryRecord.local_record(
+        id=id,
+        text=text if text is not None else f"text of {id}",
+        description=None,
+        additional_metadata=json.dumps(metadata) if metadata else None,
+        embedding=np.asarray(embedding, dtype=np.float32),
+    )
+
+
+def random_vectors(rows: int, dimension: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((rows, dimension)).astype(
+        np.float32
+    )
@@ -0,0 +1,93 @@
+import asyncio
+import numpy as np
+from app.core.ann_index import IVFFlatIndex
+from app.core.memory_store import NumpyMemoryStore, VectorCollection
+from tests.helpers import make_record, random_vectors
+
+
+def normalized(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def listed_rows(index):
+    return sorted(
+        int(row)
+        for lst, count in zip(index._lists, index._counts)
+        for row in lst[:count]
+    )
+
+
+def test_build_matches_incremental_add():
+    vectors = normalized(random_vectors(500, 16))
+    rows = np.arange(500)
+    index = IVFFlatIndex(nlist=8)
+    index.install(index.build(rows, vectors))
+
+    other = IVFFlatIndex(nlist=8)
+    other.train(vectors)
+    other.add(rows, vectors)
+
+    assert np.array_equal(index.centroids, other.centroids)
+    assert np.array_equal(index._assignment[:500], other._assignment[:500])
+    assert listed_rows(index) == list(range(500))
+    # Positions point back at the rows in their lists
+    for row in rows:
+        target = index._assignment[row]
+        assert index._lists[target][index._position[row]] == row
+
+
+def test_remove_and_renumber():
+    vectors = normalized(random_vectors(200, 16))
+    index = IVFFlatIndex(nlist=4)
+    index.install(index.build(np.arange(200), vectors))
+    index.remove(np.arange(0, 200, 2))
+    assert listed_rows(index) == list(range(1, 200, 2))
+
+    index.renumber(np.arange(1, 200, 2))
+    assert listed_rows(index) == list(range(100))
+    assert np.array_equal(
+        index._assignment[:100],
+        IVFFlatIndex._nearest(vectors[1::2], index.centroids),
+    )
+
+
+def test_trains_in_place_without_event_loop():
+    collection = VectorCollection()
+    collection.set_index(IVFFlatIndex(nlist=4, train_size=100))
+    vectors = random_vectors(100, 16)
+    collection.upsert([make_record(f"r{i}", vectors[i]) for i in range(100)])
+    assert collection.index.trained
+    assert collection.training is None
+
+
+def test_upsert_trains_in_background_and_searches_exactly_meanwhile():
+    vectors = random_vectors(400, 16)
+
+    async def run():
+        store = NumpyMemoryStore(index_type="ivf", index_params={"nlist": 4, "train_size": 300})
+        await store.create_collection("c")
+        await store.upsert_batch(
+            "c", [make_record(f"r{i}", vectors[i]) for i in range(300)]
+        )
+        collection = store._collection("c")
+        # The upsert returns before the index is trained
+        assert collection.training is not None
+        assert not collection.index.trained
+        matches = await store.get_nearest_matches("c", vectors[7], 1, 0.0)
+        assert matches[0][0]._id == "r7"
+
+        # Rows written and removed during the build are reconciled when it lands
+        await store.upsert_batch(
+            "c", [make_record(f"r{i}", vectors[i]) for i in range(300, 400)]
+        )
+        await store.remove_batch("c", ["r0", "r1"])
+        described = await store.wait_for_index("c")
+        assert described["trained"] and not described["training"]
+        assert collection.training is None
+        expected = sorted(collection.rows.values())
+        assert listed_rows(collection.index) == expected
+
+        matches = await store.get_nearest_matches("c", vectors[350], 1, 0.0)
+        assert matches[0][0]._id == "r350"
+
+    asyncio.run(run())
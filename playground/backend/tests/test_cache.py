@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from semantic_kernel.connectors.ai.open_ai import AzureChatPromptExecutionSettings
+from semantic_kernel.connectors.ai.prompt_execution_settings import (
+    PromptExecutionSettings,
+)
+from app.core.cache import ResponseCache, SQLiteCacheBackend, TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache[str](max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.core.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache[str](ttl_seconds=10)
+    cache.set("a", "1")
+    now[0] = 109.0
+    assert cache.get("a") == "1"
+    now[0] = 111.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+@pytest.mark.parametrize(
+    "settings, deterministic",
+    [
+        (PromptExecutionSettings(), True),
+        (AzureChatPromptExecutionSettings(temperature=0), True),
+        (AzureChatPromptExecutionSettings(temperature=0.7), False),
+        (AzureChatPromptExecutionSettings(temperature=0, number_of_responses=2), False),
+        (PromptExecutionSettings(extension_data={"temperature": 0.5}), False),
+        (PromptExecutionSettings(extension_data={"temperature": 0.0, "n": 1}), True),
+    ],
+)
+def test_only_deterministic_settings_are_cached(settings, deterministic):
+    assert ResponseCache.is_deterministic(settings) is deterministic
+
+
+def test_sqlite_backend_is_a_second_tier(tmp_path):
+    path = str(tmp_path / "cache.db")
+
+    async def run():
+        cache = ResponseCache(backend=SQLiteCacheBackend(path))
+        await cache.set("k", "v")
+        # A new process starts with an empty memory tier
+        reopened = ResponseCache(backend=SQLiteCacheBackend(path))
+        assert await reopened.get("k") == "v"
+        assert reopened.memory.get("k") == "v"
+        await reopened.clear()
+        assert await ResponseCache(backend=SQLiteCacheBackend(path)).get("k") is None
+
+    asyncio.run(run())
@@ -0,0 +1,42 @@
+import pytest
+from app.core.chunking import TextChunker, chunk_text
+
+TEXT = " ".join(f"word{i}" for i in range(400))
+
+
+def test_chunks_fit_and_overlap_at_word_boundaries():
+    chunks = chunk_text(TEXT, chunk_size=200, overlap=40)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    words = set(TEXT.split())
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert set(chunk.split()) <= words
+        # The chunk starts with words from the end of the previous one
+        assert chunk.split()[0] in previous.split()[-10:]
+    assert chunks[0].split()[0] == "word0"
+    assert chunks[-1].split()[-1] == "word399"
+
+
+def test_feeding_pieces_gives_the_same_chunks():
+    chunker = TextChunker(chunk_size=200, overlap=40)
+    chunks = []
+    for start in range(0, len(TEXT), 37):
+        chunks += chunker.feed(TEXT[start : start + 37])
+    chunks += chunker.finish()
+    assert chunks == chunk_text(TEXT, chunk_size=200, overlap=40)
+
+
+def test_text_without_whitespace_is_cut_at_chunk_size():
+    chunks = chunk_text("x" * 250, chunk_size=100, overlap=0)
+    assert chunks == ["x" * 100, "x" * 100, "x" * 50]
+
+
+def test_short_and_blank_texts():
+    assert chunk_text("hello", chunk_size=100, overlap=10) == ["hello"]
+    assert chunk_text("   ", chunk_size=100, overlap=10) == []
+
+
+@pytest.mark.parametrize("chunk_size, overlap", [(0, 0), (100, 50), (100, -1)])
+def test_invalid_settings_are_rejected(chunk_size, overlap):
+    with pytest.raises(ValueError):
+        TextChunker(chunk_size, overlap)
@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from app.core.coalescing import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    started = 0
+
+    async def call():
+        nonlocal started
+        started += 1
+        await asyncio.sleep(0.01)
+        return started
+
+    async def run():
+        return await asyncio.gather(*(flights.do("k", call) for _ in range(5)))
+
+    assert asyncio.run(run()) == [1] * 5
+    assert flights.stats() == {"calls": 5, "coalesced": 4, "in_flight": 0}
+
+
+def test_cancelling_one_waiter_keeps_the_call_for_others():
+    flights = SingleFlight()
+
+    async def run():
+        first = asyncio.ensure_future(flights.do("k", lambda: asyncio.sleep(0.02, "x")))
+        second = asyncio.ensure_future(flights.do("k", lambda: asyncio.sleep(0, "y")))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "x"
+
+
+def test_cancelling_only_waiter_cancels_and_forgets_the_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def call(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def run():
+        waiter = asyncio.ensure_future(flights.do("k", lambda: call("first")))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert flights.in_flight == 0
+        # The next caller starts a new call rather than joining the cancelled one
+        return await flights.do("k", lambda: call("second"))
+
+    assert asyncio.run(run()) == "second"
+    assert calls == ["first", "second"]
+
+
+def test_exceptions_reach_every_caller():
+    flights = SingleFlight()
+
+    async def call():
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    async def run():
+        return await asyncio.gather(
+            flights.do("k", call), flights.do("k", call), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
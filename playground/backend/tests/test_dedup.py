@@ -0,0 +1,57 @@
+import pytest
+from semantic_kernel.exceptions import ServiceInvalidRequestError
+from app.core.dedup import FINGERPRINT_BITS, SimHashIndex, simhash
+
+TEXT = "The quick brown fox jumps over the lazy dog near the river bank today"
+
+
+def test_simhash_ignores_case_punctuation_and_spacing():
+    assert simhash(TEXT) == simhash(TEXT.upper().replace(" ", "  ") + "!")
+    assert simhash("") is None
+    assert 0 <= simhash(TEXT) < 1 << FINGERPRINT_BITS
+
+
+def test_near_texts_are_found_and_far_ones_are_not():
+    index = SimHashIndex(max_distance=3)
+    index.add("a", simhash(TEXT))
+    assert index.find(simhash(TEXT + ".")) == ("a", 0)
+    assert index.find(simhash("Completely different words about cooking pasta")) is None
+    assert index.find(simhash(TEXT), exclude="a") is None
+
+
+@pytest.mark.parametrize("max_distance", [0, 3, 7, 15])
+def test_bands_find_every_fingerprint_within_max_distance(max_distance):
+    index = SimHashIndex(max_distance=max_distance)
+    base = 0x0123456789ABCDEF
+    index.add("a", base)
+    # Flip max_distance bits spread over the fingerprint, one in each of most bands
+    step = FINGERPRINT_BITS // max(max_distance, 1)
+    flipped = base
+    for bit in range(max_distance):
+        flipped ^= 1 << (bit * step)
+    assert index.find(flipped) == ("a", max_distance)
+    # One more bit is out of range
+    assert index.find(flipped ^ (1 << (FINGERPRINT_BITS - 1))) is None
+
+
+def test_scope_separates_tenants():
+    index = SimHashIndex(scope=["tenant"])
+    acme, globex = index.scope_of({"tenant": "acme"}), index.scope_of({"tenant": "globex"})
+    index.add("a", simhash(TEXT), acme)
+    assert index.find(simhash(TEXT), globex) is None
+    assert index.find(simhash(TEXT), acme) == ("a", 0)
+
+
+def test_remove_clears_the_band_tables():
+    index = SimHashIndex()
+    index.add_texts([("a", TEXT, None), ("b", "", None)])
+    assert len(index) == 1
+    index.remove("a")
+    assert index.find(simhash(TEXT)) is None
+    assert all(not table for table in index.tables)
+
+
+@pytest.mark.parametrize("policy, max_distance", [("drop", 3), ("skip", 16), ("skip", -1)])
+def test_invalid_settings_are_rejected(policy, max_distance):
+    with pytest.raises(ServiceInvalidRequestError):
+        SimHashIndex(policy, max_distance)
@@ -0,0 +1,49 @@
+import pytest
+from app.core.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+@pytest.fixture
+def index():
+    index = BM25Index()
+    index.add_many(
+        [
+            ("a", "The 2024 report on solar power"),
+            ("b", "Solar solar solar panels"),
+            ("c", "Wind power in the north sea"),
+        ]
+    )
+    return index
+
+
+def test_tokenize():
+    assert tokenize("Hello, World! Report-2024") == ["hello", "world", "report", "2024"]
+    assert tokenize("") == []
+
+
+def test_rare_terms_and_frequency_rank_higher(index):
+    assert [key for key, _ in index.search("solar", 3)] == ["b", "a"]
+    # "2024" appears once in the collection, "power" twice
+    assert index.search("2024 power", 1)[0][0] == "a"
+    assert index.search("unknown", 3) == []
+
+
+def test_replace_and_remove_keep_statistics(index):
+    index.add("b", "Offshore wind")
+    assert [key for key, _ in index.search("solar", 3)] == ["a"]
+    assert index.total_length == sum(index.lengths.values())
+    index.remove("a")
+    index.remove("missing")
+    assert index.search("solar", 3) == []
+    assert "solar" not in index.postings
+    assert index.describe() == {"documents": 2, "terms": len(index.postings)}
+
+
+def test_allowed_limits_the_scored_documents(index):
+    assert [key for key, _ in index.search("power", 3, allowed={"c"})] == ["c"]
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], k=60)
+    assert [key for key, _ in fused] == ["a", "c", "b"]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 62)
+    assert reciprocal_rank_fusion([]) == []
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from semantic_kernel.exceptions import ServiceInvalidRequestError
+from app.core.metadata_index import MetadataIndex, parse_metadata
+
+ROWS = [
+    {"tenant": "acme", "year": 2022, "tags": ["a", "b"], "public": True},
+    {"tenant": "acme", "year": 2024, "tags": ["b"], "public": False},
+    {"tenant": "globex", "year": 2023, "date": "2023-05-01", "count": 1},
+    {"tenant": "globex", "count": 0, "date": "2024-01-15"},
+]
+
+
+@pytest.fixture
+def index():
+    index = MetadataIndex()
+    index.add_many(enumerate(ROWS))
+    return index
+
+
+def rows(index, filter):
+    return np.flatnonzero(index.mask(filter, len(ROWS))).tolist()
+
+
+@pytest.mark.parametrize(
+    "filter, expected",
+    [
+        ({"tenant": "acme"}, [0, 1]),
+        ({"tenant": {"$ne": "acme"}}, [2, 3]),
+        ({"tags": "b"}, [0, 1]),
+        ({"tenant": {"$in": ["globex", "initech"]}}, [2, 3]),
+        ({"tags": {"$nin": ["a"]}}, [1, 2, 3]),
+        ({"year": {"$exists": True}}, [0, 1, 2]),
+        ({"year": {"$gte": 2023}}, [1, 2]),
+        ({"year": {"$gt": 2022, "$lt": 2024}}, [2]),
+        ({"date": {"$lt": "2024-01-01"}}, [2]),
+        ({"$or": [{"year": 2022}, {"tenant": "globex"}]}, [0, 2, 3]),
+        ({"$and": [{"tenant": "acme"}, {"tags": "b"}]}, [0, 1]),
+        ({"$not": {"tenant": "acme"}}, [2, 3]),
+    ],
+)
+def test_filter_language(index, filter, expected):
+    assert rows(index, filter) == expected
+
+
+def test_booleans_do_not_match_numbers(index):
+    assert rows(index, {"public": True}) == [0]
+    assert rows(index, {"public": 1}) == []
+    assert rows(index, {"count": 1}) == [2]
+    assert rows(index, {"count": True}) == []
+    assert rows(index, {"count": {"$in": [False]}}) == []
+    assert rows(index, {"count": {"$in": [0]}}) == [3]
+
+
+def test_remove_and_renumber(index):
+    index.remove(1)
+    assert rows(index, {"tenant": "acme"}) == [0]
+    assert rows(index, {"year": {"$gt": 2023}}) == []
+    index.renumber(np.array([0, 2, 3]))
+    assert np.flatnonzero(index.mask({"tenant": "globex"}, 3)).tolist() == [1, 2]
+    assert np.flatnonzero(index.mask({"year": 2023}, 3)).tolist() == [1]
+
+
+@pytest.mark.parametrize(
+    "filter",
+    [
+        [],
+        {"$xor": []},
+        {"$and": []},
+        {"year": {"$near": 1}},
+        {"year": {"$gt": [1]}},
+        {"tags": {"$in": "a"}},
+        {"tags": {"$eq": ["a"]}},
+    ],
+)
+def test_invalid_filters_are_rejected(index, filter):
+    with pytest.raises(ServiceInvalidRequestError):
+        index.mask(filter, len(ROWS))
+
+
+def test_parse_metadata():
+    assert parse_metadata('{"a": 1}') == {"a": 1}
+    assert parse_metadata("free text") == {}
+    assert parse_metadata("[1, 2]") == {}
+    assert parse_metadata(None) == {}
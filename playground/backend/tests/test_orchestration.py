@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from semantic_kernel.contents import (
+    AuthorRole,
+    ChatMessageContent,
+    FunctionCallContent,
+    FunctionResultContent,
+)
+from semantic_kernel.contents.chat_history import ChatHistory
+from app.core.orchestration import (
+    fan_out_fan_in,
+    make_termination_strategy,
+    message_tokens,
+)
+
+
+def answer(text, name="Writer"):
+    return ChatMessageContent(role=AuthorRole.ASSISTANT, content=text, name=name)
+
+
+def tool_turn():
+    return [
+        ChatMessageContent(
+            role=AuthorRole.ASSISTANT,
+            items=[FunctionCallContent(id="c1", name="Weather-get", arguments='{"location": "Paris"}')],
+        ),
+        ChatMessageContent(
+            role=AuthorRole.TOOL,
+            items=[FunctionResultContent(id="c1", name="Weather-get", result="x" * 400)],
+        ),
+    ]
+
+
+def test_function_messages_are_estimated_from_their_payload():
+    call, result = tool_turn()
+    assert message_tokens(call) == len('{"location": "Paris"}') // 4
+    assert message_tokens(result) == 100
+
+
+def test_token_budget_counts_every_message_of_a_turn():
+    strategy = make_termination_strategy(10, token_budget=115)
+    agent = SimpleNamespace(name="Writer")
+    history = [ChatMessageContent(role=AuthorRole.USER, content="u" * 4000)]
+    strategy.start(history)
+
+    async def run():
+        history.extend(tool_turn())
+        history.append(answer("done " * 4))
+        # The user's prompt is not counted, the function result is
+        assert not await strategy.should_agent_terminate(agent, history)
+        assert strategy.tokens == 5 + 100 + 5
+        history.append(answer("more " * 4))
+        return await strategy.should_agent_terminate(agent, history)
+
+    assert asyncio.run(run())
+    assert strategy.report()["reason"] == "token_budget"
+    assert strategy.report()["turns"] == 2
+
+
+class SlowAgent:
+    name = "Slow"
+    cancelled = False
+
+    async def get_response(self, **kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+class FailingAgent:
+    name = "Failing"
+
+    async def get_response(self, **kwargs):
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+
+def test_fan_out_cancels_the_other_agents_when_one_fails():
+    slow, failing, synthesizer = SlowAgent(), FailingAgent(), SlowAgent()
+    history = ChatHistory()
+    history.add_user_message("hello")
+
+    async def run():
+        with pytest.raises(ValueError):
+            await fan_out_fan_in([slow, failing, synthesizer], synthesizer, history)
+        # Checked before asyncio.run cancels whatever is left at shutdown
+        return slow.cancelled
+
+    assert asyncio.run(run())
+    assert not synthesizer.cancelled
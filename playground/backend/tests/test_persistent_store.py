@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import numpy as np
+import pytest
+from app.core.persistent_store import PersistentMemoryStore, PersistentVectorCollection
+from tests.helpers import make_record, random_vectors
+
+
+@pytest.fixture
+def vectors():
+    return random_vectors(8, 16)
+
+
+def test_reopen_replays_log(tmp_path, vectors):
+    collection = PersistentVectorCollection(str(tmp_path))
+    collection.upsert([make_record(f"r{i}", vectors[i]) for i in range(4)])
+    collection.remove(["r1"])
+
+    reopened = PersistentVectorCollection(str(tmp_path))
+    assert len(reopened) == 3
+    assert "r1" not in reopened
+    assert reopened.get("r2", False)._text == "text of r2"
+
+
+def test_write_after_torn_line_truncates_it(tmp_path, vectors):
+    collection = PersistentVectorCollection(str(tmp_path))
+    collection.upsert([make_record("a", vectors[0])])
+
+    # A writer killed in the middle of an entry leaves a partial line behind
+    torn = json.dumps({"op": "upsert", "records": [{"id": "lost"}]}).encode()
+    with open(collection.log_path, "ab") as f:
+        f.write(torn[: len(torn) // 2])
+
+    # Replay ignores the partial entry, and the next write starts a fresh line
+    collection.sync()
+    collection.upsert([make_record("b", vectors[1])])
+    with open(collection.log_path, "rb") as f:
+        lines = f.read().splitlines()
+    assert [json.loads(line)["records"][0]["id"] for line in lines] == ["a", "b"]
+    assert collection._log_offset == os.path.getsize(collection.log_path)
+
+    reopened = PersistentVectorCollection(str(tmp_path))
+    assert sorted(reopened.delta.rows) == ["a", "b"]
+
+
+def test_torn_line_from_other_process_is_not_replayed(tmp_path, vectors):
+    writer = PersistentVectorCollection(str(tmp_path))
+    reader = PersistentVectorCollection(str(tmp_path))
+    writer.upsert([make_record("a", vectors[0])])
+    with open(writer.log_path, "ab") as f:
+        f.write(b'{"op": "upsert", "rec')
+
+    reader.sync()
+    assert "a" in reader and len(reader) == 1
+
+    writer.upsert([make_record("b", vectors[1])])
+    reader.sync()
+    assert "b" in reader and len(reader) == 2
+
+
+def test_compaction_keeps_records_and_search(tmp_path, vectors):
+    collection = PersistentVectorCollection(str(tmp_path))
+    collection.upsert([make_record(f"r{i}", vectors[i]) for i in range(8)])
+    collection.remove(["r0"])
+    asyncio.run(collection.compact())
+
+    assert collection.generation == 1
+    assert len(collection.delta) == 0
+    reopened = PersistentVectorCollection(str(tmp_path))
+    assert len(reopened) == 7
+    (row, score), *_ = reopened.search(vectors[3], 1)
+    assert reopened.record(row, False)._id == "r3"
+    assert score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_dedup_settings_are_shared_and_survive_restart(tmp_path):
+    first = PersistentMemoryStore(str(tmp_path))
+    second = PersistentMemoryStore(str(tmp_path), dedup_policy="keep")
+    asyncio.run(first.create_collection("notes"))
+    assert second.describe_dedup("notes")["policy"] == "keep"
+
+    first.configure_dedup("notes", "skip", max_distance=5, scope=["tenant"])
+    assert second.dedup_index("notes").describe() == {
+        "policy": "skip",
+        "max_distance": 5,
+        "scope": ["tenant"],
+        "fingerprints": 0,
+    }
+
+    second.configure_dedup("notes", "off")
+    assert first.dedup_index("notes") is None
+
+    # Saved settings take precedence over the default of a new process
+    restarted = PersistentMemoryStore(str(tmp_path), dedup_policy="merge")
+    assert restarted.dedup_index("notes") is None
+
+
+def test_dedup_settings_survive_compaction(tmp_path, vectors):
+    store = PersistentMemoryStore(str(tmp_path))
+    asyncio.run(store.create_collection("notes"))
+    store.configure_dedup("notes", "merge")
+    collection = store._collection("notes")
+    collection.upsert([make_record("a", vectors[0])])
+    asyncio.run(collection.compact())
+
+    reopened = PersistentMemoryStore(str(tmp_path))
+    assert reopened.dedup_index("notes").policy == "merge"
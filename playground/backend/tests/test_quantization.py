@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from semantic_kernel.exceptions import ServiceInvalidRequestError
+from app.core.memory_store import VectorCollection
+from app.core.quantization import Int8Quantizer, make_quantizer
+from tests.helpers import make_record, random_vectors
+
+
+def normalized(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("kind, tolerance", [("float16", 1e-3), ("int8", 2e-2)])
+def test_scores_match_decoded_dot_products(kind, tolerance):
+    vectors = normalized(random_vectors(300, 32))
+    queries = normalized(random_vectors(3, 32, seed=1))
+    quantizer = make_quantizer(kind)
+    quantizer.fit(vectors)
+    codes = quantizer.encode(vectors)
+    assert codes.dtype == quantizer.dtype
+
+    assert np.allclose(quantizer.decode(codes), vectors, atol=tolerance)
+    exact = vectors @ queries.T
+    assert np.allclose(quantizer.scores(codes, queries[0]), exact[:, 0], atol=tolerance * 4)
+    assert np.allclose(quantizer.scores(codes, queries), exact, atol=tolerance * 4)
+
+
+def test_int8_widens_its_range_and_reencodes_stored_codes():
+    quantizer = Int8Quantizer()
+    first = np.array([[0.0, 0.5], [0.1, -0.5]], dtype=np.float32)
+    quantizer.fit(first)
+    codes = quantizer.encode(first)
+
+    second = np.array([[0.9, 0.0]], dtype=np.float32)
+    quantizer.fit(second, codes)
+    # The codes stored before still decode to their values under the new range
+    assert np.allclose(quantizer.decode(codes), first, atol=0.01)
+    assert np.allclose(quantizer.decode(quantizer.encode(second)), second, atol=0.01)
+
+
+def test_unknown_quantization_is_rejected():
+    assert make_quantizer("none") is None
+    with pytest.raises(ServiceInvalidRequestError):
+        make_quantizer("int4")
+
+
+@pytest.mark.parametrize("kind", ["float16", "int8"])
+def test_rescore_ranks_by_exact_scores(kind):
+    vectors = random_vectors(500, 32)
+    collection = VectorCollection(make_quantizer(kind), rescore=True)
+    collection.upsert([make_record(f"r{i}", v) for i, v in enumerate(vectors)])
+    exact = VectorCollection()
+    exact.upsert([make_record(f"r{i}", v) for i, v in enumerate(vectors)])
+
+    query = random_vectors(1, 32, seed=2)[0]
+    assert collection.full is not None
+    assert [row for row, _ in collection.search(query, 10, 0.0)] == [
+        row for row, _ in exact.search(query, 10, 0.0)
+    ]
@@ -0,0 +1,45 @@
+import asyncio
+import hashlib
+import json
+import numpy as np
+import pytest
+from app.core import kernel
+from app.core.memory_store import NumpyMemoryStore
+
+
+class FakeEmbeddings:
+    async def generate_embeddings(self, texts, **kwargs):
+        return np.array(
+            [
+                np.random.default_rng(
+                    int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+                ).standard_normal(16)
+                for text in texts
+            ],
+            dtype=np.float32,
+        )
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = NumpyMemoryStore(dedup_policy="merge", dedup_params={"max_distance": 3})
+    monkeypatch.setattr(kernel, "memory_store", store)
+    monkeypatch.setattr(kernel, "get_embedding_generator", lambda: FakeEmbeddings())
+    return store
+
+
+TEXT = "The quick brown fox jumps over the lazy dog near the river bank today"
+
+
+def test_merge_into_stored_record(store):
+    async def run():
+        await kernel.save_memories([("c", "a", TEXT, None)])
+        counts = await kernel.save_memories([("c", "b", TEXT + ".", None)])
+        assert counts["duplicates"] == 1
+        assert counts["created"] == 0
+        record = await store.get("c", "a", with_embedding=True)
+        assert json.loads(record._additional_metadata)["duplicate_ids"] == ["b"]
+        assert record._embedding is not None
+        assert not await store.get_batch("c", ["b"])
+
+    asyncio.run(run())
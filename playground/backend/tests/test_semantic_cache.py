@@ -0,0 +1,62 @@
+import asyncio
+import numpy as np
+from app.core.semantic_cache import SemanticCache, _SemanticCacheIndex
+
+
+class FixedEmbeddings:
+    """Embeds each prompt as the basis vector numbered by the prompt."""
+
+    async def generate_embeddings(self, texts, **kwargs):
+        vectors = np.zeros((len(texts), 64), dtype=np.float32)
+        for row, text in enumerate(texts):
+            vectors[row, int(text)] = 1.0
+        return vectors
+
+
+def basis(i, dimension=64):
+    vector = np.zeros(dimension, dtype=np.float32)
+    vector[i] = 1.0
+    return vector
+
+
+def test_index_grows_geometrically_and_replaces_oldest():
+    index = _SemanticCacheIndex(64)
+    for i in range(40):
+        index.add(basis(i), str(i), i, float(i), max_entries=40)
+    assert index.size == 40
+    assert index.capacity == 40
+    for i in range(40, 50):
+        index.add(basis(i), str(i), i, float(i), max_entries=40)
+    assert index.capacity == 40
+    assert [index.responses[s] for s in index._slots()] == [str(i) for i in range(10, 50)]
+
+    position, score = index.best_match(basis(45))
+    assert index.responses[position] == "45" and score == 1.0
+    assert index.best_match(basis(5))[1] == 0.0
+
+    index.purge_expired(now=20.0)
+    assert index.size == 30
+    assert index.responses[index.head] == "20"
+
+
+def test_total_cap_evicts_least_recently_used_scope():
+    cache = SemanticCache(
+        FixedEmbeddings, max_entries=10, max_total_entries=4, enabled=True
+    )
+
+    async def run():
+        for scope, prompts in (("a", "01"), ("b", "23")):
+            for prompt in prompts:
+                _, embedding = await cache.lookup("ns", prompt, scope)
+                cache.store("ns", embedding, f"answer {prompt}", scope=scope)
+        # A hit in scope "a" makes "b" the least recently used
+        assert (await cache.lookup("ns", "0", "a"))[0] == "answer 0"
+
+        _, embedding = await cache.lookup("ns", "4", "c")
+        cache.store("ns", embedding, "answer 4", scope="c")
+        assert cache.stats()["namespaces"]["ns"]["entries"] == 4
+        assert (await cache.lookup("ns", "2", "b"))[0] is None
+        assert (await cache.lookup("ns", "3", "b"))[0] == "answer 3"
+        assert (await cache.lookup("ns", "1", "a"))[0] == "answer 1"
+
+    asyncio.run(run())